@@ -0,0 +1,110 @@
+"""statement level aggregation trigger
+
+Revision ID: a6d7617c7e56
+Revises: 62c899830ae8
+Create Date: 2026-10-18 09:00:12.418210
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+from sqlalchemy import DDL
+
+# revision identifiers, used by Alembic.
+revision: str = "a6d7617c7e56"
+down_revision: Union[str, None] = "62c899830ae8"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Same window as update_aggregated_prices(), but computed once per statement
+# for every ticker touched by it instead of once per inserted row
+batch_aggregation_function_ddl = DDL(
+    """
+CREATE OR REPLACE FUNCTION update_aggregated_prices_batch() RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO binance_tickers_aggregated_data
+        (ticker_id, min_price, avg_price, max_price, created_at)
+    SELECT
+        changed.ticker_id,
+        MIN(last_prices.price::FLOAT),
+        AVG(last_prices.price::FLOAT),
+        MAX(last_prices.price::FLOAT),
+        NOW()
+    FROM (SELECT DISTINCT ticker_id FROM new_rows) AS changed
+    CROSS JOIN LATERAL (
+        SELECT price
+        FROM binance_tickers_data
+        WHERE ticker_id = changed.ticker_id
+        ORDER BY created_at DESC
+        LIMIT 10 -- creating a window of last X records
+    ) AS last_prices
+    GROUP BY changed.ticker_id
+    ON CONFLICT (ticker_id)
+    DO UPDATE SET
+        min_price = EXCLUDED.min_price,
+        avg_price = EXCLUDED.avg_price,
+        max_price = EXCLUDED.max_price,
+        created_at = NOW();
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+"""
+)
+
+# transition tables can only be declared on single event triggers
+batch_aggregation_insert_trigger_ddl = DDL(
+    """
+CREATE TRIGGER binance_data_aggregation_insert_trigger
+AFTER INSERT ON binance_tickers_data
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION update_aggregated_prices_batch();
+"""
+)
+
+batch_aggregation_update_trigger_ddl = DDL(
+    """
+CREATE TRIGGER binance_data_aggregation_update_trigger
+AFTER UPDATE ON binance_tickers_data
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION update_aggregated_prices_batch();
+"""
+)
+
+row_aggregation_trigger_ddl = DDL(
+    """
+CREATE TRIGGER binance_data_aggregation_trigger
+AFTER INSERT OR UPDATE ON binance_tickers_data
+FOR EACH ROW EXECUTE FUNCTION update_aggregated_prices();
+"""
+)
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_binance_tickers_data_ticker_id_created_at",
+        "binance_tickers_data",
+        ["ticker_id", "created_at"],
+    )
+    op.execute(
+        "DROP TRIGGER IF EXISTS binance_data_aggregation_trigger ON binance_tickers_data;"
+    )
+    op.execute(batch_aggregation_function_ddl)
+    op.execute(batch_aggregation_insert_trigger_ddl)
+    op.execute(batch_aggregation_update_trigger_ddl)
+
+
+def downgrade() -> None:
+    op.execute(
+        "DROP TRIGGER IF EXISTS binance_data_aggregation_insert_trigger ON binance_tickers_data;"
+    )
+    op.execute(
+        "DROP TRIGGER IF EXISTS binance_data_aggregation_update_trigger ON binance_tickers_data;"
+    )
+    op.execute("DROP FUNCTION IF EXISTS update_aggregated_prices_batch;")
+    op.execute(row_aggregation_trigger_ddl)
+    op.drop_index(
+        "ix_binance_tickers_data_ticker_id_created_at",
+        table_name="binance_tickers_data",
+    )
@@ -0,0 +1,229 @@
+"""rolling 24h price aggregates
+
+Revision ID: 069bd4db38ec
+Revises: a6d7617c7e56
+Create Date: 2026-10-18 10:00:41.235114
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import DDL
+
+# revision identifiers, used by Alembic.
+revision: str = "069bd4db38ec"
+down_revision: Union[str, None] = "a6d7617c7e56"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Every flush merges its rows into hourly buckets and into the rolling row of
+# each ticker it touched. Once the hour changes, the rows whose window starts
+# before the new first hour are recomputed from their (at most 25) buckets,
+# so the window rolls without ever reading binance_tickers_data again: it
+# covers the last 24 hours plus the elapsed part of the oldest one.
+rolling_aggregation_function_ddl = DDL(
+    """
+CREATE OR REPLACE FUNCTION update_rolling_prices_batch() RETURNS TRIGGER AS $$
+DECLARE
+    current_start TIMESTAMP := date_trunc('hour', LOCALTIMESTAMP - INTERVAL '1 day');
+    rolled INT[];
+BEGIN
+    INSERT INTO binance_tickers_hourly_prices AS hourly
+        (ticker_id, bucket, min_price, max_price, price_sum, price_count)
+    SELECT
+        ticker_id,
+        date_trunc('hour', created_at),
+        MIN(price::FLOAT),
+        MAX(price::FLOAT),
+        SUM(price::FLOAT),
+        COUNT(*)
+    FROM new_rows
+    WHERE created_at >= current_start
+    GROUP BY 1, 2
+    ORDER BY 1, 2
+    ON CONFLICT (ticker_id, bucket)
+    DO UPDATE SET
+        min_price = LEAST(hourly.min_price, EXCLUDED.min_price),
+        max_price = GREATEST(hourly.max_price, EXCLUDED.max_price),
+        price_sum = hourly.price_sum + EXCLUDED.price_sum,
+        price_count = hourly.price_count + EXCLUDED.price_count;
+
+    WITH stale AS (
+        DELETE FROM binance_tickers_rolling_prices
+        WHERE window_start < current_start
+        RETURNING ticker_id
+    )
+    SELECT COALESCE(array_agg(ticker_id), '{}') INTO rolled FROM stale;
+
+    IF cardinality(rolled) > 0 THEN
+        DELETE FROM binance_tickers_hourly_prices
+        WHERE ticker_id = ANY(rolled) AND bucket < current_start;
+
+        INSERT INTO binance_tickers_rolling_prices
+            (ticker_id, min_price, max_price, price_sum, price_count, window_start, created_at)
+        SELECT
+            ticker_id,
+            MIN(min_price),
+            MAX(max_price),
+            SUM(price_sum),
+            SUM(price_count),
+            current_start,
+            NOW()
+        FROM binance_tickers_hourly_prices
+        WHERE ticker_id = ANY(rolled)
+        GROUP BY ticker_id
+        ORDER BY ticker_id;
+    END IF;
+
+    -- the rolled tickers were recomputed from buckets which already hold new_rows
+    INSERT INTO binance_tickers_rolling_prices AS rolling
+        (ticker_id, min_price, max_price, price_sum, price_count, window_start, created_at)
+    SELECT
+        ticker_id,
+        MIN(price::FLOAT),
+        MAX(price::FLOAT),
+        SUM(price::FLOAT),
+        COUNT(*),
+        current_start,
+        NOW()
+    FROM new_rows
+    WHERE created_at >= current_start AND ticker_id <> ALL(rolled)
+    GROUP BY ticker_id
+    ORDER BY ticker_id
+    ON CONFLICT (ticker_id)
+    DO UPDATE SET
+        min_price = LEAST(rolling.min_price, EXCLUDED.min_price),
+        max_price = GREATEST(rolling.max_price, EXCLUDED.max_price),
+        price_sum = rolling.price_sum + EXCLUDED.price_sum,
+        price_count = rolling.price_count + EXCLUDED.price_count,
+        created_at = NOW();
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+"""
+)
+
+# Fills both tables from binance_tickers_data, run once by the migration
+rebuild_function_ddl = DDL(
+    """
+CREATE OR REPLACE FUNCTION rebuild_rolling_prices() RETURNS VOID AS $$
+DECLARE
+    current_start TIMESTAMP := date_trunc('hour', LOCALTIMESTAMP - INTERVAL '1 day');
+BEGIN
+    DELETE FROM binance_tickers_rolling_prices;
+    DELETE FROM binance_tickers_hourly_prices;
+
+    INSERT INTO binance_tickers_hourly_prices
+        (ticker_id, bucket, min_price, max_price, price_sum, price_count)
+    SELECT
+        ticker_id,
+        date_trunc('hour', created_at),
+        MIN(price::FLOAT),
+        MAX(price::FLOAT),
+        SUM(price::FLOAT),
+        COUNT(*)
+    FROM binance_tickers_data
+    WHERE created_at >= current_start
+    GROUP BY 1, 2;
+
+    INSERT INTO binance_tickers_rolling_prices
+        (ticker_id, min_price, max_price, price_sum, price_count, window_start, created_at)
+    SELECT
+        ticker_id,
+        MIN(min_price),
+        MAX(max_price),
+        SUM(price_sum),
+        SUM(price_count),
+        current_start,
+        NOW()
+    FROM binance_tickers_hourly_prices
+    GROUP BY ticker_id;
+END;
+$$ LANGUAGE plpgsql;
+"""
+)
+
+# only inserts, an update of a price would be counted twice
+rolling_aggregation_trigger_ddl = DDL(
+    """
+CREATE TRIGGER binance_data_rolling_aggregation_trigger
+AFTER INSERT ON binance_tickers_data
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION update_rolling_prices_batch();
+"""
+)
+
+aggregated_view_ddl = DDL(
+    """
+CREATE  VIEW aggregated_binance_prices AS
+SELECT
+    btl.id AS ticker_id,
+    MIN(btad.price::FLOAT) AS min_price,
+    AVG(btad.price::FLOAT) AS avg_price,
+    MAX(btad.price::FLOAT) AS max_price,
+    NOW() AS created_at
+FROM
+    binance_tickers_data btad
+JOIN
+    binance_tickers_list btl ON btl.id = btad.ticker_id
+WHERE
+    btad.created_at >= NOW() - INTERVAL '1 day'  -- Adjust the time frame as needed
+GROUP BY
+    btl.id;
+"""
+)
+
+
+def upgrade() -> None:
+    op.create_table(
+        "binance_tickers_hourly_prices",
+        sa.Column("ticker_id", sa.Integer(), nullable=False),
+        sa.Column("bucket", sa.DateTime(), nullable=False),
+        sa.Column("min_price", sa.Float(precision=50), nullable=False),
+        sa.Column("max_price", sa.Float(precision=50), nullable=False),
+        sa.Column("price_sum", sa.Float(precision=50), nullable=False),
+        sa.Column("price_count", sa.BigInteger(), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["ticker_id"], ["binance_tickers_list.id"], ondelete="CASCADE"
+        ),
+        sa.PrimaryKeyConstraint("ticker_id", "bucket"),
+    )
+    op.create_table(
+        "binance_tickers_rolling_prices",
+        sa.Column("ticker_id", sa.Integer(), nullable=False),
+        sa.Column("min_price", sa.Float(precision=50), nullable=False),
+        sa.Column(
+            "avg_price",
+            sa.Float(precision=50),
+            sa.Computed("price_sum / price_count"),
+            nullable=False,
+        ),
+        sa.Column("max_price", sa.Float(precision=50), nullable=False),
+        sa.Column("price_sum", sa.Float(precision=50), nullable=False),
+        sa.Column("price_count", sa.BigInteger(), nullable=False),
+        sa.Column("window_start", sa.DateTime(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(
+            ["ticker_id"], ["binance_tickers_list.id"], ondelete="CASCADE"
+        ),
+        sa.PrimaryKeyConstraint("ticker_id"),
+    )
+    op.execute(rolling_aggregation_function_ddl)
+    op.execute(rebuild_function_ddl)
+    op.execute(rolling_aggregation_trigger_ddl)
+    op.execute("SELECT rebuild_rolling_prices();")
+    op.execute("DROP VIEW IF EXISTS aggregated_binance_prices;")
+
+
+def downgrade() -> None:
+    op.execute(aggregated_view_ddl)
+    op.execute(
+        "DROP TRIGGER IF EXISTS binance_data_rolling_aggregation_trigger ON binance_tickers_data;"
+    )
+    op.execute("DROP FUNCTION IF EXISTS rebuild_rolling_prices;")
+    op.execute("DROP FUNCTION IF EXISTS update_rolling_prices_batch;")
+    op.drop_table("binance_tickers_rolling_prices")
+    op.drop_table("binance_tickers_hourly_prices")
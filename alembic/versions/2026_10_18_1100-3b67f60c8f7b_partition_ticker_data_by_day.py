@@ -0,0 +1,189 @@
+"""partition ticker data by day
+
+Revision ID: 3b67f60c8f7b
+Revises: 069bd4db38ec
+Create Date: 2026-10-18 11:00:27.904163
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+from sqlalchemy import DDL
+
+# revision identifiers, used by Alembic.
+revision: str = "3b67f60c8f7b"
+down_revision: Union[str, None] = "069bd4db38ec"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# the statement level triggers of a partitioned table are declared on the
+# parent, their transition tables then hold the rows of every partition
+TRIGGERS = {
+    "binance_data_aggregation_insert_trigger": """
+CREATE TRIGGER binance_data_aggregation_insert_trigger
+AFTER INSERT ON binance_tickers_data
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION update_aggregated_prices_batch();
+""",
+    "binance_data_aggregation_update_trigger": """
+CREATE TRIGGER binance_data_aggregation_update_trigger
+AFTER UPDATE ON binance_tickers_data
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION update_aggregated_prices_batch();
+""",
+    "binance_data_rolling_aggregation_trigger": """
+CREATE TRIGGER binance_data_rolling_aggregation_trigger
+AFTER INSERT ON binance_tickers_data
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION update_rolling_prices_batch();
+""",
+}
+
+partitioned_table_ddl = DDL(
+    """
+CREATE TABLE binance_tickers_data (
+    id INTEGER NOT NULL DEFAULT nextval('binance_tickers_data_id_seq'::regclass),
+    ticker_id INTEGER NOT NULL,
+    price VARCHAR(50) NOT NULL,
+    "timestamp" BIGINT NOT NULL,
+    created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+    json_data JSON,
+    CONSTRAINT binance_tickers_data_pkey PRIMARY KEY (id, created_at),
+    CONSTRAINT binance_tickers_data_ticker_id_fkey FOREIGN KEY (ticker_id)
+        REFERENCES binance_tickers_list (id) ON DELETE CASCADE
+) PARTITION BY RANGE (created_at);
+"""
+)
+
+# The existing heap is attached as is, rather than copied: it becomes the
+# partition of everything up to the end of its last day and is dropped as a
+# whole once that day is past the retention. Daily partitions follow it, for
+# a week, the maintain-partitions command takes over from there. A plain
+# string, DDL() would take the format() placeholders for its own.
+partitions_ddl = """
+DO $$
+DECLARE
+    first_day DATE := (NOW() AT TIME ZONE 'UTC')::DATE;
+    day DATE;
+BEGIN
+    IF EXISTS (SELECT 1 FROM binance_tickers_data_legacy) THEN
+        first_day := GREATEST(
+            first_day + 1,
+            (SELECT MAX(created_at)::DATE + 1 FROM binance_tickers_data_legacy)
+        );
+        EXECUTE format(
+            'ALTER TABLE binance_tickers_data ATTACH PARTITION binance_tickers_data_legacy '
+            'FOR VALUES FROM (MINVALUE) TO (%L)',
+            first_day
+        );
+    ELSE
+        DROP TABLE binance_tickers_data_legacy;
+    END IF;
+
+    FOR offset_days IN 0..7 LOOP
+        day := first_day + offset_days;
+        EXECUTE format(
+            'CREATE TABLE %I PARTITION OF binance_tickers_data FOR VALUES FROM (%L) TO (%L)',
+            'binance_tickers_data_p' || to_char(day, 'YYYYMMDD'),
+            day,
+            day + 1
+        );
+    END LOOP;
+END;
+$$;
+"""
+
+
+def drop_triggers():
+    for name in TRIGGERS:
+        op.execute(f"DROP TRIGGER IF EXISTS {name} ON binance_tickers_data;")
+
+
+def create_triggers():
+    for trigger_ddl in TRIGGERS.values():
+        op.execute(trigger_ddl)
+
+
+def upgrade() -> None:
+    drop_triggers()
+    op.execute(
+        "ALTER TABLE binance_tickers_data RENAME TO binance_tickers_data_legacy;"
+    )
+    op.execute(
+        "ALTER INDEX ix_binance_tickers_data_ticker_id_created_at "
+        "RENAME TO ix_binance_tickers_data_legacy_ticker_id_created_at;"
+    )
+    op.execute(
+        "ALTER TABLE binance_tickers_data_legacy "
+        "RENAME CONSTRAINT binance_tickers_data_ticker_id_fkey "
+        "TO binance_tickers_data_legacy_ticker_id_fkey;"
+    )
+    # the partition key has to be a non null part of the primary key, the rows
+    # without a created_at were never in the aggregation window anyway
+    op.execute(
+        "UPDATE binance_tickers_data_legacy SET created_at = '-infinity' "
+        "WHERE created_at IS NULL;"
+    )
+    op.execute(
+        "ALTER TABLE binance_tickers_data_legacy ALTER COLUMN created_at SET NOT NULL;"
+    )
+    op.execute(
+        "ALTER TABLE binance_tickers_data_legacy DROP CONSTRAINT binance_tickers_data_pkey;"
+    )
+    op.execute(
+        "ALTER TABLE binance_tickers_data_legacy "
+        "ADD CONSTRAINT binance_tickers_data_legacy_pkey PRIMARY KEY (id, created_at);"
+    )
+
+    op.execute(partitioned_table_ddl)
+    op.execute(
+        "ALTER SEQUENCE binance_tickers_data_id_seq OWNED BY binance_tickers_data.id;"
+    )
+    # built on every partition, the legacy one gets its existing index attached
+    op.create_index(
+        "ix_binance_tickers_data_ticker_id_created_at",
+        "binance_tickers_data",
+        ["ticker_id", "created_at"],
+    )
+    op.execute(partitions_ddl)
+    create_triggers()
+
+
+def downgrade() -> None:
+    drop_triggers()
+    op.execute(
+        "CREATE TABLE binance_tickers_data_unpartitioned "
+        "(LIKE binance_tickers_data INCLUDING DEFAULTS);"
+    )
+    op.execute(
+        "INSERT INTO binance_tickers_data_unpartitioned SELECT * FROM binance_tickers_data;"
+    )
+    op.execute(
+        "ALTER SEQUENCE binance_tickers_data_id_seq "
+        "OWNED BY binance_tickers_data_unpartitioned.id;"
+    )
+    # the partitions go with their parent
+    op.execute("DROP TABLE binance_tickers_data;")
+    op.execute(
+        "ALTER TABLE binance_tickers_data_unpartitioned RENAME TO binance_tickers_data;"
+    )
+    op.execute(
+        "ALTER TABLE binance_tickers_data ALTER COLUMN created_at DROP NOT NULL;"
+    )
+    op.execute(
+        "ALTER TABLE binance_tickers_data "
+        "ADD CONSTRAINT binance_tickers_data_pkey PRIMARY KEY (id);"
+    )
+    op.execute(
+        "ALTER TABLE binance_tickers_data "
+        "ADD CONSTRAINT binance_tickers_data_ticker_id_fkey FOREIGN KEY (ticker_id) "
+        "REFERENCES binance_tickers_list (id) ON DELETE CASCADE;"
+    )
+    op.create_index(
+        "ix_binance_tickers_data_ticker_id_created_at",
+        "binance_tickers_data",
+        ["ticker_id", "created_at"],
+    )
+    create_triggers()
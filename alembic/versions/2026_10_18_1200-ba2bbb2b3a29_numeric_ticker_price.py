@@ -0,0 +1,270 @@
+"""numeric ticker price
+
+Revision ID: ba2bbb2b3a29
+Revises: 3b67f60c8f7b
+Create Date: 2026-10-18 12:00:53.117602
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "ba2bbb2b3a29"
+down_revision: Union[str, None] = "3b67f60c8f7b"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# rows converted per committed UPDATE, so neither the locks nor the
+# transaction grow with the history
+BACKFILL_BATCH_SIZE = 50000
+
+# The aggregation functions as left by the previous migrations, <price> is
+# price::FLOAT over the text column and the bare column once it is numeric
+FUNCTIONS = [
+    """
+CREATE OR REPLACE FUNCTION update_aggregated_prices() RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO binance_tickers_aggregated_data
+        (ticker_id, min_price, avg_price, max_price, created_at)
+    SELECT
+        NEW.ticker_id,
+        MIN(<price>),
+        AVG(<price>),
+        MAX(<price>),
+        NOW()
+    FROM (
+        SELECT price
+        FROM binance_tickers_data
+        WHERE ticker_id = NEW.ticker_id
+        ORDER BY created_at DESC
+        LIMIT 10 -- creating a window of last X records
+    ) AS subquery
+    ON CONFLICT (ticker_id)
+    DO UPDATE SET
+        min_price = EXCLUDED.min_price,
+        avg_price = EXCLUDED.avg_price,
+        max_price = EXCLUDED.max_price,
+        created_at = NOW();
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+""",
+    """
+CREATE OR REPLACE FUNCTION update_aggregated_prices_batch() RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO binance_tickers_aggregated_data
+        (ticker_id, min_price, avg_price, max_price, created_at)
+    SELECT
+        changed.ticker_id,
+        MIN(last_prices.<price>),
+        AVG(last_prices.<price>),
+        MAX(last_prices.<price>),
+        NOW()
+    FROM (SELECT DISTINCT ticker_id FROM new_rows) AS changed
+    CROSS JOIN LATERAL (
+        SELECT price
+        FROM binance_tickers_data
+        WHERE ticker_id = changed.ticker_id
+        ORDER BY created_at DESC
+        LIMIT 10 -- creating a window of last X records
+    ) AS last_prices
+    GROUP BY changed.ticker_id
+    ON CONFLICT (ticker_id)
+    DO UPDATE SET
+        min_price = EXCLUDED.min_price,
+        avg_price = EXCLUDED.avg_price,
+        max_price = EXCLUDED.max_price,
+        created_at = NOW();
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+""",
+    """
+CREATE OR REPLACE FUNCTION update_rolling_prices_batch() RETURNS TRIGGER AS $$
+DECLARE
+    current_start TIMESTAMP := date_trunc('hour', LOCALTIMESTAMP - INTERVAL '1 day');
+    rolled INT[];
+BEGIN
+    INSERT INTO binance_tickers_hourly_prices AS hourly
+        (ticker_id, bucket, min_price, max_price, price_sum, price_count)
+    SELECT
+        ticker_id,
+        date_trunc('hour', created_at),
+        MIN(<price>),
+        MAX(<price>),
+        SUM(<price>),
+        COUNT(*)
+    FROM new_rows
+    WHERE created_at >= current_start
+    GROUP BY 1, 2
+    ORDER BY 1, 2
+    ON CONFLICT (ticker_id, bucket)
+    DO UPDATE SET
+        min_price = LEAST(hourly.min_price, EXCLUDED.min_price),
+        max_price = GREATEST(hourly.max_price, EXCLUDED.max_price),
+        price_sum = hourly.price_sum + EXCLUDED.price_sum,
+        price_count = hourly.price_count + EXCLUDED.price_count;
+
+    WITH stale AS (
+        DELETE FROM binance_tickers_rolling_prices
+        WHERE window_start < current_start
+        RETURNING ticker_id
+    )
+    SELECT COALESCE(array_agg(ticker_id), '{}') INTO rolled FROM stale;
+
+    IF cardinality(rolled) > 0 THEN
+        DELETE FROM binance_tickers_hourly_prices
+        WHERE ticker_id = ANY(rolled) AND bucket < current_start;
+
+        INSERT INTO binance_tickers_rolling_prices
+            (ticker_id, min_price, max_price, price_sum, price_count, window_start, created_at)
+        SELECT
+            ticker_id,
+            MIN(min_price),
+            MAX(max_price),
+            SUM(price_sum),
+            SUM(price_count),
+            current_start,
+            NOW()
+        FROM binance_tickers_hourly_prices
+        WHERE ticker_id = ANY(rolled)
+        GROUP BY ticker_id
+        ORDER BY ticker_id;
+    END IF;
+
+    -- the rolled tickers were recomputed from buckets which already hold new_rows
+    INSERT INTO binance_tickers_rolling_prices AS rolling
+        (ticker_id, min_price, max_price, price_sum, price_count, window_start, created_at)
+    SELECT
+        ticker_id,
+        MIN(<price>),
+        MAX(<price>),
+        SUM(<price>),
+        COUNT(*),
+        current_start,
+        NOW()
+    FROM new_rows
+    WHERE created_at >= current_start AND ticker_id <> ALL(rolled)
+    GROUP BY ticker_id
+    ORDER BY ticker_id
+    ON CONFLICT (ticker_id)
+    DO UPDATE SET
+        min_price = LEAST(rolling.min_price, EXCLUDED.min_price),
+        max_price = GREATEST(rolling.max_price, EXCLUDED.max_price),
+        price_sum = rolling.price_sum + EXCLUDED.price_sum,
+        price_count = rolling.price_count + EXCLUDED.price_count,
+        created_at = NOW();
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+""",
+    """
+CREATE OR REPLACE FUNCTION rebuild_rolling_prices() RETURNS VOID AS $$
+DECLARE
+    current_start TIMESTAMP := date_trunc('hour', LOCALTIMESTAMP - INTERVAL '1 day');
+BEGIN
+    DELETE FROM binance_tickers_rolling_prices;
+    DELETE FROM binance_tickers_hourly_prices;
+
+    INSERT INTO binance_tickers_hourly_prices
+        (ticker_id, bucket, min_price, max_price, price_sum, price_count)
+    SELECT
+        ticker_id,
+        date_trunc('hour', created_at),
+        MIN(<price>),
+        MAX(<price>),
+        SUM(<price>),
+        COUNT(*)
+    FROM binance_tickers_data
+    WHERE created_at >= current_start
+    GROUP BY 1, 2;
+
+    INSERT INTO binance_tickers_rolling_prices
+        (ticker_id, min_price, max_price, price_sum, price_count, window_start, created_at)
+    SELECT
+        ticker_id,
+        MIN(min_price),
+        MAX(max_price),
+        SUM(price_sum),
+        SUM(price_count),
+        current_start,
+        NOW()
+    FROM binance_tickers_hourly_prices
+    GROUP BY ticker_id;
+END;
+$$ LANGUAGE plpgsql;
+""",
+]
+
+# an UPDATE of every row would rerun the last prices aggregation per batch
+update_trigger_ddl = """
+CREATE TRIGGER binance_data_aggregation_update_trigger
+AFTER UPDATE ON binance_tickers_data
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION update_aggregated_prices_batch();
+"""
+
+
+def create_functions(price: str):
+    for function_ddl in FUNCTIONS:
+        op.execute(function_ddl.replace("<price>", price))
+
+
+def upgrade() -> None:
+    op.execute(
+        "DROP TRIGGER IF EXISTS binance_data_aggregation_update_trigger "
+        "ON binance_tickers_data;"
+    )
+    op.add_column("binance_tickers_data", sa.Column("price_value", sa.Numeric()))
+    connection = op.get_bind()
+
+    with op.get_context().autocommit_block():
+        first_id, last_id = connection.execute(
+            sa.text("SELECT MIN(id), MAX(id) FROM binance_tickers_data")
+        ).one()
+
+        for batch_start in range(
+            first_id or 0, (last_id or 0) + 1, BACKFILL_BATCH_SIZE
+        ):
+            connection.execute(
+                sa.text(
+                    """
+                    UPDATE binance_tickers_data
+                    SET price_value = price::NUMERIC
+                    WHERE id >= :batch_start AND id < :batch_end
+                        AND price_value IS NULL
+                    """
+                ).bindparams(
+                    batch_start=batch_start,
+                    batch_end=batch_start + BACKFILL_BATCH_SIZE,
+                )
+            )
+
+    # whatever was inserted meanwhile, with the inserts held off until the swap
+    op.execute("LOCK TABLE binance_tickers_data IN SHARE MODE;")
+    op.execute(
+        "UPDATE binance_tickers_data SET price_value = price::NUMERIC "
+        "WHERE price_value IS NULL;"
+    )
+    op.alter_column("binance_tickers_data", "price_value", nullable=False)
+    op.drop_column("binance_tickers_data", "price")
+    op.alter_column("binance_tickers_data", "price_value", new_column_name="price")
+    create_functions("price")
+    op.execute(update_trigger_ddl)
+
+
+def downgrade() -> None:
+    op.execute(
+        "DROP TRIGGER IF EXISTS binance_data_aggregation_update_trigger "
+        "ON binance_tickers_data;"
+    )
+    op.add_column("binance_tickers_data", sa.Column("price_text", sa.String(50)))
+    op.execute("UPDATE binance_tickers_data SET price_text = price::TEXT;")
+    op.alter_column("binance_tickers_data", "price_text", nullable=False)
+    op.drop_column("binance_tickers_data", "price")
+    op.alter_column("binance_tickers_data", "price_text", new_column_name="price")
+    create_functions("price::FLOAT")
+    op.execute(update_trigger_ddl)
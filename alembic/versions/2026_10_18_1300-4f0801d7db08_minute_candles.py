@@ -0,0 +1,155 @@
+"""minute candles
+
+Revision ID: 4f0801d7db08
+Revises: ba2bbb2b3a29
+Create Date: 2026-10-18 13:00:06.518930
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+from sqlalchemy import DDL
+
+# revision identifiers, used by Alembic.
+revision: str = "4f0801d7db08"
+down_revision: Union[str, None] = "ba2bbb2b3a29"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+candles_table_ddl = DDL(
+    """
+CREATE TABLE binance_tickers_minute_candles (
+    ticker_id INTEGER NOT NULL,
+    bucket TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+    open NUMERIC NOT NULL,
+    high NUMERIC NOT NULL,
+    low NUMERIC NOT NULL,
+    close NUMERIC NOT NULL,
+    open_time BIGINT NOT NULL,
+    close_time BIGINT NOT NULL,
+    ticks BIGINT NOT NULL,
+    CONSTRAINT binance_tickers_minute_candles_pkey PRIMARY KEY (ticker_id, bucket),
+    CONSTRAINT binance_tickers_minute_candles_ticker_id_fkey FOREIGN KEY (ticker_id)
+        REFERENCES binance_tickers_list (id) ON DELETE CASCADE
+) PARTITION BY RANGE (bucket);
+"""
+)
+
+# Like binance_tickers_data: the backfilled history goes into one partition
+# dropped as a whole once past the retention, then a week of days ahead.
+# A plain string, DDL() would take the format() placeholders for its own.
+partitions_ddl = """
+DO $$
+DECLARE
+    first_day DATE := (NOW() AT TIME ZONE 'UTC')::DATE;
+    day DATE;
+BEGIN
+    EXECUTE format(
+        'CREATE TABLE binance_tickers_minute_candles_legacy '
+        'PARTITION OF binance_tickers_minute_candles FOR VALUES FROM (MINVALUE) TO (%L)',
+        first_day
+    );
+
+    FOR offset_days IN 0..7 LOOP
+        day := first_day + offset_days;
+        EXECUTE format(
+            'CREATE TABLE %I PARTITION OF binance_tickers_minute_candles '
+            'FOR VALUES FROM (%L) TO (%L)',
+            'binance_tickers_minute_candles_p' || to_char(day, 'YYYYMMDD'),
+            day,
+            day + 1
+        );
+    END LOOP;
+END;
+$$;
+"""
+
+# The candles are bucketed by the event time of the ticks. Those more than a
+# day away from their insert are left out: their day might have no partition,
+# and an error there would fail the whole flush.
+TICKS = """
+    SELECT
+        ticker_id,
+        price,
+        "timestamp",
+        date_trunc('minute', to_timestamp("timestamp" / 1000.0) AT TIME ZONE 'UTC') AS bucket
+    FROM {source}
+    WHERE to_timestamp("timestamp" / 1000.0) AT TIME ZONE 'UTC'
+        BETWEEN created_at - INTERVAL '1 day' AND created_at + INTERVAL '1 day'
+"""
+
+CANDLES = """
+    SELECT
+        ticker_id,
+        bucket,
+        (array_agg(price ORDER BY "timestamp"))[1],
+        MAX(price),
+        MIN(price),
+        (array_agg(price ORDER BY "timestamp" DESC))[1],
+        MIN("timestamp"),
+        MAX("timestamp"),
+        COUNT(*)
+    FROM ({ticks}) AS ticks
+    GROUP BY ticker_id, bucket
+"""
+
+candles_function_ddl = f"""
+CREATE OR REPLACE FUNCTION update_minute_candles_batch() RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO binance_tickers_minute_candles AS candles
+        (ticker_id, bucket, open, high, low, close, open_time, close_time, ticks)
+    {CANDLES.format(ticks=TICKS.format(source="new_rows"))}
+    ORDER BY ticker_id, bucket
+    ON CONFLICT (ticker_id, bucket)
+    DO UPDATE SET
+        open = CASE
+            WHEN EXCLUDED.open_time < candles.open_time THEN EXCLUDED.open
+            ELSE candles.open
+        END,
+        high = GREATEST(candles.high, EXCLUDED.high),
+        low = LEAST(candles.low, EXCLUDED.low),
+        close = CASE
+            WHEN EXCLUDED.close_time >= candles.close_time THEN EXCLUDED.close
+            ELSE candles.close
+        END,
+        open_time = LEAST(candles.open_time, EXCLUDED.open_time),
+        close_time = GREATEST(candles.close_time, EXCLUDED.close_time),
+        ticks = candles.ticks + EXCLUDED.ticks;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+backfill_sql = f"""
+INSERT INTO binance_tickers_minute_candles
+    (ticker_id, bucket, open, high, low, close, open_time, close_time, ticks)
+{CANDLES.format(ticks=TICKS.format(source="binance_tickers_data"))};
+"""
+
+candles_trigger_ddl = DDL(
+    """
+CREATE TRIGGER binance_data_candles_trigger
+AFTER INSERT ON binance_tickers_data
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION update_minute_candles_batch();
+"""
+)
+
+
+def upgrade() -> None:
+    op.execute(candles_table_ddl)
+    op.execute(partitions_ddl)
+    op.execute(candles_function_ddl)
+    op.execute(backfill_sql)
+    op.execute(candles_trigger_ddl)
+
+
+def downgrade() -> None:
+    op.execute(
+        "DROP TRIGGER IF EXISTS binance_data_candles_trigger ON binance_tickers_data;"
+    )
+    op.execute("DROP FUNCTION IF EXISTS update_minute_candles_batch;")
+    # the partitions go with their parent
+    op.execute("DROP TABLE binance_tickers_minute_candles;")
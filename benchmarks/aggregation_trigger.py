@@ -0,0 +1,169 @@
+"""Per-row vs statement level aggregation trigger.
+
+Inserts batches of ticks into binance_tickers_data with each trigger enabled in
+turn and reports how long the insert (trigger included) took, checking that
+both triggers leave identical min/avg/max values behind. Every run happens in
+a transaction which is rolled back, but it takes an exclusive lock on
+binance_tickers_data, so point it at a local database with migrations applied:
+
+    python -m benchmarks.aggregation_trigger --batch-sizes 1000 10000 100000
+"""
+
+import argparse
+import asyncio
+import math
+import random
+import time
+from datetime import datetime, timedelta
+
+import asyncpg
+
+from benchmarks.common import asyncpg_dsn, emit
+
+TRIGGERS = {
+    "row": """
+        CREATE TRIGGER bench_aggregation_trigger
+        AFTER INSERT ON binance_tickers_data
+        FOR EACH ROW EXECUTE FUNCTION update_aggregated_prices();
+    """,
+    "statement": """
+        CREATE TRIGGER bench_aggregation_trigger
+        AFTER INSERT ON binance_tickers_data
+        REFERENCING NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION update_aggregated_prices_batch();
+    """,
+}
+COLUMNS = ["ticker_id", "price", "timestamp", "created_at"]
+HISTORY_ROWS_PER_TICKER = 10
+
+
+def make_rows(ticker_ids: list[int], count: int, seed: int, since: datetime):
+    rng = random.Random(seed)
+
+    return [
+        (
+            ticker_ids[i % len(ticker_ids)],
+            f"{rng.uniform(1, 70000):.8f}",
+            i,
+            since + timedelta(microseconds=i),
+        )
+        for i in range(count)
+    ]
+
+
+async def run_batch(
+    connection: asyncpg.Connection, mode: str, batch_size: int, tickers_count: int
+) -> tuple[float, list]:
+    transaction = connection.transaction()
+    await transaction.start()
+
+    try:
+        await connection.execute(
+            "ALTER TABLE binance_tickers_data DISABLE TRIGGER USER"
+        )
+        ticker_ids = [
+            record["id"]
+            for record in await connection.fetch(
+                "INSERT INTO binance_tickers_list (ticker_name) "
+                "SELECT 'bench' || n FROM generate_series(1, $1) n RETURNING id",
+                tickers_count,
+            )
+        ]
+        since = datetime.utcnow()
+        await connection.copy_records_to_table(
+            "binance_tickers_data",
+            records=make_rows(
+                ticker_ids, tickers_count * HISTORY_ROWS_PER_TICKER, 0, since
+            ),
+            columns=COLUMNS,
+        )
+        await connection.execute(TRIGGERS[mode])
+
+        start = time.perf_counter()
+        await connection.copy_records_to_table(
+            "binance_tickers_data",
+            records=make_rows(
+                ticker_ids, batch_size, batch_size, since + timedelta(hours=1)
+            ),
+            columns=COLUMNS,
+        )
+        elapsed = time.perf_counter() - start
+
+        aggregates = await connection.fetch(
+            """
+            SELECT btl.ticker_name, btad.min_price, btad.avg_price, btad.max_price
+            FROM binance_tickers_aggregated_data btad
+            JOIN binance_tickers_list btl ON btl.id = btad.ticker_id
+            WHERE btad.ticker_id = ANY($1)
+            ORDER BY btl.ticker_name
+            """,
+            ticker_ids,
+        )
+
+    finally:
+        await transaction.rollback()
+
+    return elapsed, [tuple(record) for record in aggregates]
+
+
+def same_aggregates(left: list, right: list) -> bool:
+    if len(left) != len(right):
+        return False
+
+    for (l_name, *l_values), (r_name, *r_values) in zip(left, right):
+        if l_name != r_name or not all(
+            math.isclose(a, b, rel_tol=1e-12) for a, b in zip(l_values, r_values)
+        ):
+            return False
+
+    return True
+
+
+async def main(batch_sizes: list[int], tickers_count: int):
+    connection = await asyncpg.connect(asyncpg_dsn())
+    results = []
+
+    try:
+        for batch_size in batch_sizes:
+            tickers = min(tickers_count, batch_size)
+            timings = {}
+            aggregates = {}
+
+            for mode in TRIGGERS:
+                timings[mode], aggregates[mode] = await run_batch(
+                    connection, mode, batch_size, tickers
+                )
+
+            results.append(
+                {
+                    "batch_size": batch_size,
+                    "tickers": tickers,
+                    "row_trigger_seconds": timings["row"],
+                    "statement_trigger_seconds": timings["statement"],
+                    "speedup": timings["row"] / timings["statement"],
+                    "identical_aggregates": same_aggregates(
+                        aggregates["row"], aggregates["statement"]
+                    ),
+                }
+            )
+
+    finally:
+        await connection.close()
+
+    emit(
+        "aggregation_trigger",
+        results,
+        batch_sizes=batch_sizes,
+        tickers=tickers_count,
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--batch-sizes", type=int, nargs="+", default=[1000, 10000, 100000]
+    )
+    parser.add_argument("--tickers", type=int, default=2000)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.batch_sizes, args.tickers))
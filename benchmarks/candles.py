@@ -0,0 +1,222 @@
+"""GET /aggregation/candles over a month of minute candles per ticker.
+
+Loads `--days` of minute candles for `--tickers` synthetic tickers, as the
+flush trigger would have left them, and times the endpoint for every
+interval through ASGI, from the request to the last streamed byte, and the
+query alone. The candles are committed, the endpoint reads them over its own
+connection, and deleted with their tickers afterwards; point it at a local
+database with migrations applied:
+
+    python -m benchmarks.candles --days 31 --requests 20
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from datetime import datetime, time as day_start, timedelta
+from urllib.parse import urlencode
+
+import asyncpg
+from fastapi import FastAPI
+
+from benchmarks.common import asyncpg_dsn, emit
+from crypto_converter.api.aggregation.aggregation_service import (
+    MINUTE_CANDLES_SQL,
+)
+from crypto_converter.api.app import create_fastapi_app
+from crypto_converter.common.models import CANDLE_INTERVALS
+from crypto_converter.database.db import engine
+from crypto_converter.database.db_models import BinanceTickerMinuteCandleModel
+from crypto_converter.database.partitions import parse_partition, partition_name
+
+PARTITIONED_TABLE = BinanceTickerMinuteCandleModel.__tablename__
+
+# a sine wave generated server side, the month does not go through the client
+CANDLES_INSERT = """
+    INSERT INTO binance_tickers_minute_candles
+        (ticker_id, bucket, open, high, low, close, open_time, close_time, ticks)
+    SELECT
+        ticker_id,
+        $2::TIMESTAMP + INTERVAL '1 minute' * n,
+        price,
+        price * 1.001,
+        price * 0.999,
+        price * 1.0005,
+        n * 60000,
+        n * 60000 + 59000,
+        1 + n % 60
+    FROM unnest($1::INT[]) ticker_id,
+        generate_series(0, $3 - 1) n,
+        LATERAL (SELECT round((1000 + sin(n / 500.0) * 100)::NUMERIC, 8) AS price) p
+"""
+
+
+async def ensure_partitions(connection: asyncpg.Connection, first_day, last_day):
+    """The month predates a freshly migrated table, its legacy partition aside."""
+    rows = await connection.fetch(
+        """
+        SELECT child.relname, pg_get_expr(child.relpartbound, child.oid)
+        FROM pg_inherits
+        JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+        JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+        WHERE parent.relname = $1
+        """,
+        PARTITIONED_TABLE,
+    )
+    partitions = [parse_partition(*row) for row in rows]
+    day = first_day
+
+    while day <= last_day:
+        moment = datetime.combine(day, day_start())
+
+        if not any(p and p.covers(moment) for p in partitions):
+            await connection.execute(
+                f'CREATE TABLE "{partition_name(PARTITIONED_TABLE, day)}" '
+                f"PARTITION OF {PARTITIONED_TABLE} "
+                f"FOR VALUES FROM ('{day}') TO ('{day + timedelta(days=1)}')"
+            )
+
+        day += timedelta(days=1)
+
+
+async def get(app: FastAPI, path: str, params: dict) -> tuple[int, bytes, int]:
+    """Status, body and the number of body chunks it was streamed in."""
+    query_string = urlencode(params).encode()
+    response = {"status": 0, "body": b"", "chunks": 0}
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": query_string,
+        "headers": [],
+        "client": ("127.0.0.1", 50000),
+        "server": ("127.0.0.1", 8000),
+        "app": app,
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            response["status"] = message["status"]
+
+        elif message.get("body"):
+            response["body"] += message["body"]
+            response["chunks"] += 1
+
+    await app(scope, receive, send)
+    return response["status"], response["body"], response["chunks"]
+
+
+async def main(days: int, tickers_count: int, requests_count: int):
+    connection = await asyncpg.connect(asyncpg_dsn())
+    minutes = days * 24 * 60
+    # on a whole hour, every interval then has whole candles only
+    end = datetime.utcnow().replace(minute=0, second=0, microsecond=0)
+    start = end - timedelta(minutes=minutes)
+    app = create_fastapi_app()
+    results = []
+
+    try:
+        ticker_ids = [
+            record["id"]
+            for record in await connection.fetch(
+                "INSERT INTO binance_tickers_list (ticker_name) "
+                "SELECT 'benchcandles' || n FROM generate_series(1, $1) n "
+                "RETURNING id",
+                tickers_count,
+            )
+        ]
+        await ensure_partitions(connection, start.date(), end.date())
+
+        load_start = time.perf_counter()
+        await connection.execute(CANDLES_INSERT, ticker_ids, start, minutes)
+        load_seconds = time.perf_counter() - load_start
+        await connection.execute(f"ANALYZE {PARTITIONED_TABLE}")
+
+        # the query alone, with its rows fetched, as the endpoint's minute candles
+        query = (
+            MINUTE_CANDLES_SQL.replace(":ticker_name", "$1")
+            .replace(":start", "$2")
+            .replace(":end", "$3")
+        )
+        query_times = []
+
+        for _ in range(requests_count):
+            query_start = time.perf_counter()
+            rows = await connection.fetch(query, "benchcandles1", start, end)
+            query_times.append(time.perf_counter() - query_start)
+
+        assert len(rows) == minutes, len(rows)
+        results.append(
+            {
+                "variant": "1m_query",
+                "candles": len(rows),
+                "median_ms": statistics.median(query_times) * 1000,
+            }
+        )
+
+        for interval, step in CANDLE_INTERVALS.items():
+            params = {
+                "ticker_name": "benchcandles1",
+                "interval": interval,
+                "from": start.isoformat(),
+                "to": end.isoformat(),
+            }
+            # warm up the route and the connection pool
+            await get(app, "/aggregation/candles", params)
+            request_times = []
+
+            for _ in range(requests_count):
+                request_start = time.perf_counter()
+                status, body, chunks = await get(app, "/aggregation/candles", params)
+                request_times.append(time.perf_counter() - request_start)
+
+            assert status == 200, body[:200]
+            candles = json.loads(body)
+            assert len(candles) == minutes * CANDLE_INTERVALS["1m"] // step
+            results.append(
+                {
+                    "variant": interval,
+                    "candles": len(candles),
+                    "chunks": chunks,
+                    "response_bytes": len(body),
+                    "median_ms": statistics.median(request_times) * 1000,
+                    "max_ms": max(request_times) * 1000,
+                }
+            )
+
+    finally:
+        # the candles go with their tickers
+        await connection.execute(
+            "DELETE FROM binance_tickers_list WHERE ticker_name LIKE 'benchcandles%'"
+        )
+        await connection.close()
+        await engine.dispose()
+
+    emit(
+        "candles",
+        results,
+        days=days,
+        tickers=tickers_count,
+        requests=requests_count,
+        load_seconds=load_seconds,
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--days", type=int, default=31)
+    parser.add_argument("--tickers", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=20)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.days, args.tickers, args.requests))
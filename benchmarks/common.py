@@ -0,0 +1,27 @@
+import json
+import platform
+import sys
+import time
+
+from crypto_converter.common.settings import PG_URL
+
+
+def asyncpg_dsn(url: str = PG_URL) -> str:
+    """asyncpg wants a plain postgresql:// dsn, without the sqlalchemy driver."""
+    return url.replace("postgresql+asyncpg://", "postgresql://")
+
+
+def emit(benchmark: str, results: list[dict], **params):
+    json.dump(
+        {
+            "benchmark": benchmark,
+            "timestamp": int(time.time()),
+            "python": platform.python_version(),
+            "params": params,
+            "results": results,
+        },
+        sys.stdout,
+        indent=2,
+        default=str,
+    )
+    sys.stdout.write("\n")
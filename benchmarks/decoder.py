@@ -0,0 +1,101 @@
+"""!ticker@arr frame decoding: pydantic round trip vs the fast decoder.
+
+Also times the fast decoder as one of `--shards` consumer shards runs it,
+building only its own tickers. Uses recorded frames (see benchmarks.frames)
+or synthetic ones:
+
+    python -m benchmarks.decoder --frames frames.jsonl
+    python -m benchmarks.decoder --symbols 2000 --count 50
+"""
+
+import argparse
+import json
+import time
+
+from benchmarks.common import emit
+from benchmarks.frames import synthetic_frames
+from crypto_converter.binance_consumer.replay_server import load_frames
+from crypto_converter.binance_consumer.decoder import (
+    decode_ticker_frame,
+    decode_ticker_frame_json,
+)
+from crypto_converter.binance_consumer.ticker_store import TickerStore
+from crypto_converter.common.models import BinanceTicker
+
+
+def decode_ticker_frame_pydantic(message: str) -> list[dict]:
+    """The decoding process_msg used to do, kept as the baseline."""
+    return [
+        BinanceTicker(
+            **{
+                "ticker_name": ticker["s"].lower(),
+                "price": ticker["c"],
+                "timestamp": ticker["E"],
+            }
+        ).model_dump()
+        for ticker in json.loads(message)["data"]
+    ]
+
+
+DECODERS = {
+    "pydantic": decode_ticker_frame_pydantic,
+    "json": decode_ticker_frame_json,
+    "fast": decode_ticker_frame,
+}
+
+
+def run(frames: list[str], repeat: int, shards: int) -> list[dict]:
+    results = []
+    tickers = sum(len(decode_ticker_frame_json(frame)) for frame in frames)
+    frame_bytes = sum(len(frame) for frame in frames)
+    shard_filter = TickerStore(0, shards).filter
+    decoders = {
+        **DECODERS,
+        f"fast_shard_of_{shards}": lambda frame: decode_ticker_frame(
+            frame, shard_filter
+        ),
+    }
+
+    for name, decoder in decoders.items():
+        start = time.perf_counter()
+
+        for _ in range(repeat):
+            for frame in frames:
+                decoder(frame)
+
+        elapsed = time.perf_counter() - start
+        results.append(
+            {
+                "decoder": name,
+                "frames": len(frames) * repeat,
+                "ms_per_frame": elapsed * 1000 / (len(frames) * repeat),
+                "tickers_per_second": tickers * repeat / elapsed,
+                "mb_per_second": frame_bytes * repeat / elapsed / 1024 / 1024,
+            }
+        )
+
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--frames", help="file with recorded frames")
+    parser.add_argument("--symbols", type=int, default=2000)
+    parser.add_argument("--count", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--shards", type=int, default=4)
+    args = parser.parse_args()
+
+    frames = (
+        load_frames(args.frames)
+        if args.frames
+        else synthetic_frames(args.symbols, args.count)
+    )
+    emit(
+        "decoder",
+        run(frames, args.repeat, args.shards),
+        frames=args.frames or "synthetic",
+        symbols=args.symbols,
+        repeat=args.repeat,
+        shards=args.shards,
+    )
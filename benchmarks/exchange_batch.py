@@ -0,0 +1,131 @@
+"""Server side cost of POST /exchange/batch vs one /exchange/ call per bid.
+
+Seeds fresh synthetic tickers into the redis configured in the environment
+(deleted afterwards) and times ExchangeService.exchange_batch plus the
+serialization of its items, against the same bids converted one by one:
+
+    python -m benchmarks.exchange_batch --batch-sizes 100 1000 --symbols 200
+"""
+
+import argparse
+import asyncio
+import logging
+import random
+import time
+
+import redis.asyncio as redis
+
+from benchmarks.common import emit
+from benchmarks.frames import synthetic_symbols
+from crypto_converter.api.exchange.exchange_api import exchange_batch_adapter
+from crypto_converter.api.exchange.exchange_service import ExchangeService
+from crypto_converter.api.exchange.response_memo import ResponseMemo
+from crypto_converter.api.exchange.routing import RoutingTable
+from crypto_converter.api.exchange.ticker_cache import TickerCache
+from crypto_converter.common.common import create_redis_pool
+from crypto_converter.common.metrics import summarize
+from crypto_converter.common.models import ExchangeBid
+
+
+def synthetic_bids(bases: list[str], batch_size: int, rng: random.Random) -> list:
+    return [
+        {"from": rng.choice(bases), "to": "usdt", "amount_from": rng.randint(1, 10**6)}
+        for _ in range(batch_size)
+    ]
+
+
+async def seed_tickers(redis_client: redis.StrictRedis, ticker_names: list[str]):
+    timestamp = int(time.time() * 1000)
+
+    async with redis_client.pipeline(transaction=False) as pipe:
+        for i, ticker_name in enumerate(ticker_names):
+            pipe.hset(
+                ticker_name,
+                mapping={
+                    "ticker_name": ticker_name,
+                    "price": f"{1 + i / 7:.8f}",
+                    "timestamp": timestamp,
+                },
+            )
+
+        await pipe.execute()
+
+
+async def run_scenario(
+    service: ExchangeService, bids: list, repeats: int
+) -> dict[str, list[float]]:
+    durations = {"batch": [], "single": []}
+
+    for _ in range(repeats):
+        start = time.perf_counter()
+        items = await service.exchange_batch(bids)
+        exchange_batch_adapter.dump_json(items, by_alias=True, exclude_none=True)
+        durations["batch"].append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+
+        for bid in bids:
+            response = await service.exchange(ExchangeBid.model_validate(bid))
+            response.model_dump_json(by_alias=True, exclude_none=True)
+
+        durations["single"].append(time.perf_counter() - start)
+
+    return durations
+
+
+async def main(batch_sizes: list[int], symbols_count: int, repeats: int):
+    pool = create_redis_pool()
+    redis_client = redis.StrictRedis(connection_pool=pool)
+    bases = [symbol.lower()[:-4] for symbol in synthetic_symbols(symbols_count)]
+    ticker_names = [f"{base}usdt" for base in bases]
+    # the cache is not subscribed, every single conversion goes to redis
+    service = ExchangeService(
+        redis_client,
+        TickerCache(enabled=False),
+        RoutingTable(),
+        None,
+        ResponseMemo(enabled=False),
+    )
+    rng = random.Random(symbols_count)
+    results = []
+
+    try:
+        await seed_tickers(redis_client, ticker_names)
+
+        for batch_size in batch_sizes:
+            bids = synthetic_bids(bases, batch_size, rng)
+            durations = await run_scenario(service, bids, repeats)
+            results.append(
+                {
+                    "batch_size": batch_size,
+                    "batch_seconds": summarize(durations["batch"]),
+                    "single_seconds": summarize(durations["single"]),
+                }
+            )
+
+    finally:
+        await redis_client.delete(*ticker_names)
+        await redis_client.aclose()
+        await pool.disconnect()
+
+    emit(
+        "exchange_batch",
+        results,
+        batch_sizes=batch_sizes,
+        symbols=symbols_count,
+        repeats=repeats,
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[100, 1000])
+    parser.add_argument("--symbols", type=int, default=200)
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+
+    for name in logging.root.manager.loggerDict:
+        if name.startswith("crypto_converter"):
+            logging.getLogger(name).setLevel("ERROR")
+
+    asyncio.run(main(args.batch_sizes, args.symbols, args.repeats))
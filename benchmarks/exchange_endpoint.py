@@ -0,0 +1,213 @@
+"""Requests/s per core of POST /exchange/, before and after its fast path.
+
+"before" is the route as it was: an ExchangeBid body parameter (json decoded,
+then validated), an ExchangeResponse response_model (validated again and
+encoded by FastAPI) and the service as a class dependency over a tree of
+plain function ones, all solved per request and run in the thread pool.
+"after" is the application route: the raw body validated in one pass, the
+response returned serialized and a single coroutine dependency. Both are
+driven in-process through ASGI, over a stub redis, so only the application
+stack is measured, and must answer identically:
+
+    python -m benchmarks.exchange_endpoint --requests 5000 --tickers 50
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+
+from fastapi import APIRouter, Depends, FastAPI
+from starlette.requests import HTTPConnection
+
+from benchmarks.common import emit
+from crypto_converter.api.app import create_fastapi_app
+from crypto_converter.api.exchange.exchange_service import ExchangeService
+from crypto_converter.api.exchange.response_memo import response_memo
+from crypto_converter.api.exchange.routing import routing_table
+from crypto_converter.api.exchange.ticker_cache import ticker_cache
+from crypto_converter.common.models import ExchangeBid, ExchangeResponse
+
+
+class StubRedis:
+    def __init__(self, tickers: dict[str, dict[bytes, bytes]]):
+        self.tickers = tickers
+
+    async def hgetall(self, key):
+        return self.tickers.get(key, {})
+
+
+def legacy_redis_client(connection: HTTPConnection):
+    return connection.app.state.redis_client
+
+
+def legacy_ticker_table(connection: HTTPConnection):
+    return connection.app.state.ticker_table
+
+
+class LegacyExchangeService(ExchangeService):
+    def __init__(
+        self,
+        redis_client=Depends(legacy_redis_client),
+        ticker_cache=Depends(lambda: ticker_cache),
+        routing_table=Depends(lambda: routing_table),
+        ticker_table=Depends(legacy_ticker_table),
+        response_memo=Depends(lambda: response_memo),
+    ):
+        super().__init__(
+            redis_client, ticker_cache, routing_table, ticker_table, response_memo
+        )
+
+
+def create_before_app() -> FastAPI:
+    router = APIRouter(prefix="/exchange")
+
+    @router.post(
+        "/",
+        response_model=ExchangeResponse,
+        response_model_by_alias=True,
+        response_model_exclude_none=True,
+    )
+    async def exchange_currency(
+        exchange_bid: ExchangeBid,
+        service: LegacyExchangeService = Depends(),
+    ):
+        return await service.exchange(exchange_bid)
+
+    app = FastAPI()
+    app.include_router(router)
+    return app
+
+
+def synthetic_workload(
+    tickers_count: int, requests_count: int, rng: random.Random
+) -> tuple[dict[str, dict[bytes, bytes]], list[bytes]]:
+    timestamp = str(int(time.time() * 1000)).encode()
+    tickers = {
+        f"sym{i}usdt": {
+            b"ticker_name": f"sym{i}usdt".encode(),
+            b"price": f"{rng.uniform(0.0001, 70000):.8f}".encode(),
+            b"timestamp": timestamp,
+        }
+        for i in range(tickers_count)
+    }
+    bodies = []
+
+    for _ in range(requests_count):
+        side = rng.choice(["amount_from", "amount_to"])
+        bid = {
+            "from": f"sym{rng.randrange(tickers_count)}",
+            "to": "usdt",
+            side: rng.randint(1, 10**6),
+        }
+        bodies.append(json.dumps(bid).encode())
+
+    return tickers, bodies
+
+
+async def post(app: FastAPI, path: str, body: bytes) -> tuple[int, bytes]:
+    messages = [{"type": "http.request", "body": body, "more_body": False}]
+    response = {"status": 0, "body": b""}
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": b"",
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+        ],
+        "client": ("127.0.0.1", 50000),
+        "server": ("127.0.0.1", 8000),
+        "app": app,
+    }
+
+    async def receive():
+        return messages.pop() if messages else {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            response["status"] = message["status"]
+
+        else:
+            response["body"] += message.get("body", b"")
+
+    await app(scope, receive, send)
+    return response["status"], response["body"]
+
+
+async def drive(app: FastAPI, bodies: list[bytes], repeats: int):
+    rates = []
+
+    for _ in range(repeats):
+        responses = []
+        start = time.process_time()
+
+        for body in bodies:
+            responses.append(await post(app, "/exchange/", body))
+
+        rates.append(len(bodies) / (time.process_time() - start))
+
+    return rates, responses
+
+
+async def main(requests_count: int, tickers_count: int, repeats: int):
+    tickers, bodies = synthetic_workload(
+        tickers_count, requests_count, random.Random(tickers_count)
+    )
+    redis_client = StubRedis(tickers)
+    results = []
+    outputs = []
+
+    for variant, app in (
+        ("before", create_before_app()),
+        ("after", create_fastapi_app()),
+    ):
+        # what the lifespan would set up
+        app.state.redis_client = redis_client
+        app.state.ticker_table = None
+        # warm up the routes, the pydantic schemas and the quote cache
+        await drive(app, bodies[:100], 1)
+        rates, responses = await drive(app, bodies, repeats)
+
+        assert all(status == 200 for status, _ in responses), responses[0]
+        outputs.append([json.loads(body) for _, body in responses])
+        results.append(
+            {
+                "variant": variant,
+                "requests_per_core_second": max(rates),
+                "all_runs": rates,
+            }
+        )
+
+    assert outputs[0] == outputs[1], "the responses must not change"
+    results.append(
+        {
+            "variant": "speedup",
+            "ratio": results[1]["requests_per_core_second"]
+            / results[0]["requests_per_core_second"],
+        }
+    )
+    emit(
+        "exchange_endpoint",
+        results,
+        requests=requests_count,
+        tickers=tickers_count,
+        repeats=repeats,
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--tickers", type=int, default=50)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.requests, args.tickers, args.repeats))
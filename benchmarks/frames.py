@@ -0,0 +1,107 @@
+"""Recorded and synthetic !ticker@arr frames.
+
+Frames are stored one raw websocket message per line (binance sends compact,
+single line json), so production traffic can be captured once and replayed
+by the benchmarks:
+
+    python -m benchmarks.frames --count 200 --output frames.jsonl
+"""
+
+import argparse
+import asyncio
+import json
+import random
+
+import websockets
+
+from crypto_converter.common.settings import BINANCE_STREAM_URL
+
+
+def synthetic_ticker(symbol: str, event_time: int, price: float) -> dict:
+    return {
+        "e": "24hrTicker",
+        "E": event_time,
+        "s": symbol,
+        "p": "0.00150000",
+        "P": "2.500",
+        "w": f"{price:.8f}",
+        "x": f"{price:.8f}",
+        "c": f"{price:.8f}",
+        "Q": "10.00000000",
+        "b": f"{price:.8f}",
+        "B": "10.00000000",
+        "a": f"{price:.8f}",
+        "A": "100.00000000",
+        "o": f"{price:.8f}",
+        "h": f"{price:.8f}",
+        "l": f"{price:.8f}",
+        "v": "10000.00000000",
+        "q": "18.00000000",
+        "O": event_time - 86400000,
+        "C": event_time,
+        "F": 0,
+        "L": 18150,
+        "n": 18151,
+    }
+
+
+def synthetic_symbols(symbols_count: int) -> list[str]:
+    return [f"SYM{i}USDT" for i in range(symbols_count)]
+
+
+def synthetic_frame(
+    symbols: list[str], event_time: int, rng: random.Random | None = None
+) -> str:
+    rng = rng or random.Random(event_time)
+
+    return json.dumps(
+        {
+            "stream": "!ticker@arr",
+            "data": [
+                synthetic_ticker(symbol, event_time, rng.uniform(0.0001, 70000))
+                for symbol in symbols
+            ],
+        },
+        separators=(",", ":"),
+    )
+
+
+def synthetic_frames(
+    symbols_count: int, frames_count: int, start_time: int = 1727000000000
+) -> list[str]:
+    rng = random.Random(symbols_count)
+    symbols = synthetic_symbols(symbols_count)
+
+    return [
+        synthetic_frame(symbols, start_time + i * 1000, rng)
+        for i in range(frames_count)
+    ]
+
+
+async def record_frames(url: str, count: int, path: str):
+    async with websockets.connect(url, max_size=None) as ws:
+        await ws.send(
+            json.dumps({"method": "SUBSCRIBE", "params": ["!ticker@arr"], "id": 1})
+        )
+
+        with open(path, "w", encoding="utf-8") as frames_file:
+            recorded = 0
+
+            while recorded < count:
+                message = await ws.recv()
+
+                if '"data"' not in message:
+                    continue
+
+                frames_file.write(message + "\n")
+                recorded += 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Records binance !ticker@arr frames")
+    parser.add_argument("--url", default=BINANCE_STREAM_URL)
+    parser.add_argument("--count", type=int, default=100)
+    parser.add_argument("--output", default="frames.jsonl")
+    args = parser.parse_args()
+
+    asyncio.run(record_frames(args.url, args.count, args.output))
@@ -0,0 +1,150 @@
+"""End to end ingestion: process_msg -> flush_tickers -> redis and postgres.
+
+Feeds synthetic !ticker@arr frames for 2k, 10k and 50k symbols through the
+consumer against the redis and postgres configured in the environment (run it
+against local instances, the synthetic symbols are deleted afterwards) and
+reports messages/s, flush duration percentiles and the staleness at redis,
+i.e. the time from the event time E of a tick to it being readable in redis.
+Every flush gets frames with fresh prices, so every flush writes all of its
+symbols rather than heartbeats only:
+
+    python -m benchmarks.ingestion --symbols 2000 10000 50000 --flushes 20
+"""
+
+import argparse
+import asyncio
+import logging
+import random
+import time
+
+from sqlalchemy import delete
+
+from benchmarks.common import emit
+from benchmarks.frames import synthetic_frame, synthetic_symbols
+from crypto_converter.binance_consumer import aio_binance_api
+from crypto_converter.binance_consumer.replay_server import rebase_event_times
+from crypto_converter.binance_consumer.ticker_store import ChangeTracker, TickerStore
+from crypto_converter.common.metrics import metrics, summarize
+from crypto_converter.database.db_models import BinanceTickersModel
+
+STALENESS_SAMPLE = 200
+
+
+async def redis_staleness(ticker_names: list[str]) -> list[float]:
+    async with aio_binance_api.redis_sink.redis_client.pipeline(
+        transaction=False
+    ) as pipe:
+        for ticker_name in ticker_names:
+            pipe.hget(ticker_name, "timestamp")
+
+        timestamps = await pipe.execute()
+
+    visible_at = time.time() * 1000
+    return [visible_at - int(timestamp) for timestamp in timestamps if timestamp]
+
+
+async def cleanup(ticker_names: list[str]):
+    redis_client = aio_binance_api.redis_sink.redis_client
+
+    for offset in range(0, len(ticker_names), 1000):
+        chunk_end = offset + 1000
+        await redis_client.delete(*ticker_names[offset:chunk_end])
+
+    async with aio_binance_api.bulk_ingestor.engine.begin() as connection:
+        await connection.execute(
+            delete(BinanceTickersModel).where(
+                BinanceTickersModel.ticker_name.in_(ticker_names)
+            )
+        )
+
+    aio_binance_api.bulk_ingestor.reset()
+
+
+async def run_scenario(symbols_count: int, flushes: int, frames_per_flush: int):
+    symbols = synthetic_symbols(symbols_count)
+    ticker_names = [symbol.lower() for symbol in symbols]
+    rng = random.Random(symbols_count)
+    aio_binance_api.ticker_store = TickerStore()
+    aio_binance_api.change_tracker = ChangeTracker()
+    metrics.reset()
+    process_time = 0.0
+    staleness = []
+
+    try:
+        for flush in range(flushes):
+            # generated outside of the timings, the same prices again would be
+            # flushed as heartbeats after the first flush
+            frames = [
+                synthetic_frame(
+                    symbols, 1727000000000 + (flush * frames_per_flush + i) * 1000, rng
+                )
+                for i in range(frames_per_flush)
+            ]
+
+            for frame in frames:
+                frame = rebase_event_times(frame)
+                start = time.perf_counter()
+                await aio_binance_api.process_msg(frame)
+                process_time += time.perf_counter() - start
+
+            await aio_binance_api.flush_tickers()
+            sample = rng.sample(ticker_names, min(STALENESS_SAMPLE, symbols_count))
+            staleness.extend(await redis_staleness(sample))
+
+    finally:
+        await cleanup(ticker_names)
+
+    messages = flushes * frames_per_flush
+    snapshot = metrics.snapshot()
+    timings = snapshot["timings"]
+
+    return {
+        "symbols": symbols_count,
+        "messages": messages,
+        "messages_per_second": messages / process_time,
+        "ticks_per_second": messages * symbols_count / process_time,
+        # should stay near 0, or the flush timings measure heartbeats only
+        "heartbeats": snapshot["counters"].get("ticker_flush_heartbeats", 0),
+        "flush_seconds": timings.get("ticker_flush_seconds"),
+        "redis_flush_seconds": timings.get("redis_flush_seconds"),
+        "db_flush_seconds": timings.get("db_flush_seconds"),
+        "redis_staleness_ms": summarize(staleness),
+    }
+
+
+async def main(symbol_counts: list[int], flushes: int, frames_per_flush: int):
+    results = []
+
+    try:
+        for symbols_count in symbol_counts:
+            results.append(await run_scenario(symbols_count, flushes, frames_per_flush))
+
+    finally:
+        await aio_binance_api.redis_sink.close()
+        await aio_binance_api.bulk_ingestor.engine.dispose()
+
+    emit(
+        "ingestion",
+        results,
+        symbols=symbol_counts,
+        flushes=flushes,
+        frames_per_flush=frames_per_flush,
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--symbols", type=int, nargs="+", default=[2000, 10000, 50000])
+    parser.add_argument("--flushes", type=int, default=20)
+    parser.add_argument("--frames-per-flush", type=int, default=3)
+    parser.add_argument("--log-level", default="ERROR")
+    args = parser.parse_args()
+
+    # echoing every statement and logging every frame would dominate the timings
+    aio_binance_api.bulk_ingestor.engine.sync_engine.echo = False
+
+    for name in logging.root.manager.loggerDict:
+        if name.startswith("crypto_converter"):
+            logging.getLogger(name).setLevel(args.log_level)
+
+    asyncio.run(main(args.symbols, args.flushes, args.frames_per_flush))
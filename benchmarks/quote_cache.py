@@ -0,0 +1,128 @@
+"""Per conversion CPU of ExchangeService._exchange with and without price_quote.
+
+"uncached" quantizes and formats the ticker price on every conversion, like
+_exchange used to, "cached" reuses them per ticker price. Both run the same
+bids over the same tickers and must produce identical responses:
+
+    python -m benchmarks.quote_cache --conversions 20000 --tickers 50
+"""
+
+import argparse
+import asyncio
+import random
+import time
+from decimal import Decimal
+
+from benchmarks.common import emit
+from crypto_converter.api.exchange.exchange_service import ExchangeService
+from crypto_converter.api.exchange.response_memo import ResponseMemo
+from crypto_converter.api.exchange.routing import RoutingTable
+from crypto_converter.api.exchange.ticker_cache import TickerCache
+from crypto_converter.common.metrics import summarize
+from crypto_converter.common.models import BinanceTicker, ExchangeBid, quantize
+
+
+class UncachedBinanceTicker(BinanceTicker):
+    def get_quantized_price(self) -> Decimal:
+        return quantize(self.price)
+
+    def get_display_price(self) -> str:
+        return self.price.rstrip("0")
+
+
+def synthetic_workload(
+    tickers_count: int, conversions: int, rng: random.Random
+) -> tuple[list[tuple[str, str, str]], list[ExchangeBid]]:
+    tickers = [
+        (f"sym{i}", "usdt", f"{rng.uniform(0.0001, 70000):.8f}")
+        for i in range(tickers_count)
+    ]
+    bids = []
+
+    for _ in range(conversions):
+        base = rng.randrange(tickers_count)
+        amount = {"amount_from": rng.randint(1, 10**6)}
+
+        if rng.random() < 0.5:
+            amount = {"amount_to": rng.randint(1, 10**6)}
+
+        bids.append(
+            ExchangeBid.model_validate({"from": f"sym{base}", "to": "usdt", **amount})
+        )
+
+    return tickers, bids
+
+
+async def convert(
+    service: ExchangeService,
+    ticker_class: type,
+    tickers,
+    bids,
+    repeats: int,
+    timestamp: int,
+):
+    ticker_objs = {
+        f"{base}{quote}": ticker_class(
+            ticker_name=f"{base}{quote}", price=price, timestamp=timestamp
+        )
+        for base, quote, price in tickers
+    }
+    durations = []
+
+    for _ in range(repeats):
+        responses = []
+        start = time.process_time()
+
+        for bid in bids:
+            ticker = f"{bid.from_}{bid.to_}"
+            responses.append(await service._exchange(bid, ticker, ticker_objs[ticker]))
+
+        durations.append((time.process_time() - start) / len(bids))
+
+    return durations, responses
+
+
+async def main(conversions: int, tickers_count: int, repeats: int):
+    service = ExchangeService(
+        None,
+        TickerCache(enabled=False),
+        RoutingTable(),
+        None,
+        ResponseMemo(enabled=False),
+    )
+    tickers, bids = synthetic_workload(
+        tickers_count, conversions, random.Random(tickers_count)
+    )
+    timestamp = int(time.time() * 1000)
+    uncached, uncached_responses = await convert(
+        service, UncachedBinanceTicker, tickers, bids, repeats, timestamp
+    )
+    cached, cached_responses = await convert(
+        service, BinanceTicker, tickers, bids, repeats, timestamp
+    )
+
+    assert uncached_responses == cached_responses, "the outputs must not change"
+
+    uncached_avg = summarize(uncached)["avg"]
+    cached_avg = summarize(cached)["avg"]
+    emit(
+        "quote_cache",
+        [
+            {"variant": "uncached", "seconds_per_conversion": summarize(uncached)},
+            {"variant": "cached", "seconds_per_conversion": summarize(cached)},
+            {"variant": "saved", "ratio": 1 - cached_avg / uncached_avg},
+        ],
+        conversions=conversions,
+        tickers=tickers_count,
+        repeats=repeats,
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--conversions", type=int, default=20000)
+    parser.add_argument("--tickers", type=int, default=50)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.conversions, args.tickers, args.repeats))
@@ -0,0 +1,221 @@
+"""/aggregation/view over the aggregated_binance_prices view vs the rolling table.
+
+Loads `--history-rows` ticks spread over the last 23 hours, so the view and
+the hour-aligned rolling window cover the same rows, and rebuilds the rolling
+aggregates from them. Then times a per ticker lookup through the view, as
+the endpoint used to run it, and through binance_tickers_rolling_prices,
+checks both return the same min/avg/max, and times how much the triggers
+add to a flush sized insert. Everything happens in a transaction
+which is rolled back, but it locks binance_tickers_data and writes the whole
+history, so point it at a local database with migrations applied:
+
+    python -m benchmarks.rolling_aggregation --history-rows 50000000
+"""
+
+import argparse
+import asyncio
+import math
+import random
+import time
+from datetime import datetime, time as day_start, timedelta
+
+import asyncpg
+
+from benchmarks.common import asyncpg_dsn, emit
+from crypto_converter.database.db_models import BinanceTickerDataModel
+from crypto_converter.database.partitions import parse_partition, partition_name
+
+PARTITIONED_TABLE = BinanceTickerDataModel.__tablename__
+
+VIEW_DDL = """
+    CREATE TEMPORARY VIEW bench_aggregated_binance_prices AS
+    SELECT
+        btl.id AS ticker_id,
+        MIN(btad.price::FLOAT) AS min_price,
+        AVG(btad.price::FLOAT) AS avg_price,
+        MAX(btad.price::FLOAT) AS max_price,
+        NOW() AS created_at
+    FROM binance_tickers_data btad
+    JOIN binance_tickers_list btl ON btl.id = btad.ticker_id
+    WHERE btad.created_at >= NOW() - INTERVAL '1 day'
+    GROUP BY btl.id
+"""
+VIEW_LOOKUP = """
+    SELECT btl.ticker_name, agg.min_price, agg.avg_price, agg.max_price
+    FROM bench_aggregated_binance_prices agg
+    JOIN binance_tickers_list btl ON agg.ticker_id = btl.id
+    WHERE btl.ticker_name = $1
+"""
+ROLLING_LOOKUP = """
+    SELECT btl.ticker_name, rolling.min_price, rolling.avg_price, rolling.max_price
+    FROM binance_tickers_list btl
+    JOIN binance_tickers_rolling_prices rolling ON rolling.ticker_id = btl.id
+    WHERE btl.ticker_name = $1
+"""
+# generated server side, 50M rows do not go through the client
+HISTORY_INSERT = """
+    INSERT INTO binance_tickers_data (ticker_id, price, timestamp, created_at)
+    SELECT
+        ticker_ids[1 + n % cardinality(ticker_ids)],
+        round((1 + random() * 70000)::NUMERIC, 8),
+        n,
+        LOCALTIMESTAMP - INTERVAL '23 hours' * (n::FLOAT / $2)
+    FROM generate_series(1, $2) n, (SELECT $1::INT[] AS ticker_ids) ids
+"""
+COLUMNS = ["ticker_id", "price", "timestamp", "created_at"]
+
+
+async def ensure_partitions(connection: asyncpg.Connection, days: int):
+    """The history spans yesterday, which predates a freshly migrated table."""
+    rows = await connection.fetch(
+        """
+        SELECT child.relname, pg_get_expr(child.relpartbound, child.oid)
+        FROM pg_inherits
+        JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+        JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+        WHERE parent.relname = $1
+        """,
+        PARTITIONED_TABLE,
+    )
+    partitions = [parse_partition(*row) for row in rows]
+    today = datetime.utcnow().date()
+
+    for day in (today - timedelta(days=offset) for offset in range(days + 1)):
+        moment = datetime.combine(day, day_start())
+
+        if not any(p and p.covers(moment) for p in partitions):
+            await connection.execute(
+                f'CREATE TABLE "{partition_name(PARTITIONED_TABLE, day)}" '
+                f"PARTITION OF {PARTITIONED_TABLE} "
+                f"FOR VALUES FROM ('{day}') TO ('{day + timedelta(days=1)}')"
+            )
+
+
+async def time_lookups(
+    connection: asyncpg.Connection, query: str, names: list[str]
+) -> tuple[float, dict[str, tuple]]:
+    rows = {}
+    start = time.perf_counter()
+
+    for name in names:
+        rows[name] = tuple(await connection.fetchrow(query, name))
+
+    return (time.perf_counter() - start) / len(names), rows
+
+
+def same_aggregates(left: dict[str, tuple], right: dict[str, tuple]) -> bool:
+    return left.keys() == right.keys() and all(
+        math.isclose(a, b, rel_tol=1e-9)
+        for name in left
+        for a, b in zip(left[name][1:], right[name][1:])
+    )
+
+
+async def time_flush(
+    connection: asyncpg.Connection, ticker_ids: list[int], flush_size: int, rng
+) -> float:
+    now = await connection.fetchval("SELECT LOCALTIMESTAMP")
+    rows = [
+        (ticker_id, f"{rng.uniform(1, 70000):.8f}", 0, now)
+        for ticker_id in rng.sample(ticker_ids, min(flush_size, len(ticker_ids)))
+    ]
+    start = time.perf_counter()
+    await connection.copy_records_to_table(
+        "binance_tickers_data", records=rows, columns=COLUMNS
+    )
+    return time.perf_counter() - start
+
+
+async def main(
+    history_rows: int,
+    tickers_count: int,
+    view_lookups: int,
+    rolling_lookups: int,
+    flush_size: int,
+):
+    connection = await asyncpg.connect(asyncpg_dsn())
+    rng = random.Random(history_rows)
+    transaction = connection.transaction()
+    await transaction.start()
+
+    try:
+        await connection.execute(
+            "ALTER TABLE binance_tickers_data DISABLE TRIGGER USER"
+        )
+        ticker_ids = [
+            record["id"]
+            for record in await connection.fetch(
+                "INSERT INTO binance_tickers_list (ticker_name) "
+                "SELECT 'bench' || n FROM generate_series(1, $1) n RETURNING id",
+                tickers_count,
+            )
+        ]
+        names = [f"bench{n}" for n in range(1, tickers_count + 1)]
+        await ensure_partitions(connection, 1)
+
+        start = time.perf_counter()
+        await connection.execute(HISTORY_INSERT, ticker_ids, history_rows)
+        load_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        await connection.execute("SELECT rebuild_rolling_prices()")
+        rebuild_seconds = time.perf_counter() - start
+
+        await connection.execute("ANALYZE binance_tickers_data")
+        await connection.execute(VIEW_DDL)
+        sample = rng.sample(names, min(view_lookups, len(names)))
+        view_seconds, view_rows = await time_lookups(connection, VIEW_LOOKUP, sample)
+        rolling_seconds, rolling_rows = await time_lookups(
+            connection, ROLLING_LOOKUP, (sample * rolling_lookups)[:rolling_lookups]
+        )
+
+        without_trigger = await time_flush(connection, ticker_ids, flush_size, rng)
+        await connection.execute("ALTER TABLE binance_tickers_data ENABLE TRIGGER USER")
+        with_trigger = await time_flush(connection, ticker_ids, flush_size, rng)
+
+    finally:
+        await transaction.rollback()
+        await connection.close()
+
+    emit(
+        "rolling_aggregation",
+        [
+            {
+                "history_load_seconds": load_seconds,
+                "rebuild_seconds": rebuild_seconds,
+                "view_lookup_ms": view_seconds * 1000,
+                "rolling_lookup_ms": rolling_seconds * 1000,
+                "lookup_speedup": view_seconds / rolling_seconds,
+                "identical_aggregates": same_aggregates(
+                    view_rows, {name: rolling_rows[name] for name in view_rows}
+                ),
+                "flush_without_triggers_ms": without_trigger * 1000,
+                "flush_with_triggers_ms": with_trigger * 1000,
+            }
+        ],
+        history_rows=history_rows,
+        tickers=tickers_count,
+        view_lookups=view_lookups,
+        rolling_lookups=rolling_lookups,
+        flush_size=flush_size,
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--history-rows", type=int, default=50_000_000)
+    parser.add_argument("--tickers", type=int, default=2000)
+    parser.add_argument("--view-lookups", type=int, default=5)
+    parser.add_argument("--rolling-lookups", type=int, default=1000)
+    parser.add_argument("--flush-size", type=int, default=2000)
+    args = parser.parse_args()
+
+    asyncio.run(
+        main(
+            args.history_rows,
+            args.tickers,
+            args.view_lookups,
+            args.rolling_lookups,
+            args.flush_size,
+        )
+    )
@@ -0,0 +1,122 @@
+"""Taking ownership of the collected tickers: deepcopy + clear vs TickerStore swap.
+
+Simulates flush cycles of the consumer and reports the time spent handing the
+collected tickers over to the flush, the extra memory the hand over needs and
+the gc pause time over the whole run:
+
+    python -m benchmarks.ticker_store --symbols 2000 --flushes 200
+"""
+
+import argparse
+import gc
+import time
+import tracemalloc
+from copy import deepcopy
+
+from benchmarks.common import emit
+from crypto_converter.binance_consumer.ticker_store import TickerStore
+from crypto_converter.common.models import TickerRecord
+
+
+class GcPauses:
+    def __init__(self):
+        self.started_at = 0.0
+        self.total = 0.0
+        self.collections = 0
+
+    def __call__(self, phase, info):
+        if phase == "start":
+            self.started_at = time.perf_counter()
+        else:
+            self.total += time.perf_counter() - self.started_at
+            self.collections += 1
+
+
+class DeepcopyTickers:
+    """The module level dict flush_tickers used to deepcopy and clear."""
+
+    def __init__(self):
+        self.tickers = {}
+
+    def update(self, record: TickerRecord):
+        self.tickers[record.ticker_name] = record.as_dict()
+
+    def take(self) -> dict:
+        flushed = deepcopy(self.tickers)
+        self.tickers.clear()
+        return flushed
+
+
+class SwapTickers(TickerStore):
+    def take(self) -> dict:
+        return self.swap()
+
+
+def run_flushes(state, symbols: list[str], flushes: int, trace_memory: bool):
+    handover = 0.0
+    peak = 0
+
+    for flush in range(flushes):
+        for symbol in symbols:
+            state.update(TickerRecord(symbol, f"{flush}.1", flush))
+
+        if trace_memory:
+            tracemalloc.reset_peak()
+            before, _ = tracemalloc.get_traced_memory()
+
+        start = time.perf_counter()
+        flushed = state.take()
+        handover += time.perf_counter() - start
+        assert len(flushed) == len(symbols)
+
+        if trace_memory:
+            _, flush_peak = tracemalloc.get_traced_memory()
+            peak = max(peak, flush_peak - before)
+
+    return handover, peak
+
+
+def measure(state_class, symbols: list[str], flushes: int) -> dict:
+    pauses = GcPauses()
+    gc.collect()
+    gc.callbacks.append(pauses)
+
+    try:
+        handover, _ = run_flushes(state_class(), symbols, flushes, False)
+
+    finally:
+        gc.callbacks.remove(pauses)
+
+    # memory is traced in a separate run, tracemalloc skews the timings
+    tracemalloc.start()
+
+    try:
+        _, peak = run_flushes(state_class(), symbols, flushes, True)
+
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "handover_ms_per_flush": handover * 1000 / flushes,
+        "handover_peak_memory_kb": peak / 1024,
+        "gc_collections": pauses.collections,
+        "gc_pause_ms": pauses.total * 1000,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--symbols", type=int, default=2000)
+    parser.add_argument("--flushes", type=int, default=200)
+    args = parser.parse_args()
+
+    symbols = [f"sym{i}usdt" for i in range(args.symbols)]
+    emit(
+        "ticker_store",
+        [
+            {"approach": name, **measure(state, symbols, args.flushes)}
+            for name, state in (("deepcopy", DeepcopyTickers), ("swap", SwapTickers))
+        ],
+        symbols=args.symbols,
+        flushes=args.flushes,
+    )
@@ -1,6 +1,21 @@
-from fastapi import APIRouter, Depends
-from crypto_converter.api.aggregation.aggregation_service import AggregationService
-from crypto_converter.common.models import BinanceTickerAggregationInfoResponse
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator
+
+from fastapi import APIRouter, Depends, Query, Response
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import StreamingResponse
+from crypto_converter.api.aggregation.aggregation_service import (
+    CANDLE_ORIGIN,
+    AggregationService,
+    get_aggregation_service,
+)
+from crypto_converter.common.models import (
+    CANDLE_INTERVALS,
+    BinanceTickerAggregationInfoResponse,
+    BinanceTickerCandle,
+    CandleInterval,
+)
+from crypto_converter.common.settings import CANDLES_MAX_BUCKETS
 
 
 aggregation_router = APIRouter(prefix="/aggregation", tags=["exchange"])
@@ -13,9 +28,13 @@ aggregation_router = APIRouter(prefix="/aggregation", tags=["exchange"])
 )
 async def get_aggregation_data(
     ticker_name: str,
-    service: AggregationService = Depends(),
+    response: Response,
+    service: AggregationService = Depends(get_aggregation_service),
 ):
-    return await service.get_aggregated_data(ticker_name)
+    data = await service.get_aggregated_data(ticker_name)
+    # seconds the response spent in the aggregation cache, as caches do
+    response.headers["Age"] = str(int(service.age))
+    return data
 
 
 @aggregation_router.get(
@@ -25,6 +44,72 @@ async def get_aggregation_data(
 )
 async def get_aggregation_view_data(
     ticker_name: str,
-    service: AggregationService = Depends(),
+    response: Response,
+    service: AggregationService = Depends(get_aggregation_service),
+):
+    data = await service.get_aggregated_view_data(ticker_name)
+    response.headers["Age"] = str(int(service.age))
+    return data
+
+
+def as_utc(moment: datetime) -> datetime:
+    """The candles are bucketed in naive UTC, as the ticks are stored."""
+    if moment.tzinfo is None:
+        return moment
+
+    return moment.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def candle_range(
+    from_: datetime, to: datetime, step: timedelta
+) -> tuple[datetime, datetime]:
+    """`from` aligned down to its interval, so the first candle is a whole one.
+
+    Errors are reported like FastAPI reports a query parameter.
+    """
+    start = as_utc(from_)
+    start -= (start - CANDLE_ORIGIN) % step
+    end = as_utc(to)
+
+    if end <= start:
+        message = "Value error, to must be after from"
+    elif (end - start) / step > CANDLES_MAX_BUCKETS:
+        message = f"Value error, at most {CANDLES_MAX_BUCKETS} candles per request"
+    else:
+        return start, end
+
+    raise RequestValidationError(
+        [{"type": "value_error", "loc": ("query", "to"), "msg": message, "input": to}]
+    )
+
+
+async def send_chunks(first: bytes, chunks: AsyncIterator[bytes]):
+    try:
+        yield first
+
+        async for chunk in chunks:
+            yield chunk
+
+    finally:
+        # gives the connection back when the client goes away midway
+        await chunks.aclose()
+
+
+@aggregation_router.get(
+    "/candles",
+    # documentation only, the candles are streamed as they are serialized
+    response_model=list[BinanceTickerCandle],
+)
+async def get_candles(
+    ticker_name: str,
+    interval: CandleInterval,
+    from_: datetime = Query(alias="from"),
+    to: datetime = Query(),
+    service: AggregationService = Depends(get_aggregation_service),
 ):
-    return await service.get_aggregated_view_data(ticker_name)
+    step = CANDLE_INTERVALS[interval]
+    start, end = candle_range(from_, to, step)
+    chunks = service.stream_candles(ticker_name, step, start, end)
+    # the query runs before the response starts, so its errors still get a status
+    first = await anext(chunks)
+    return StreamingResponse(send_chunks(first, chunks), media_type="application/json")
@@ -0,0 +1,113 @@
+import time
+from collections import OrderedDict
+
+from crypto_converter.common.metrics import metrics
+from crypto_converter.common.models import (
+    BinanceTickerAggregationInfoResponse,
+    TickerRecord,
+)
+from crypto_converter.common.settings import (
+    AGGREGATION_CACHE_SIZE,
+    AGGREGATION_CACHE_TTL,
+)
+
+# the endpoints cached per ticker: /aggregation/ and /aggregation/view
+AGGREGATION_KINDS = ("data", "view")
+
+
+class AggregationCache:
+    """Per ticker LRU of the aggregation responses, for at most `ttl` seconds.
+
+    Aggregates only move when the consumer inserts new prices, which it does
+    before publishing them on the tickers channel, flagged as inserted.
+    Registered as an insert listener of the ticker cache subscription, the
+    entries of a ticker are dropped as soon as a row of it is published, be it
+    a new price, a forced write of the same one or any ticker with
+    FLUSH_CHANGED_ONLY disabled; heartbeats, which insert nothing, keep them.
+    The TTL bounds the age of whatever an unnoticed change could leave behind,
+    e.g. a trigger run without the consumer.
+    """
+
+    def __init__(
+        self, ttl: float = AGGREGATION_CACHE_TTL, max_size: int = AGGREGATION_CACHE_SIZE
+    ):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.entries: OrderedDict[
+            tuple[str, str], tuple[float, BinanceTickerAggregationInfoResponse]
+        ] = OrderedDict()
+        # bumped by every invalidation, a read racing with one is not cached
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0
+
+    def get(
+        self, kind: str, ticker_name: str
+    ) -> tuple[BinanceTickerAggregationInfoResponse, float] | None:
+        """The cached response and its age in seconds."""
+        entry = self.entries.get((kind, ticker_name))
+        age = time.monotonic() - entry[0] if entry else None
+
+        if entry is None or age >= self.ttl:
+            self.misses += 1
+            metrics.inc("aggregation_cache_misses")
+            metrics.set(
+                "aggregation_cache_hit_ratio", self.hits / (self.hits + self.misses)
+            )
+            return None
+
+        self.entries.move_to_end((kind, ticker_name))
+        self.hits += 1
+        metrics.inc("aggregation_cache_hits")
+        metrics.set(
+            "aggregation_cache_hit_ratio", self.hits / (self.hits + self.misses)
+        )
+        metrics.observe("aggregation_cache_served_age_seconds", age)
+        return entry[1], age
+
+    def put(
+        self,
+        kind: str,
+        ticker_name: str,
+        response: BinanceTickerAggregationInfoResponse,
+        version: int,
+    ):
+        if not self.enabled or version != self.version:
+            return
+
+        self.entries[(kind, ticker_name)] = time.monotonic(), response
+        self.entries.move_to_end((kind, ticker_name))
+
+        if len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+            metrics.inc("aggregation_cache_evictions")
+
+        metrics.set("aggregation_cache_size", len(self.entries))
+
+    def invalidate(self, records: list[TickerRecord]):
+        """Drops the entries of the tickers just inserted in postgres."""
+        invalidated = 0
+
+        for record in records:
+            for kind in AGGREGATION_KINDS:
+                invalidated += (kind, record.ticker_name) in self.entries
+                self.entries.pop((kind, record.ticker_name), None)
+
+        self.version += 1
+        metrics.inc("aggregation_cache_invalidations", invalidated)
+        metrics.set("aggregation_cache_size", len(self.entries))
+
+    def clear(self):
+        self.version += 1
+        self.entries.clear()
+        metrics.set("aggregation_cache_size", 0)
+
+
+aggregation_cache = AggregationCache()
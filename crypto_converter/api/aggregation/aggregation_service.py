@@ -1,21 +1,120 @@
-from sqlalchemy.orm import joinedload
+from datetime import datetime, timedelta
+from typing import AsyncIterator
+
+from sqlalchemy.orm import contains_eager
+from crypto_converter.api.aggregation.aggregation_cache import (
+    AggregationCache,
+    aggregation_cache,
+)
+from crypto_converter.api.exchange.ticker_cache import TickerCache, ticker_cache
 from crypto_converter.common.models import (
+    CANDLE_INTERVALS,
     BinanceTickerAggregationInfoResponse,
 )
-from crypto_converter.database.db import get_db_session
-from crypto_converter.database.db_models import BinanceTickerAggregatedData
+from crypto_converter.database.db import get_db_connection, get_db_session
+from crypto_converter.database.db_models import (
+    BinanceTickerAggregatedData,
+    BinanceTickersModel,
+)
 from sqlalchemy import select, text
 
+# date_bin() origin, a midnight so every interval starts on a whole one
+CANDLE_ORIGIN = datetime(2000, 1, 1)
+# candles fetched from the server side cursor, and sent, at a time
+CANDLES_CHUNK_SIZE = 1000
+CANDLES_FILTER = """
+    FROM binance_tickers_minute_candles
+    WHERE ticker_id IN (
+        SELECT id FROM binance_tickers_list WHERE ticker_name = :ticker_name
+    )
+        AND bucket >= :start AND bucket < :end
+"""
+MINUTE_CANDLES_SQL = f"""
+    SELECT bucket, open, high, low, close, ticks
+    {CANDLES_FILTER}
+    ORDER BY bucket
+"""
+# the open of the first minute and the close of the last one in each interval
+ROLLED_UP_CANDLES_SQL = f"""
+    SELECT
+        date_bin(:step, bucket, :origin),
+        (array_agg(open ORDER BY bucket))[1],
+        MAX(high),
+        MIN(low),
+        (array_agg(close ORDER BY bucket DESC))[1],
+        SUM(ticks)
+    {CANDLES_FILTER}
+    GROUP BY 1
+    ORDER BY 1
+"""
+
+
+def candle_json(row) -> bytes:
+    # by hand, nothing in a candle needs escaping; :f as str() would turn
+    # small prices to exponents
+    open_time, open_, high, low, close, ticks = row
+    return (
+        f'{{"open_time":"{open_time.isoformat()}","open":"{open_:f}",'
+        f'"high":"{high:f}","low":"{low:f}","close":"{close:f}","ticks":{ticks}}}'
+    ).encode()
+
 
 class AggregationService:
+    """Aggregated prices, served from the aggregation cache when possible.
+
+    The cache is only used while the ticker cache is subscribed, as that
+    subscription carries its invalidations. `age` is how old the last
+    returned response is, in seconds, 0 when it was just read.
+    """
+
+    def __init__(
+        self,
+        cache: AggregationCache = aggregation_cache,
+        subscription: TickerCache = ticker_cache,
+    ):
+        self.cache = cache
+        self.subscription = subscription
+        self.age = 0.0
+
     async def get_aggregated_data(
         self, ticker_name: str
+    ) -> BinanceTickerAggregationInfoResponse:
+        return await self.cached("data", ticker_name, self.read_aggregated_data)
+
+    async def get_aggregated_view_data(
+        self, ticker_name: str
+    ) -> BinanceTickerAggregationInfoResponse:
+        return await self.cached("view", ticker_name, self.read_aggregated_view_data)
+
+    async def cached(
+        self, kind: str, ticker_name: str, read
+    ) -> BinanceTickerAggregationInfoResponse:
+        use_cache = self.cache.enabled and self.subscription.live
+        cached = self.cache.get(kind, ticker_name) if use_cache else None
+
+        if cached is not None:
+            response, self.age = cached
+            return response
+
+        version = self.cache.version
+        response = await read(ticker_name)
+        self.age = 0.0
+
+        if use_cache:
+            self.cache.put(kind, ticker_name, response, version)
+
+        return response
+
+    async def read_aggregated_data(
+        self, ticker_name: str
     ) -> BinanceTickerAggregationInfoResponse:
         async with get_db_session() as session:
+            # a join on the indexed ticker name instead of an EXISTS per row
             stmt = (
                 select(BinanceTickerAggregatedData)
-                .options(joinedload(BinanceTickerAggregatedData.ticker))
-                .where(BinanceTickerAggregatedData.ticker.has(ticker_name=ticker_name))
+                .join(BinanceTickerAggregatedData.ticker)
+                .options(contains_eager(BinanceTickerAggregatedData.ticker))
+                .where(BinanceTickersModel.ticker_name == ticker_name)
             )
             result = await session.execute(stmt)
             agg_data = result.scalars().first()
@@ -28,16 +127,22 @@ class AggregationService:
             timestamp=agg_data.created_at,
         )
 
-    async def get_aggregated_view_data(
+    async def read_aggregated_view_data(
         self, ticker_name: str
     ) -> BinanceTickerAggregationInfoResponse:
         async with get_db_session() as session:
+            # the rolling 24h aggregates are kept per ticker, a primary key lookup
             stmt = text(
                 """
-                SELECT *
-                FROM aggregated_binance_prices
-                JOIN binance_tickers_list
-                    ON aggregated_binance_prices.ticker_id = binance_tickers_list.id
+                SELECT
+                    binance_tickers_list.ticker_name,
+                    rolling.min_price,
+                    rolling.avg_price,
+                    rolling.max_price,
+                    rolling.created_at
+                FROM binance_tickers_list
+                JOIN binance_tickers_rolling_prices rolling
+                    ON rolling.ticker_id = binance_tickers_list.id
                 WHERE binance_tickers_list.ticker_name = :ticker_name
             """
             ).bindparams(ticker_name=ticker_name)
@@ -54,3 +159,35 @@ class AggregationService:
             )
         else:
             raise ValueError("No data found for the specified ticker.")
+
+    async def stream_candles(
+        self, ticker_name: str, step: timedelta, start: datetime, end: datetime
+    ) -> AsyncIterator[bytes]:
+        """The candles as a json array, sent as they are read from the database.
+
+        Minute candles are read as stored, longer ones are rolled up from
+        them: a month of 1h candles reads the same rows as the 1m ones.
+        """
+        if step == CANDLE_INTERVALS["1m"]:
+            stmt = text(MINUTE_CANDLES_SQL)
+        else:
+            stmt = text(ROLLED_UP_CANDLES_SQL).bindparams(
+                step=step, origin=CANDLE_ORIGIN
+            )
+
+        stmt = stmt.bindparams(ticker_name=ticker_name, start=start, end=end)
+
+        async with get_db_connection() as connection:
+            result = await connection.stream(stmt)
+            separator = b"["
+
+            async for rows in result.partitions(CANDLES_CHUNK_SIZE):
+                yield separator + b",".join(candle_json(row) for row in rows)
+                separator = b","
+
+        yield b"[]" if separator == b"[" else b"]"
+
+
+async def get_aggregation_service() -> AggregationService:
+    # a coroutine, FastAPI would build the class in its thread pool
+    return AggregationService()
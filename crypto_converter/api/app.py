@@ -1,32 +1,129 @@
+import asyncio
+import multiprocessing
+from contextlib import asynccontextmanager
+
+import redis.asyncio as redis
 import uvicorn
 from fastapi import FastAPI
-from fastapi.encoders import decimal_encoder
 from crypto_converter.api.aggregation.aggregation_api import aggregation_router
 from crypto_converter.common.exception_handlers import common_exception_handler
 from crypto_converter.api.exchange.exchange_api import exchange_router
+from crypto_converter.api.exchange.routing import routing_table
+from crypto_converter.api.exchange.ticker_cache import ticker_cache
+from crypto_converter.api.exchange.ticker_table_sidecar import (
+    ticker_table_sidecar_main,
+)
+from crypto_converter.api.metrics_api import metrics_router
+from crypto_converter.common.common import (
+    check_redis,
+    configure_logger,
+    create_redis_pool,
+)
+from crypto_converter.common.settings import (
+    EXCHANGE_API_HOST,
+    EXCHANGE_API_LOOP,
+    EXCHANGE_API_PORT,
+    EXCHANGE_API_WORKERS,
+    TICKER_TABLE_ENABLED,
+    TICKER_TABLE_PATH,
+    TICKER_TABLE_SLOTS,
+)
+from crypto_converter.common.ticker_table import TickerTable
+
+logger = configure_logger(__name__)
+
+
+def open_ticker_table() -> TickerTable | None:
+    if not TICKER_TABLE_ENABLED:
+        return None
+
+    try:
+        ticker_table = TickerTable.open(TICKER_TABLE_PATH)
+
+    except (OSError, ValueError) as e:
+        logger.error("Ticker table unavailable, reading redis instead: %s", e)
+        return None
+
+    # the symbols known so far, before the first published flush
+    routing_table.update(ticker_table.records())
+    return ticker_table
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    app.state.redis_pool = create_redis_pool()
+    app.state.redis_client = redis.StrictRedis(connection_pool=app.state.redis_pool)
+
+    if not await check_redis(app.state.redis_client):
+        # the pool reconnects by itself, conversions fail until it does
+        logger.warning("Exchange API starting without redis")
+
+    app.state.ticker_table = open_ticker_table()
+    cache_listener = asyncio.create_task(ticker_cache.listen(app.state.redis_client))
+
+    yield
+
+    cache_listener.cancel()
+
+    try:
+        await cache_listener
+
+    except asyncio.CancelledError:
+        pass
+
+    await app.state.redis_client.aclose()
+    await app.state.redis_pool.disconnect()
+
+    if app.state.ticker_table is not None:
+        app.state.ticker_table.close()
 
 
 def create_fastapi_app():
     app = FastAPI(
+        lifespan=lifespan,
         title="Crypto Converter",
         description="Converts the Crypto using Binance rates",
         version="1.0.0.",
-        json_encode=decimal_encoder,
     )
     app.include_router(exchange_router)
     app.include_router(aggregation_router)
+    app.include_router(metrics_router)
     app.add_exception_handler(Exception, common_exception_handler)
     return app
 
 
 def start_exchange_api():
-    app = create_fastapi_app()
-    app.json_encoder = decimal_encoder
-    uvicorn.run(
-        app,
-        host="0.0.0.0",
-        port=8000,
-    )
+    """Runs EXCHANGE_API_WORKERS uvicorn workers, plus the ticker table sidecar.
+
+    The workers are separate processes, each building its own app, the
+    table is created before they start so they all map the same file.
+    """
+    sidecar = None
+
+    if TICKER_TABLE_ENABLED:
+        TickerTable.create(TICKER_TABLE_PATH, TICKER_TABLE_SLOTS).close()
+        sidecar = multiprocessing.Process(
+            target=ticker_table_sidecar_main,
+            args=(TICKER_TABLE_PATH,),
+            name="ticker-table-sidecar",
+            daemon=True,
+        )
+        sidecar.start()
+
+    try:
+        uvicorn.run(
+            "crypto_converter.api.app:create_fastapi_app",
+            factory=True,
+            host=EXCHANGE_API_HOST,
+            port=EXCHANGE_API_PORT,
+            workers=EXCHANGE_API_WORKERS,
+            loop=EXCHANGE_API_LOOP,
+        )
+
+    finally:
+        if sidecar is not None:
+            sidecar.terminate()
+            sidecar.join()
 
 
 if __name__ == "__main__":
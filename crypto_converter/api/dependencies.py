@@ -0,0 +1,24 @@
+import redis.asyncio as redis
+from starlette.requests import HTTPConnection
+
+from crypto_converter.common.settings import TICKER_TABLE_MAX_AGE
+from crypto_converter.common.ticker_table import TickerTable
+
+
+async def get_redis_client(connection: HTTPConnection) -> redis.StrictRedis:
+    """Client over the process wide pool the app lifespan opened.
+
+    The dependencies are coroutines, FastAPI would run plain functions in its
+    thread pool: a thread hop per dependency and request, for an attribute.
+    """
+    return connection.app.state.redis_client
+
+
+async def get_ticker_table(connection: HTTPConnection) -> TickerTable | None:
+    """The shared ticker table, None when disabled or not in sync with redis."""
+    ticker_table = connection.app.state.ticker_table
+
+    if ticker_table is None or not ticker_table.is_live(TICKER_TABLE_MAX_AGE):
+        return None
+
+    return ticker_table
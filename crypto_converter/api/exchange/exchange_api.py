@@ -1,17 +1,218 @@
-from fastapi import APIRouter, Depends
+import asyncio
+from typing import Annotated, Any
 
-from crypto_converter.common.models import ExchangeBid, ExchangeResponse
-from crypto_converter.api.exchange.exchange_service import ExchangeService
+from fastapi import APIRouter, Body, Depends, Request, Response, WebSocket, status
+from fastapi.exceptions import RequestValidationError
+from pydantic import TypeAdapter, ValidationError
+
+from crypto_converter.common.models import (
+    ExchangeBatchItem,
+    ExchangeBid,
+    ExchangeResponse,
+    ExchangeStreamItem,
+)
+from crypto_converter.common.settings import EXCHANGE_BATCH_MAX_SIZE, STREAM_MAX_BIDS
+from crypto_converter.api.exchange.exchange_service import (
+    ExchangeService,
+    get_exchange_service,
+)
+from crypto_converter.api.exchange.quote_stream import (
+    QuoteHub,
+    QuoteSubscription,
+    get_quote_hub,
+)
 
 exchange_router = APIRouter(prefix="/exchange", tags=["exchange"])
+exchange_batch_adapter = TypeAdapter(list[ExchangeBatchItem])
+exchange_stream_adapter = TypeAdapter(list[ExchangeStreamItem])
+
+
+def parse_exchange_bid(body: bytes) -> ExchangeBid:
+    """Parses and validates the raw body in a single pydantic-core pass.
+
+    Errors are reported like FastAPI reports a body parameter.
+    """
+    try:
+        return ExchangeBid.model_validate_json(body)
+
+    except ValidationError as e:
+        raise RequestValidationError(
+            [{**error, "loc": ("body", *error["loc"])} for error in e.errors()],
+            body=body,
+        )
 
 
 @exchange_router.post(
-    "/", response_model=ExchangeResponse, response_model_by_alias=True
+    "/",
+    response_model=ExchangeResponse,
+    response_model_by_alias=True,
+    response_model_exclude_none=True,
+    # the body is read by hand, documented here instead
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/json": {
+                    "schema": ExchangeBid.model_json_schema(by_alias=True)
+                }
+            },
+        }
+    },
 )
 async def exchange_currency(
-    exchange_bid: ExchangeBid,
-    service: ExchangeService = Depends(),
+    request: Request,
+    service: ExchangeService = Depends(get_exchange_service),
 ):
-    data = await service.exchange(exchange_bid)
-    return data
+    # no body parameter, FastAPI would decode the json and validate the dict
+    # in two passes, and the response is returned already serialized (and
+    # possibly memoized, see ResponseMemo) so response_model is docs only
+    exchange_bid = parse_exchange_bid(await request.body())
+    return Response(
+        content=await service.exchange_json(exchange_bid),
+        media_type="application/json",
+    )
+
+
+@exchange_router.post(
+    "/batch",
+    response_model=list[ExchangeBatchItem],
+    response_model_by_alias=True,
+    response_model_exclude_none=True,
+)
+async def exchange_currency_batch(
+    bids: Annotated[
+        list[dict[str, Any]], Body(min_length=1, max_length=EXCHANGE_BATCH_MAX_SIZE)
+    ],
+    service: ExchangeService = Depends(get_exchange_service),
+):
+    # serialized in one go, validating and encoding a thousand items through
+    # response_model would cost as much as the conversions themselves
+    items = await service.exchange_batch(bids)
+    return Response(
+        content=exchange_batch_adapter.dump_json(
+            items, by_alias=True, exclude_none=True
+        ),
+        media_type="application/json",
+    )
+
+
+async def receive_bids(websocket: WebSocket) -> list | None:
+    """The bids a stream starts with, None once it is closed over invalid ones."""
+    try:
+        bids = await websocket.receive_json()
+
+    # a binary frame has no text, a text one may not be json
+    except (KeyError, ValueError):
+        bids = None
+
+    if isinstance(bids, list) and 0 < len(bids) <= STREAM_MAX_BIDS:
+        return bids
+
+    await websocket.close(
+        status.WS_1008_POLICY_VIOLATION,
+        f"Send a list of 1 to {STREAM_MAX_BIDS} bids",
+    )
+    return None
+
+
+@exchange_router.websocket("/stream")
+async def stream_quotes(
+    websocket: WebSocket,
+    service: ExchangeService = Depends(get_exchange_service),
+    hub: QuoteHub = Depends(get_quote_hub),
+):
+    """Streams the quotes of a set of bids whenever one of their tickers moves.
+
+    The client sends a json list of bids once, then receives json lists of
+    items like the batch ones, with the `index` of the bid they quote. The
+    first message quotes every bid.
+    """
+    await websocket.accept()
+    bids = await receive_bids(websocket)
+
+    if bids is None:
+        return
+
+    items, prepared_bids = service.prepare_bids(bids)
+    prepared_by_index = {
+        prepared_bid.index: prepared_bid for prepared_bid in prepared_bids
+    }
+
+    async def send(indexes: list[int]):
+        ticker_names = {
+            ticker_name
+            for index in indexes
+            for ticker_name in prepared_by_index[index].ticker_names
+        }
+        tickers = hub.checked_tickers(list(ticker_names))
+        quotes = []
+
+        for index in indexes:
+            item = await service.quote(prepared_by_index[index], tickers)
+            quotes.append(
+                ExchangeStreamItem.model_construct(
+                    index=index, result=item.result, error=item.error
+                )
+            )
+
+        await websocket.send_text(
+            exchange_stream_adapter.dump_json(
+                quotes, by_alias=True, exclude_none=True
+            ).decode()
+        )
+
+    invalid = [
+        ExchangeStreamItem(index=index, error=item.error)
+        for index, item in enumerate(items)
+        if item is not None
+    ]
+
+    if invalid:
+        await websocket.send_text(
+            exchange_stream_adapter.dump_json(
+                invalid, by_alias=True, exclude_none=True
+            ).decode()
+        )
+
+    if not prepared_bids:
+        await websocket.close()
+        return
+
+    subscription = QuoteSubscription(
+        {
+            prepared_bid.index: prepared_bid.ticker_names
+            for prepared_bid in prepared_bids
+        },
+        send,
+    )
+
+    async def wait_for_disconnect():
+        while (await websocket.receive())["type"] != "websocket.disconnect":
+            pass
+
+    # subscribed before the snapshot is read, so no update published meanwhile
+    # is missed
+    hub.subscribe(subscription)
+    tasks = []
+
+    try:
+        hub.seed(
+            subscription,
+            await service.get_tickers_snapshot(subscription.ticker_names),
+        )
+        tasks = [
+            asyncio.create_task(subscription.run()),
+            asyncio.create_task(wait_for_disconnect()),
+        ]
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+
+        if tasks[0] in done and isinstance(tasks[0].exception(), TimeoutError):
+            await websocket.close(
+                status.WS_1008_POLICY_VIOLATION, "Quotes are not read fast enough"
+            )
+
+    finally:
+        hub.unsubscribe(subscription)
+
+        for task in tasks:
+            task.cancel()
@@ -1,27 +1,237 @@
-from decimal import localcontext
+from decimal import Decimal, localcontext
+from typing import Any, Mapping, NamedTuple
 
-from fastapi import Depends
-from redis import StrictRedis
+from pydantic import ValidationError
+from redis.asyncio import StrictRedis
+from starlette.requests import HTTPConnection
 
-from crypto_converter.common.common import connect_to_redis
+from crypto_converter.api.dependencies import get_redis_client, get_ticker_table
+from crypto_converter.api.exchange.response_memo import ResponseMemo, response_memo
+from crypto_converter.api.exchange.routing import (
+    RouteLeg,
+    RoutingTable,
+    routing_table,
+)
+from crypto_converter.api.exchange.ticker_cache import TickerCache, ticker_cache
 from crypto_converter.common.exceptions import NoValidTickerAvailableForTicker
+from crypto_converter.common.metrics import metrics
 from crypto_converter.common.models import (
     BinanceTicker,
+    ExchangeBatchError,
+    ExchangeBatchItem,
     ExchangeBid,
+    ExchangeLeg,
     ExchangeResponse,
     quote_price_precision,
     target_precision,
 )
+from crypto_converter.common.settings import REDIS_TICKER_KEY, REDIS_TICKER_LAYOUT
+from crypto_converter.common.ticker_layout import SNAPSHOT_LAYOUT, decode_price_field
+from crypto_converter.common.ticker_table import TickerTable
+
+
+class PreparedBid(NamedTuple):
+    index: int
+    exchange_bid: ExchangeBid
+    ticker: str
+    legs: tuple[RouteLeg, ...] | None
+
+    @property
+    def ticker_names(self) -> list[str]:
+        return [leg.ticker_name for leg in self.legs or (RouteLeg(self.ticker),)]
+
+
+def format_amount(value: Decimal, precision: int) -> str:
+    return format(value.normalize(), f".{precision}f").rstrip("0").rstrip(".")
+
+
+def format_amounts(exchange_bid: ExchangeBid, result: Decimal) -> dict[str, str]:
+    """amount_from and amount_to of a response, the computed one with its asset."""
+    if exchange_bid.amount_from:
+        return {
+            "amount_from": format_amount(
+                exchange_bid.amount_from, quote_price_precision
+            ),
+            "amount_to": format_amount(result, target_precision) + exchange_bid.to_,
+        }
+
+    return {
+        "amount_from": format_amount(result, target_precision) + exchange_bid.from_,
+        "amount_to": format_amount(exchange_bid.amount_to, quote_price_precision),
+    }
 
 
 class ExchangeService:
-    def __init__(self, redis_client: StrictRedis = Depends(connect_to_redis)):
+    layout = REDIS_TICKER_LAYOUT
+    ticker_key = REDIS_TICKER_KEY
+
+    def __init__(
+        self,
+        redis_client: StrictRedis,
+        ticker_cache: TickerCache,
+        routing_table: RoutingTable,
+        ticker_table: TickerTable | None,
+        response_memo: ResponseMemo,
+    ):
         self.redis_client = redis_client
+        self.ticker_cache = ticker_cache
+        self.routing_table = routing_table
+        self.ticker_table = ticker_table
+        self.response_memo = response_memo
 
     async def exchange(self, exchange_bid: ExchangeBid) -> ExchangeResponse:
+        prepared_bid = self.prepare_bid(exchange_bid)
+        leg_tickers = [
+            await self.get_ticker(ticker_name)
+            for ticker_name in prepared_bid.ticker_names
+        ]
+        return await self.convert(prepared_bid, leg_tickers)
+
+    async def exchange_json(self, exchange_bid: ExchangeBid) -> bytes:
+        """The serialized response, memoized per bid and ticker versions."""
+        prepared_bid = self.prepare_bid(exchange_bid)
+        leg_tickers = [
+            await self.get_ticker(ticker_name)
+            for ticker_name in prepared_bid.ticker_names
+        ]
+        key = self.response_memo.key(exchange_bid, leg_tickers)
+        content = self.response_memo.get(key)
+
+        if content is None:
+            response = await self.convert(prepared_bid, leg_tickers)
+            content = response.model_dump_json(by_alias=True, exclude_none=True)
+            content = content.encode()
+            self.response_memo.put(key, content)
+
+        return content
+
+    def prepare_bid(self, exchange_bid: ExchangeBid, index: int = 0) -> PreparedBid:
         ticker = f"{exchange_bid.from_}{exchange_bid.to_}"
+        legs = self.resolve_legs(exchange_bid, ticker)
+        return PreparedBid(index, exchange_bid, ticker, legs)
+
+    async def convert(
+        self, prepared_bid: PreparedBid, leg_tickers: list[BinanceTicker]
+    ) -> ExchangeResponse:
+        _, exchange_bid, ticker, legs = prepared_bid
+
+        if legs is None:
+            return await self._exchange(exchange_bid, ticker, leg_tickers[0])
+
+        return await self._exchange_route(exchange_bid, ticker, legs, leg_tickers)
+
+    def resolve_legs(
+        self, exchange_bid: ExchangeBid, ticker: str
+    ) -> tuple[RouteLeg, ...] | None:
+        """Legs of an inverse or cross rate conversion, None for a direct one.
+
+        Pairs the routing table does not know go to redis as they are, the
+        table is empty until the first flush is published.
+        """
+        legs = self.routing_table.route(exchange_bid.from_, exchange_bid.to_)
+
+        if legs is None or legs == (RouteLeg(ticker),):
+            return None
+
+        return legs
+
+    async def get_ticker(self, ticker: str) -> BinanceTicker:
+        if self.ticker_table is not None:
+            record = self.ticker_table.get(ticker)
+
+            if record is not None:
+                metrics.inc("ticker_table_hits")
+                ticker_obj = BinanceTicker(**record.as_dict())
+                ticker_obj.is_fresh()
+                return ticker_obj
+
+            metrics.inc("ticker_table_misses")
+
+        ticker_obj = self.ticker_cache.get(ticker)
+
+        if ticker_obj is not None:
+            # the cached entry carries the latest published timestamp
+            ticker_obj.is_fresh()
+            return ticker_obj
+
+        version = self.ticker_cache.version
         ticker_obj = await self.get_ticker_from_redis(ticker)
-        return await self._exchange(exchange_bid, ticker, ticker_obj)
+        self.ticker_cache.put(ticker, ticker_obj, version)
+        return ticker_obj
+
+    async def exchange_batch(self, bids: list[Any]) -> list[ExchangeBatchItem]:
+        """Converts every bid against one MULTI snapshot of the tickers.
+
+        Bids are validated one by one, so a bad bid only fails its own item.
+        The ticker cache is not used here: its entries are refreshed one by
+        one, mixing them would break the consistency of the batch.
+        """
+        items, prepared_bids = self.prepare_bids(bids)
+        snapshot = await self.get_tickers_snapshot(
+            {
+                ticker_name
+                for prepared_bid in prepared_bids
+                for ticker_name in prepared_bid.ticker_names
+            }
+        )
+
+        for prepared_bid in prepared_bids:
+            items[prepared_bid.index] = await self.quote(prepared_bid, snapshot)
+
+        return items
+
+    def prepare_bids(
+        self, bids: list[Any]
+    ) -> tuple[list[ExchangeBatchItem | None], list[PreparedBid]]:
+        """Validates and routes the bids, the invalid ones get their error item."""
+        items: list[ExchangeBatchItem | None] = [None] * len(bids)
+        prepared_bids = []
+
+        for index, bid in enumerate(bids):
+            try:
+                exchange_bid = ExchangeBid.model_validate(bid)
+
+            except ValidationError as e:
+                items[index] = ExchangeBatchItem(
+                    error=ExchangeBatchError(
+                        type="validation_error",
+                        detail=e.errors(include_url=False, include_context=False),
+                    )
+                )
+
+            else:
+                prepared_bids.append(self.prepare_bid(exchange_bid, index))
+
+        return items, prepared_bids
+
+    async def quote(
+        self,
+        prepared_bid: PreparedBid,
+        tickers: Mapping[str, BinanceTicker | NoValidTickerAvailableForTicker],
+    ) -> ExchangeBatchItem:
+        """Converts a prepared bid with already fetched and checked tickers."""
+        leg_tickers = [
+            tickers.get(ticker_name)
+            or NoValidTickerAvailableForTicker(
+                f"No valid ticker available for ticker {ticker_name}"
+            )
+            for ticker_name in prepared_bid.ticker_names
+        ]
+        errors = [
+            ticker_obj
+            for ticker_obj in leg_tickers
+            if isinstance(ticker_obj, NoValidTickerAvailableForTicker)
+        ]
+
+        if errors:
+            return ExchangeBatchItem(
+                error=ExchangeBatchError(type="no_valid_ticker", detail=str(errors[0]))
+            )
+
+        result = await self.convert(prepared_bid, leg_tickers)
+
+        # the response was validated when built, no need to do it twice
+        return ExchangeBatchItem.model_construct(result=result, error=None)
 
     async def _exchange(
         self, exchange_bid: ExchangeBid, ticker: str, ticker_obj: BinanceTicker
@@ -31,32 +241,11 @@ class ExchangeService:
 
             if exchange_bid.amount_from:
                 result = exchange_bid.amount_from * ticker_obj.get_quantized_price()
-                amount_params = {
-                    "amount_from": format(
-                        exchange_bid.amount_from.normalize(),
-                        f".{quote_price_precision}f",
-                    )
-                    .rstrip("0")
-                    .rstrip("."),
-                    "amount_to": format(result.normalize(), f".{target_precision}f")
-                    .rstrip("0")
-                    .rstrip(".")
-                    + exchange_bid.to_,
-                }
 
             else:
                 result = exchange_bid.amount_to / ticker_obj.get_quantized_price()
-                amount_params = {
-                    "amount_from": format(result.normalize(), f".{target_precision}f")
-                    .rstrip("0")
-                    .rstrip(".")
-                    + exchange_bid.from_,
-                    "amount_to": format(
-                        exchange_bid.amount_to.normalize(), f".{quote_price_precision}f"
-                    )
-                    .rstrip("0")
-                    .rstrip("."),
-                }
+
+            amount_params = format_amounts(exchange_bid, result)
 
         response = ExchangeResponse(
             **{
@@ -64,18 +253,81 @@ class ExchangeService:
                 "to": exchange_bid.to_,
                 "rate_timestamp": ticker_obj.timestamp,
                 "ticker_name": ticker,
-                "ticker_price": ticker_obj.price.rstrip("0"),
+                "ticker_price": ticker_obj.get_display_price(),
                 **amount_params,
             }
         )
 
         return response
 
+    async def _exchange_route(
+        self,
+        exchange_bid: ExchangeBid,
+        ticker: str,
+        legs: tuple[RouteLeg, ...],
+        leg_tickers: list[BinanceTicker],
+    ) -> ExchangeResponse:
+        """Walks the amount through every leg, dividing by inverted ones.
+
+        Each leg uses its own quantized price, exactly like a direct
+        conversion, instead of a rounded inverse or cross rate.
+        """
+        metrics.inc("exchange_routed_total")
+        prices = [ticker_obj.get_quantized_price() for ticker_obj in leg_tickers]
+
+        with localcontext() as ctx:
+            ctx.prec = target_precision
+            rate = Decimal(1)
+
+            for leg, price in zip(legs, prices):
+                rate = rate / price if leg.inverted else rate * price
+
+            if exchange_bid.amount_from:
+                result = exchange_bid.amount_from
+
+                for leg, price in zip(legs, prices):
+                    result = result / price if leg.inverted else result * price
+
+            else:
+                result = exchange_bid.amount_to
+
+                for leg, price in zip(reversed(legs), reversed(prices)):
+                    result = result * price if leg.inverted else result / price
+
+            amount_params = format_amounts(exchange_bid, result)
+            ticker_price = format_amount(rate, target_precision)
+
+        return ExchangeResponse(
+            **{
+                "from": exchange_bid.from_,
+                "to": exchange_bid.to_,
+                "rate_timestamp": min(t.timestamp for t in leg_tickers),
+                "ticker_name": ticker,
+                "ticker_price": ticker_price,
+                "legs": [
+                    ExchangeLeg(
+                        ticker_name=leg.ticker_name,
+                        ticker_price=ticker_obj.get_display_price(),
+                        inverted=leg.inverted,
+                        rate_timestamp=ticker_obj.timestamp,
+                    )
+                    for leg, ticker_obj in zip(legs, leg_tickers)
+                ],
+                **amount_params,
+            }
+        )
+
     async def get_ticker_from_redis(self, ticker: str) -> BinanceTicker:
-        ticker_item = await self.redis_client.hgetall(ticker)
+        if self.layout == SNAPSHOT_LAYOUT:
+            ticker_obj = self.ticker_from_price_field(
+                ticker, await self.redis_client.hget(self.ticker_key, ticker)
+            )
+
+        else:
+            ticker_item = await self.redis_client.hgetall(ticker)
+            ticker_obj = BinanceTicker.from_redis(ticker_item) if ticker_item else None
 
-        if ticker_item:
-            ticker_obj = BinanceTicker.from_redis(ticker_item)
+        if ticker_obj is not None:
             ticker_obj.is_fresh()
             return ticker_obj
 
@@ -83,3 +335,92 @@ class ExchangeService:
             raise NoValidTickerAvailableForTicker(
                 "No valid ticker available for ticker %s", ticker
             )
+
+    @staticmethod
+    def ticker_from_price_field(
+        ticker: str, value: bytes | None
+    ) -> BinanceTicker | None:
+        if not value:
+            return None
+
+        return BinanceTicker(**decode_price_field(ticker, value).as_dict())
+
+    async def get_tickers_snapshot(
+        self, tickers: set[str]
+    ) -> dict[str, BinanceTicker | NoValidTickerAvailableForTicker]:
+        """Reads all tickers at one point in time.
+
+        That is one flush of the ticker table when it has them all, else a
+        single HMGET of the tickers hash with the snapshot layout, a
+        MULTI/EXEC of HGETALLs with the hash one. A missing or stale ticker
+        maps to the error it would have raised.
+        """
+        tickers = list(tickers)
+
+        if not tickers:
+            return {}
+
+        records = None
+
+        if self.ticker_table is not None:
+            records = self.ticker_table.get_many(tickers)
+
+        if records is not None and len(records) == len(tickers):
+            metrics.inc("ticker_table_hits", len(tickers))
+            ticker_objs = [
+                BinanceTicker(**records[ticker].as_dict()) for ticker in tickers
+            ]
+
+        elif self.layout == SNAPSHOT_LAYOUT:
+            values = await self.redis_client.hmget(self.ticker_key, tickers)
+            ticker_objs = [
+                self.ticker_from_price_field(ticker, value)
+                for ticker, value in zip(tickers, values)
+            ]
+
+        else:
+            async with self.redis_client.pipeline(transaction=True) as pipe:
+                for ticker in tickers:
+                    pipe.hgetall(ticker)
+
+                ticker_objs = [
+                    BinanceTicker.from_redis(ticker_item) if ticker_item else None
+                    for ticker_item in await pipe.execute()
+                ]
+
+        snapshot = {}
+
+        for ticker, ticker_obj in zip(tickers, ticker_objs):
+            if ticker_obj is None:
+                snapshot[ticker] = NoValidTickerAvailableForTicker(
+                    f"No valid ticker available for ticker {ticker}"
+                )
+                continue
+
+            try:
+                ticker_obj.is_fresh()
+
+            except NoValidTickerAvailableForTicker as e:
+                snapshot[ticker] = e
+
+            else:
+                snapshot[ticker] = ticker_obj
+
+        return snapshot
+
+
+async def get_exchange_service(connection: HTTPConnection) -> ExchangeService:
+    """The service over the process wide tickers, as a single dependency.
+
+    FastAPI solves the whole dependency tree on every request, a resolution
+    costing more than the conversion itself, so the singletons are wired
+    here instead of being dependencies of their own. A coroutine, as a
+    plain function or the class would be called in the thread pool.
+    """
+    return ExchangeService(
+        await get_redis_client(connection),
+        ticker_cache,
+        routing_table,
+        await get_ticker_table(connection),
+        response_memo,
+    )
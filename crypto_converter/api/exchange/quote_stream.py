@@ -0,0 +1,169 @@
+import asyncio
+from collections import defaultdict
+from typing import Awaitable, Callable
+
+from crypto_converter.common.common import configure_logger
+from crypto_converter.common.exceptions import NoValidTickerAvailableForTicker
+from crypto_converter.common.metrics import metrics
+from crypto_converter.common.models import BinanceTicker, TickerRecord
+from crypto_converter.common.settings import STREAM_SEND_TIMEOUT
+
+logger = configure_logger(__name__)
+
+
+class QuoteSubscription:
+    """The bids of one streaming client and which of them need a new quote.
+
+    Ticker changes only mark the bids depending on them as dirty, the sender
+    computes their quotes from the latest tickers once it is done with the
+    previous message. A slow client therefore skips intermediate prices
+    instead of queueing them, and its memory stays bounded by its bids.
+    """
+
+    def __init__(
+        self,
+        bid_tickers: dict[int, list[str]],
+        send: Callable[[list[int]], Awaitable[None]],
+        send_timeout: float = STREAM_SEND_TIMEOUT,
+    ):
+        self.bids_by_ticker: dict[str, list[int]] = defaultdict(list)
+
+        for index, ticker_names in bid_tickers.items():
+            for ticker_name in ticker_names:
+                self.bids_by_ticker[ticker_name].append(index)
+
+        self.send = send
+        self.send_timeout = send_timeout
+        self.dirty: set[int] = set(bid_tickers)
+        self.wakeup = asyncio.Event()
+        self.wakeup.set()
+
+    @property
+    def ticker_names(self) -> set[str]:
+        return set(self.bids_by_ticker)
+
+    def notify(self, ticker_name: str):
+        self.dirty.update(self.bids_by_ticker[ticker_name])
+        self.wakeup.set()
+
+    async def run(self):
+        while True:
+            await self.wakeup.wait()
+            self.wakeup.clear()
+            dirty, self.dirty = sorted(self.dirty), set()
+            metrics.inc("quote_stream_messages")
+
+            # a client not reading for send_timeout is dropped, see the caller
+            await asyncio.wait_for(self.send(dirty), self.send_timeout)
+
+
+class QuoteHub:
+    """Fans the published tickers out to the subscriptions depending on them.
+
+    Registered as a listener of the ticker cache subscription, so there is a
+    single redis subscriber per API process whatever the number of clients.
+    Only the tickers somebody streams are kept, and only a price change
+    notifies: heartbeats just refresh the timestamp of the kept ticker.
+    """
+
+    def __init__(self):
+        self.subscriptions: dict[str, set[QuoteSubscription]] = defaultdict(set)
+        self.tickers: dict[str, BinanceTicker] = {}
+
+    def __len__(self):
+        return len(set().union(*self.subscriptions.values()))
+
+    def subscribe(self, subscription: QuoteSubscription):
+        for ticker_name in subscription.ticker_names:
+            self.subscriptions[ticker_name].add(subscription)
+
+        metrics.set("quote_stream_tickers", len(self.subscriptions))
+
+    def seed(
+        self,
+        subscription: QuoteSubscription,
+        snapshot: dict[str, BinanceTicker | NoValidTickerAvailableForTicker],
+    ):
+        """Keeps the snapshot read after subscribing, unless an update is newer.
+
+        Subscribing first means nothing published while the snapshot is read
+        is missed, and the newer of the two wins.
+        """
+        for ticker_name in subscription.ticker_names:
+            ticker_obj = snapshot.get(ticker_name)
+            current = self.tickers.get(ticker_name)
+
+            if isinstance(ticker_obj, BinanceTicker) and (
+                current is None or current.timestamp < ticker_obj.timestamp
+            ):
+                self.tickers[ticker_name] = ticker_obj
+
+    def unsubscribe(self, subscription: QuoteSubscription):
+        for ticker_name in subscription.ticker_names:
+            subscriptions = self.subscriptions.get(ticker_name)
+
+            if subscriptions is None:
+                continue
+
+            subscriptions.discard(subscription)
+
+            if not subscriptions:
+                del self.subscriptions[ticker_name]
+                self.tickers.pop(ticker_name, None)
+
+        metrics.set("quote_stream_tickers", len(self.subscriptions))
+
+    def checked_tickers(
+        self, ticker_names: list[str]
+    ) -> dict[str, BinanceTicker | NoValidTickerAvailableForTicker]:
+        checked = {}
+
+        for ticker_name in ticker_names:
+            ticker_obj = self.tickers.get(ticker_name)
+
+            if ticker_obj is None:
+                continue
+
+            try:
+                ticker_obj.is_fresh()
+
+            except NoValidTickerAvailableForTicker as e:
+                checked[ticker_name] = e
+
+            else:
+                checked[ticker_name] = ticker_obj
+
+        return checked
+
+    def update(self, records: list[TickerRecord]):
+        notified = 0
+
+        for record in records:
+            subscriptions = self.subscriptions.get(record.ticker_name)
+
+            if not subscriptions:
+                continue
+
+            current = self.tickers.get(record.ticker_name)
+            self.tickers[record.ticker_name] = BinanceTicker(
+                ticker_name=record.ticker_name,
+                price=record.price,
+                timestamp=record.timestamp,
+            )
+
+            if current is not None and current.price == record.price:
+                continue
+
+            for subscription in subscriptions:
+                subscription.notify(record.ticker_name)
+
+            notified += len(subscriptions)
+
+        metrics.inc("quote_stream_notifications", notified)
+
+
+quote_hub = QuoteHub()
+
+
+async def get_quote_hub() -> QuoteHub:
+    return quote_hub
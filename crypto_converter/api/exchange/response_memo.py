@@ -0,0 +1,79 @@
+from collections import OrderedDict
+from decimal import Decimal
+from typing import Hashable
+
+from crypto_converter.common.metrics import metrics
+from crypto_converter.common.models import BinanceTicker, ExchangeBid
+from crypto_converter.common.settings import (
+    RESPONSE_MEMO_ENABLED,
+    RESPONSE_MEMO_SIZE,
+)
+
+
+class ResponseMemo:
+    """Bounded LRU of serialized /exchange/ responses.
+
+    Identical bids quoted off the same ticker versions get the same bytes
+    back, without the Decimal math and the serialization. The key carries
+    the name and timestamp of every ticker the conversion used, so a new
+    flush of one of them simply stops matching: nothing to invalidate, the
+    entries of the old version age out of the LRU.
+    """
+
+    def __init__(
+        self, max_size: int = RESPONSE_MEMO_SIZE, enabled: bool = RESPONSE_MEMO_ENABLED
+    ):
+        self.max_size = max_size
+        self.enabled = enabled
+        self.entries: OrderedDict[Hashable, bytes] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    @staticmethod
+    def key(exchange_bid: ExchangeBid, leg_tickers: list[BinanceTicker]) -> Hashable:
+        # Decimal("1") and Decimal("1.0") are equal and answered alike
+        amount: Decimal = exchange_bid.amount_from or exchange_bid.amount_to
+
+        return (
+            exchange_bid.from_,
+            exchange_bid.to_,
+            bool(exchange_bid.amount_from),
+            amount,
+            tuple((t.ticker_name, t.timestamp) for t in leg_tickers),
+        )
+
+    def get(self, key: Hashable) -> bytes | None:
+        if not self.enabled:
+            return None
+
+        content = self.entries.get(key)
+
+        if content is None:
+            self.misses += 1
+            metrics.inc("response_memo_misses")
+
+        else:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            metrics.inc("response_memo_hits")
+
+        metrics.set("response_memo_hit_ratio", self.hits / (self.hits + self.misses))
+        return content
+
+    def put(self, key: Hashable, content: bytes):
+        if not self.enabled:
+            return
+
+        self.entries[key] = content
+
+        if len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+            metrics.inc("response_memo_evictions")
+
+        metrics.set("response_memo_size", len(self.entries))
+
+
+response_memo = ResponseMemo()
@@ -0,0 +1,141 @@
+import time
+from typing import NamedTuple
+
+from crypto_converter.common.common import configure_logger
+from crypto_converter.common.metrics import metrics
+from crypto_converter.common.models import TickerRecord, ticker_expiration
+from crypto_converter.common.settings import (
+    ROUTING_BRIDGE_ASSETS,
+    ROUTING_QUOTE_ASSETS,
+)
+
+logger = configure_logger(__name__)
+
+
+class RouteLeg(NamedTuple):
+    """One ticker of a conversion, `inverted` when it is walked quote -> base."""
+
+    ticker_name: str
+    inverted: bool = False
+
+
+def split_symbol(
+    ticker_name: str, quote_assets: tuple[str, ...] = ROUTING_QUOTE_ASSETS
+) -> tuple[str, str] | None:
+    """btcusdt -> (btc, usdt), binance symbols carry no separator.
+
+    The longest known quote asset matching the end of the name wins, so
+    fdusd is not mistaken for usd.
+    """
+    for quote in sorted(quote_assets, key=len, reverse=True):
+        if ticker_name.endswith(quote) and len(ticker_name) > len(quote):
+            return ticker_name[: -len(quote)], quote
+
+    return None
+
+
+class RoutingTable:
+    """Conversion graph over the fresh tickers, as direct and inverse legs.
+
+    Every ticker seen in a flush adds the edges base -> quote and, inverted,
+    quote -> base, so a pair resolves to the single leg converting it. Pairs
+    without one are routed over a bridge asset, tried in the configured order
+    (most liquid first): two leg lookups per bridge, a fixed number of dict
+    probes with no graph search. Only tickers appearing or going stale touch
+    the edges, a flush of known symbols just refreshes their last seen time.
+    """
+
+    def __init__(
+        self,
+        quote_assets: tuple[str, ...] = ROUTING_QUOTE_ASSETS,
+        bridge_assets: tuple[str, ...] = ROUTING_BRIDGE_ASSETS,
+        expiration: int = ticker_expiration,
+    ):
+        self.quote_assets = quote_assets
+        self.bridge_assets = bridge_assets
+        self.expiration = expiration
+        self.symbols: dict[str, tuple[str, str]] = {}
+        self.last_seen: dict[str, int] = {}
+        self.edges: dict[tuple[str, str], RouteLeg] = {}
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def add_symbol(self, ticker_name: str) -> bool:
+        assets = split_symbol(ticker_name, self.quote_assets)
+
+        if assets is None:
+            return False
+
+        base, quote = assets
+        self.symbols[ticker_name] = assets
+        self.edges[(base, quote)] = RouteLeg(ticker_name)
+        # a direct ticker always beats walking another one backwards
+        self.edges.setdefault((quote, base), RouteLeg(ticker_name, inverted=True))
+        return True
+
+    def remove_symbol(self, ticker_name: str):
+        base, quote = self.symbols.pop(ticker_name)
+        self.last_seen.pop(ticker_name, None)
+
+        for pair in ((base, quote), (quote, base)):
+            if self.edges.get(pair, RouteLeg("")).ticker_name == ticker_name:
+                del self.edges[pair]
+
+        # the reverse direction may have a ticker of its own
+        reverse_ticker = f"{quote}{base}"
+
+        if reverse_ticker in self.symbols:
+            self.add_symbol(reverse_ticker)
+
+    def update(self, records: list[TickerRecord]):
+        added = 0
+
+        for record in records:
+            if record.ticker_name not in self.symbols:
+                added += self.add_symbol(record.ticker_name)
+
+            if record.ticker_name in self.symbols:
+                self.last_seen[record.ticker_name] = record.timestamp
+
+        expired_before = (time.time() - self.expiration) * 1000
+        expired = [
+            ticker_name
+            for ticker_name, timestamp in self.last_seen.items()
+            if timestamp < expired_before
+        ]
+
+        for ticker_name in expired:
+            self.remove_symbol(ticker_name)
+
+        if added or expired:
+            logger.info(
+                "Routing table: %s symbols added, %s expired, %s total",
+                added,
+                len(expired),
+                len(self.symbols),
+            )
+
+        metrics.set("routing_table_symbols", len(self.symbols))
+
+    def route(self, from_: str, to_: str) -> tuple[RouteLeg, ...] | None:
+        leg = self.edges.get((from_, to_))
+
+        if leg is not None:
+            return (leg,)
+
+        for bridge in self.bridge_assets:
+            first = self.edges.get((from_, bridge))
+
+            if first is None:
+                continue
+
+            second = self.edges.get((bridge, to_))
+
+            if second is not None:
+                return first, second
+
+        return None
+
+
+routing_table = RoutingTable()
@@ -0,0 +1,153 @@
+import asyncio
+from collections import OrderedDict
+from typing import Callable
+
+import redis.asyncio as redis
+
+from crypto_converter.api.aggregation.aggregation_cache import aggregation_cache
+from crypto_converter.common.common import configure_logger
+from crypto_converter.common.metrics import metrics
+from crypto_converter.api.exchange.quote_stream import quote_hub
+from crypto_converter.api.exchange.routing import routing_table
+from crypto_converter.common.models import (
+    BinanceTicker,
+    TickerRecord,
+    decode_ticker_update,
+)
+from crypto_converter.common.settings import (
+    REDIS_TICKERS_CHANNEL,
+    TICKER_CACHE_ENABLED,
+    TICKER_CACHE_RECONNECT_DELAY,
+    TICKER_CACHE_SIZE,
+)
+
+logger = configure_logger(__name__)
+
+
+class TickerCache:
+    """Bounded LRU of the tickers last read from redis, kept in sync by push.
+
+    The consumer publishes every ticker it writes on `channel` (see
+    RedisTickerSink), the listener refreshes the cached entries from those
+    messages, so a hot pair is served without a redis round trip while still
+    carrying the timestamp redis has. The cache only serves while subscribed:
+    a missed message would leave an entry stale, so on disconnect it is
+    cleared and bypassed until the subscription is back.
+
+    `listeners` get every published batch of tickers as well, even with the
+    cache itself disabled, `insert_listeners` only the tickers of the batch
+    that got a new row in postgres.
+    """
+
+    def __init__(
+        self,
+        max_size: int = TICKER_CACHE_SIZE,
+        channel: str = REDIS_TICKERS_CHANNEL,
+        enabled: bool = TICKER_CACHE_ENABLED,
+        listeners: list[Callable[[list[TickerRecord]], None]] | None = None,
+        insert_listeners: list[Callable[[list[TickerRecord]], None]] | None = None,
+    ):
+        self.max_size = max_size
+        self.channel = channel
+        self.enabled = enabled
+        self.listeners = listeners or []
+        self.insert_listeners = insert_listeners or []
+        self.entries: OrderedDict[str, BinanceTicker] = OrderedDict()
+        self.live = False
+        # bumped by every applied update, a read racing with one is not cached
+        self.version = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, ticker: str) -> BinanceTicker | None:
+        if not (self.live and self.enabled):
+            return None
+
+        ticker_obj = self.entries.get(ticker)
+
+        if ticker_obj is None:
+            metrics.inc("ticker_cache_misses")
+            return None
+
+        self.entries.move_to_end(ticker)
+        metrics.inc("ticker_cache_hits")
+        return ticker_obj
+
+    def put(self, ticker: str, ticker_obj: BinanceTicker, version: int):
+        if not (self.live and self.enabled) or version != self.version:
+            return
+
+        self.entries[ticker] = ticker_obj
+        self.entries.move_to_end(ticker)
+
+        if len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+            metrics.inc("ticker_cache_evictions")
+
+        metrics.set("ticker_cache_size", len(self.entries))
+
+    def apply_update(self, records: list[TickerRecord]) -> int:
+        """Refreshes the cached tickers present in a published flush."""
+        self.version += 1
+        refreshed = 0
+
+        for record in records:
+            if record.ticker_name in self.entries:
+                self.entries[record.ticker_name] = BinanceTicker(
+                    ticker_name=record.ticker_name,
+                    price=record.price,
+                    timestamp=record.timestamp,
+                )
+                refreshed += 1
+
+        metrics.inc("ticker_cache_refreshed", refreshed)
+        return refreshed
+
+    def clear(self):
+        self.version += 1
+        self.entries.clear()
+        metrics.set("ticker_cache_size", 0)
+
+    def dispatch(self, payload: str | bytes):
+        records, inserted = decode_ticker_update(payload)
+        self.apply_update(records)
+
+        for listener in self.listeners:
+            listener(records)
+
+        if inserted:
+            for listener in self.insert_listeners:
+                listener(inserted)
+
+    async def listen(self, redis_client: redis.StrictRedis):
+        """Holds one connection of the client pool for the subscription."""
+        while True:
+            try:
+                async with redis_client.pubsub() as pubsub:
+                    await pubsub.subscribe(self.channel)
+
+                    async for message in pubsub.listen():
+                        if message["type"] == "subscribe":
+                            self.live = True
+                            logger.warning(
+                                "Ticker cache subscribed to '%s'", self.channel
+                            )
+
+                        elif message["type"] == "message":
+                            self.dispatch(message["data"])
+
+            except Exception as e:
+                logger.error("Ticker cache subscription lost: %s", e)
+
+            finally:
+                self.live = False
+                self.clear()
+
+            await asyncio.sleep(TICKER_CACHE_RECONNECT_DELAY)
+
+
+ticker_cache = TickerCache(
+    listeners=[routing_table.update, quote_hub.update],
+    insert_listeners=[aggregation_cache.invalidate],
+)
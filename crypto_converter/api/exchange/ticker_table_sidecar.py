@@ -0,0 +1,93 @@
+import asyncio
+import time
+
+import redis.asyncio as redis
+
+from crypto_converter.common.common import configure_logger, create_redis_pool
+from crypto_converter.common.models import decode_ticker_update
+from crypto_converter.common.settings import (
+    REDIS_TICKER_LAYOUT,
+    REDIS_TICKERS_CHANNEL,
+    TICKER_CACHE_RECONNECT_DELAY,
+    TICKER_TABLE_MAX_AGE,
+)
+from crypto_converter.common.ticker_layout import load_tickers
+from crypto_converter.common.ticker_table import TickerTable
+
+logger = configure_logger(__name__)
+
+
+class TickerTableSidecar:
+    """The single writer of the ticker table, next to the API workers.
+
+    Subscribes to the tickers the consumer publishes, then loads everything
+    redis has (so no flush falls between the load and the subscription) and
+    applies every published flush from there on. While subscribed it beats
+    the table heartbeat, the workers only trust a table beaten recently: on
+    a lost subscription, or a dead sidecar, they go back to redis.
+    """
+
+    def __init__(
+        self,
+        table: TickerTable,
+        channel: str = REDIS_TICKERS_CHANNEL,
+        layout: str = REDIS_TICKER_LAYOUT,
+        heartbeat_interval: float = TICKER_TABLE_MAX_AGE / 5,
+    ):
+        self.table = table
+        self.channel = channel
+        self.layout = layout
+        self.heartbeat_interval = heartbeat_interval
+
+    async def beat(self):
+        while True:
+            self.table.heartbeat = int(time.time() * 1000)
+            await asyncio.sleep(self.heartbeat_interval)
+
+    async def run(self, redis_client: redis.StrictRedis):
+        while True:
+            heartbeat = None
+
+            try:
+                async with redis_client.pubsub() as pubsub:
+                    await pubsub.subscribe(self.channel)
+
+                    async for message in pubsub.listen():
+                        if message["type"] == "subscribe":
+                            records = await load_tickers(redis_client, self.layout)
+                            self.table.write(records)
+                            heartbeat = asyncio.create_task(self.beat())
+                            logger.warning(
+                                "Ticker table loaded with %s tickers, following '%s'",
+                                len(records),
+                                self.channel,
+                            )
+
+                        elif message["type"] == "message":
+                            self.table.write(decode_ticker_update(message["data"])[0])
+
+            except Exception as e:
+                logger.error("Ticker table subscription lost: %s", e)
+
+            finally:
+                if heartbeat is not None:
+                    heartbeat.cancel()
+
+                self.table.heartbeat = 0
+
+            await asyncio.sleep(TICKER_CACHE_RECONNECT_DELAY)
+
+
+def ticker_table_sidecar_main(path: str):
+    async def run():
+        pool = create_redis_pool()
+        table = TickerTable.open(path, writable=True)
+
+        try:
+            await TickerTableSidecar(table).run(redis.StrictRedis(connection_pool=pool))
+
+        finally:
+            table.close()
+            await pool.disconnect()
+
+    asyncio.run(run())
@@ -0,0 +1,13 @@
+from fastapi import APIRouter, Request
+
+from crypto_converter.common.common import check_redis, record_redis_pool_metrics
+from crypto_converter.common.metrics import metrics
+
+metrics_router = APIRouter(prefix="/metrics", tags=["metrics"])
+
+
+@metrics_router.get("/")
+async def get_metrics(request: Request):
+    await check_redis(request.app.state.redis_client)
+    record_redis_pool_metrics(request.app.state.redis_pool)
+    return metrics.snapshot()
@@ -3,133 +3,101 @@ import asyncio
 import json
 import sys
 import time
-from copy import deepcopy
-from crypto_converter.common.common import configure_logger, connect_to_redis, repeat
-from crypto_converter.common.models import BinanceTicker
+from crypto_converter.binance_consumer.decoder import decode_ticker_frame
+from crypto_converter.binance_consumer.pipeline import FramePipeline
+from crypto_converter.binance_consumer.redis_sink import RedisTickerSink
+from crypto_converter.binance_consumer.ticker_store import ChangeTracker, TickerStore
+from crypto_converter.common.common import configure_logger, repeat
+from crypto_converter.common.metrics import metrics
+from crypto_converter.common.models import TickerRecord
 from crypto_converter.common.settings import (
+    BINANCE_MAX_FRAME_SIZE,
     BINANCE_STREAM_URL,
-    REDIS_EXPIRY_TIME,
+    FLUSH_CHANGED_ONLY,
     REDIS_FLUSH_TIMEOUT,
 )
-from crypto_converter.database.db import get_db_session, transaction
-from crypto_converter.database.db_models import (
-    BinanceTickersModel,
-    BinanceTickerDataModel,
-)
-from sqlalchemy import select
+from crypto_converter.common.ticker_layout import snapshot_key
+from crypto_converter.database.bulk_ingest import TickerBulkIngestor
 
 
 logger = configure_logger(__name__)
-tickers = {}
+ticker_store = TickerStore()
+change_tracker = ChangeTracker()
+redis_sink = RedisTickerSink()
+bulk_ingestor = TickerBulkIngestor()
 
 
 async def process_msg(message):
     try:
-        data = json.loads(message)
+        ticker_records = decode_ticker_frame(message, ticker_store.filter)
 
     except json.decoder.JSONDecodeError as e:
         logger.exception("unable to decode msg '%s', error: %s", message, e)
 
     else:
-        if "data" in data:
-            ticker_data = data["data"]
-
-            for ticker in ticker_data:
-                symbol = ticker["s"].lower()
-                price = ticker["c"]
-                event_time = ticker["E"]
-                tickers[symbol] = BinanceTicker(
-                    **{"ticker_name": symbol, "price": price, "timestamp": event_time}
-                ).model_dump()
+        if ticker_records is not None:
+            for record in ticker_records:
+                ticker_store.update(record)
 
             logger.warning(
-                "Processed the ticker data from binance. qty=%s", len(ticker_data)
+                "Processed the ticker data from binance. qty=%s", len(ticker_records)
             )
 
-        logger.warning("Current tickers len=%s", len(tickers))
+        logger.warning("Current tickers len=%s", len(ticker_store))
 
 
 async def flush_tickers():
-    redis_client = await connect_to_redis()
-
-    if tickers:
-        logger.warning("Flushing '%s' ticker to redis ", len(tickers))
+    if ticker_store:
+        logger.warning("Flushing '%s' ticker to redis ", len(ticker_store))
         start = time.time()
-        tickers_copy = deepcopy(tickers)
-        tickers.clear()
+        flushed_tickers = ticker_store.swap()
+
+        # versioned either way, only the heartbeats are written in full otherwise
+        changed, heartbeats = change_tracker.split(flushed_tickers)
 
-        await flush_tickers_to_db(tickers_copy)
+        if not FLUSH_CHANGED_ONLY:
+            changed, heartbeats = {**changed, **heartbeats}, {}
 
-        for tick_name, data in tickers_copy.items():
-            await redis_client.hset(tick_name, key=None, value=None, mapping=data)
-            # doing simple expiry per every ticker
-            await redis_client.expire(tick_name, REDIS_EXPIRY_TIME)
+        await flush_tickers_to_db(changed)
+
+        stats = await redis_sink.write(changed, heartbeats)
+        change_tracker.commit(changed)
+
+        metrics.set("ticker_write_reduction_ratio", stats.write_reduction)
+        metrics.inc("ticker_flush_changed", len(changed))
+        metrics.inc("ticker_flush_heartbeats", len(heartbeats))
 
         end = time.time()
+        metrics.observe("ticker_flush_seconds", end - start)
         logger.warning(
-            f"It took {end - start} seconds to flush {tickers_copy.__len__()} tickers to redis"
+            f"It took {end - start} seconds to flush {flushed_tickers.__len__()} tickers "
+            f"({len(changed)} changed, {len(heartbeats)} heartbeats, "
+            f"{stats.recreated} recreated), "
+            f"redis write took {stats.duration} seconds in {stats.round_trips} round trips "
+            f"({stats.commands} commands, write reduction {stats.write_reduction:.2%})"
         )
 
     else:
         logger.warning("No tickers to flush")
 
 
-async def flush_tickers_to_db(tickers: list):
-    tickers_objects = []
+async def flush_tickers_to_db(tickers: dict[str, TickerRecord]):
     start = time.time()
-    async with get_db_session() as session, transaction(session):
-        tickers_query = select(BinanceTickersModel)
-        existing_tickers = await session.execute(select(BinanceTickersModel))
-        existing_tickers_dict = {ticker.ticker_name: ticker for ticker in existing_tickers.scalars()}
-
-        for tick_name, data in tickers.items():
-            if data["ticker_name"]:
-
-                ticker = existing_tickers_dict.get(data["ticker_name"])
-
-                if ticker is None:
-                    ticker = BinanceTickersModel(ticker_name=data["ticker_name"])
-
-                else:
-                    session.merge(ticker)
-
-                ticker_data = BinanceTickerDataModel(
-                    price=data["price"],
-                    timestamp=data["timestamp"],
-                    json_data=json.dumps(data),
-                    ticker=ticker,
-                )
-
-                # ticker.ticker_data.append(ticker_data)
-                tickers_objects.append(ticker_data)
-                session.add(ticker)
-                # this is neccessary since we are addig the ticker TO the ticker data
-                # and sqlalchemy doesn't add it to the session automatically as if it did
-                # in case we added the ticker data as ticker.append(ticker_data)
-                session.add(ticker_data)
-
+    rows = await bulk_ingestor.ingest(tickers)
     end = time.time()
-    logger.info(
-        f"it took {end - start} seconds to flush {tickers.__len__()} tickers to database"
-    )
-
-    # for ticker in tickers_objects:
-    #     logger.warning(f"Saved ticker {ticker.id}")
+    metrics.observe("db_flush_seconds", end - start)
+    logger.info(f"it took {end - start} seconds to flush {rows} tickers to database")
 
 
-async def connect_to_binance():
-    uri = BINANCE_STREAM_URL
+async def connect_to_binance(uri: str = BINANCE_STREAM_URL):
     try:
-        async with websockets.connect(uri) as ws:
-            logger.warning("Connected to Binance websocket stream")
+        async with websockets.connect(uri, max_size=BINANCE_MAX_FRAME_SIZE) as ws:
+            logger.warning("Connected to Binance websocket stream %s", uri)
             await ws.send(
                 json.dumps({"method": "SUBSCRIBE", "params": ["!ticker@arr"], "id": 1})
             )
 
-            while True:
-                message = await ws.recv()
-                await asyncio.sleep(0)
-                await process_msg(message)
+            await FramePipeline(process_msg).run(ws)
 
     except (TimeoutError, websockets.exceptions.ConnectionClosedError) as e:
         logger.exception("Unable to connect to binance websocket: %s, Exiting app", e)
@@ -140,9 +108,18 @@ async def connect_to_binance():
         logger.exception(e)
 
 
-def quote_consumer_main():
+def quote_consumer_main(
+    shard_index: int = 0, shards_count: int = 1, stream_url: str = BINANCE_STREAM_URL
+):
+    global ticker_store
+    ticker_store = TickerStore(shard_index, shards_count)
+    redis_sink.snapshot_key = snapshot_key(shard_index)
+
+    if shards_count > 1:
+        logger.warning("Consuming quotes for shard %s/%s", shard_index, shards_count)
+
     loop = asyncio.get_event_loop()
-    loop.create_task(connect_to_binance())
+    loop.create_task(connect_to_binance(stream_url))
     loop.create_task(repeat(REDIS_FLUSH_TIMEOUT, flush_tickers))
 
     try:
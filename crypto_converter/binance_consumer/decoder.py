@@ -0,0 +1,61 @@
+import json
+import re
+from typing import Callable
+
+from crypto_converter.common.models import TickerRecord
+
+# Binance serializes the 24hrTicker fields in a fixed order, so the three fields
+# we need can be picked straight out of the raw frame without parsing the rest:
+# {"e":"24hrTicker","E":123,"s":"BNBBTC","p":"..","P":"..","w":"..","x":"..","c":"..",..}
+TICKER_PATTERN = re.compile(
+    r'"E":(\d+),"s":"([^"]+)","p":"[^"]*","P":"[^"]*","w":"[^"]*","x":"[^"]*",'
+    r'"c":"([^"]+)"'
+)
+TICKER_EVENT = '"24hrTicker"'
+
+
+def decode_ticker_frame(
+    message: str | bytes, owns: Callable[[str], bool] | None = None
+) -> list[TickerRecord] | None:
+    """Extracts symbol, close price and event time from a !ticker@arr frame.
+
+    Returns None for frames without ticker data (e.g. subscription replies).
+    Falls back to a full json parse when the frame layout is not the expected
+    one, so a change on the binance side costs speed, not correctness. Only
+    the tickers whose symbol, as binance sends it, `owns` accepts are built:
+    a shard skips the others.
+    """
+    if isinstance(message, bytes):
+        message = message.decode("utf-8")
+
+    matches = TICKER_PATTERN.findall(message)
+
+    if not matches or len(matches) != message.count(TICKER_EVENT):
+        return decode_ticker_frame_json(message, owns)
+
+    if owns is None:
+        return [
+            TickerRecord(symbol.lower(), price, int(event_time))
+            for event_time, symbol, price in matches
+        ]
+
+    return [
+        TickerRecord(symbol.lower(), price, int(event_time))
+        for event_time, symbol, price in matches
+        if owns(symbol)
+    ]
+
+
+def decode_ticker_frame_json(
+    message: str | bytes, owns: Callable[[str], bool] | None = None
+) -> list[TickerRecord] | None:
+    data = json.loads(message)
+
+    if not isinstance(data, dict) or "data" not in data:
+        return None
+
+    return [
+        TickerRecord(ticker["s"].lower(), ticker["c"], ticker["E"])
+        for ticker in data["data"]
+        if owns is None or owns(ticker["s"])
+    ]
@@ -0,0 +1,93 @@
+import asyncio
+
+import redis.asyncio as redis
+
+from crypto_converter.binance_consumer.redis_sink import RedisTickerSink
+from crypto_converter.binance_consumer.ticker_store import shard_of
+from crypto_converter.common.common import configure_logger, create_redis_pool
+from crypto_converter.common.models import TickerRecord
+from crypto_converter.common.settings import CONSUMER_SHARDS, REDIS_TICKER_KEY
+from crypto_converter.common.ticker_layout import (
+    HASH_LAYOUT,
+    LAYOUTS,
+    SNAPSHOT_LAYOUT,
+    load_tickers,
+    snapshot_keys,
+)
+
+logger = configure_logger(__name__)
+
+
+async def delete_layout(
+    redis_client: redis.StrictRedis,
+    layout: str,
+    records: list[TickerRecord],
+    shards_count: int,
+    chunk_size: int = 1000,
+):
+    if layout == SNAPSHOT_LAYOUT:
+        await redis_client.delete(REDIS_TICKER_KEY, *snapshot_keys(shards_count))
+        return
+
+    for offset in range(0, len(records), chunk_size):
+        chunk_end = offset + chunk_size
+        await redis_client.delete(
+            *(record.ticker_name for record in records[offset:chunk_end])
+        )
+
+
+async def migrate_tickers(
+    pool: redis.ConnectionPool,
+    target_layout: str,
+    delete_source: bool = False,
+    shards_count: int = CONSUMER_SHARDS,
+) -> int:
+    """Copies the tickers stored in the other layout into `target_layout`.
+
+    Tickers are written per consumer shard, like the consumers would, and
+    nothing is published: the API caches already hold the same prices.
+    """
+    if target_layout not in LAYOUTS:
+        raise ValueError(f"Unknown redis ticker layout {target_layout}")
+
+    source_layout = HASH_LAYOUT if target_layout == SNAPSHOT_LAYOUT else SNAPSHOT_LAYOUT
+    redis_client = redis.StrictRedis(connection_pool=pool)
+    records = await load_tickers(redis_client, source_layout)
+    shards: dict[int, dict[str, TickerRecord]] = {}
+
+    for record in records:
+        shard_index = shard_of(record.ticker_name, shards_count)
+        shards.setdefault(shard_index, {})[record.ticker_name] = record
+
+    for shard_index, tickers in shards.items():
+        sink = RedisTickerSink(
+            pool, channel=None, layout=target_layout, shard_index=shard_index
+        )
+        # the target snapshot is rebuilt from the source only
+        sink.snapshot = {}
+        await sink.write(tickers)
+
+    if delete_source:
+        await delete_layout(redis_client, source_layout, records, shards_count)
+
+    logger.warning(
+        "Migrated %s tickers from the %s to the %s layout%s",
+        len(records),
+        source_layout,
+        target_layout,
+        ", source deleted" if delete_source else "",
+    )
+    return len(records)
+
+
+def migrate_tickers_main(target_layout: str, delete_source: bool = False):
+    async def run():
+        pool = create_redis_pool()
+
+        try:
+            await migrate_tickers(pool, target_layout, delete_source)
+
+        finally:
+            await pool.disconnect()
+
+    asyncio.run(run())
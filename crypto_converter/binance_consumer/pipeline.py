@@ -0,0 +1,105 @@
+import asyncio
+import time
+from typing import Awaitable, Callable
+
+from crypto_converter.common.common import configure_logger
+from crypto_converter.common.metrics import metrics
+from crypto_converter.common.settings import BINANCE_QUEUE_POLICY, BINANCE_QUEUE_SIZE
+
+logger = configure_logger(__name__)
+
+QUEUE_POLICIES = ("block", "coalesce", "drop")
+
+
+class FramePipeline:
+    """Decouples reading websocket frames from processing them.
+
+    A reader pushes raw frames into a bounded queue and a worker consumes it,
+    so bursts of frames are buffered instead of left in the socket. Both run
+    on the event loop and decoding is synchronous CPU work: no frame is read
+    while one is decoded. Consumer shards are what spreads the decoding over
+    cores. When the queue is full:
+        block    - the reader waits for a free slot
+        coalesce - the oldest queued frame is thrown away for the new one
+        drop     - the new frame is thrown away
+    A !ticker@arr frame only carries the symbols that changed, so coalesce and
+    drop lose those updates until the symbols change again.
+    """
+
+    def __init__(
+        self,
+        process: Callable[[str | bytes], Awaitable[None]],
+        maxsize: int = BINANCE_QUEUE_SIZE,
+        policy: str = BINANCE_QUEUE_POLICY,
+    ):
+        if policy not in QUEUE_POLICIES:
+            raise ValueError(
+                f"Unknown queue policy '{policy}', expected one of {QUEUE_POLICIES}"
+            )
+
+        self.process = process
+        self.policy = policy
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.coalesced = 0
+        self.dropped = 0
+
+    async def put(self, frame: str | bytes):
+        item = (time.perf_counter(), frame)
+
+        if self.policy == "block":
+            await self.queue.put(item)
+
+        elif self.queue.full() and self.policy == "drop":
+            self.dropped += 1
+            metrics.inc("binance_frames_dropped")
+
+        else:
+            if self.queue.full():
+                self.queue.get_nowait()
+                self.queue.task_done()
+                self.coalesced += 1
+                metrics.inc("binance_frames_coalesced")
+
+            self.queue.put_nowait(item)
+
+        metrics.inc("binance_frames_received")
+        metrics.set("binance_frame_queue_depth", self.queue.qsize())
+
+    async def worker(self):
+        while True:
+            received_at, frame = await self.queue.get()
+            started_at = time.perf_counter()
+            metrics.set("binance_frame_queue_depth", self.queue.qsize())
+            metrics.observe(
+                "binance_frame_queue_wait_seconds", started_at - received_at
+            )
+
+            try:
+                await self.process(frame)
+
+            except Exception as e:
+                logger.exception("Unable to process binance frame: %s", e)
+
+            finally:
+                self.queue.task_done()
+
+            metrics.observe(
+                "binance_frame_process_seconds", time.perf_counter() - started_at
+            )
+
+    async def run(self, ws):
+        """Reads frames from the websocket until it closes or fails."""
+        worker = asyncio.create_task(self.worker())
+
+        try:
+            while True:
+                received_at = time.perf_counter()
+                message = await ws.recv()
+                metrics.observe(
+                    "binance_frame_recv_seconds", time.perf_counter() - received_at
+                )
+                await self.put(message)
+
+        finally:
+            worker.cancel()
+            await asyncio.gather(worker, return_exceptions=True)
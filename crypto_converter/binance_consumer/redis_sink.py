@@ -0,0 +1,246 @@
+import time
+from dataclasses import dataclass
+
+import redis.asyncio as redis
+
+from crypto_converter.common.common import (
+    configure_logger,
+    create_redis_pool,
+    record_redis_pool_metrics,
+)
+from crypto_converter.common.metrics import metrics
+from crypto_converter.common.models import TickerRecord, encode_ticker_update
+from crypto_converter.common.settings import (
+    REDIS_EXPIRY_TIME,
+    REDIS_PIPELINE_CHUNK_SIZE,
+    REDIS_TICKER_KEY,
+    REDIS_TICKER_LAYOUT,
+    REDIS_TICKERS_CHANNEL,
+)
+from crypto_converter.common.ticker_layout import (
+    LAYOUTS,
+    SNAPSHOT_LAYOUT,
+    decode_snapshot,
+    encode_price_field,
+    encode_snapshot,
+    snapshot_key,
+)
+
+logger = configure_logger(__name__)
+
+# refreshes the TTL and the timestamp of the ticker hashes that still exist and
+# returns the others, which get a full write instead of a timestamp-only hash
+HEARTBEAT_SCRIPT = """
+local missing = {}
+for i, key in ipairs(KEYS) do
+    if redis.call("EXPIRE", key, ARGV[1]) == 1 then
+        redis.call("HSET", key, "timestamp", ARGV[i + 1])
+    else
+        table.insert(missing, key)
+    end
+end
+return missing
+"""
+
+
+@dataclass
+class FlushStats:
+    tickers: int = 0
+    heartbeats: int = 0
+    # heartbeats whose hash was gone and had to be written in full
+    recreated: int = 0
+    commands: int = 0
+    # what writing the heartbeats in full would have cost on top of `commands`
+    saved_commands: int = 0
+    round_trips: int = 0
+    duration: float = 0.0
+
+    @property
+    def write_reduction(self) -> float:
+        """Share of the redis commands of a full write the heartbeats avoided."""
+        full_write_commands = self.commands + self.saved_commands
+        return self.saved_commands / full_write_commands if full_write_commands else 0.0
+
+
+class RedisTickerSink:
+    """Writes a batch of tickers to redis over a long-lived connection pool.
+
+    Every ticker costs an HSET and an EXPIRE, both queued into the same
+    pipeline, so a whole chunk of tickers goes out in a single round trip.
+    Heartbeats are tickers whose price did not move: all those of a chunk
+    share a single EVAL of HEARTBEAT_SCRIPT, which only refreshes the TTL and
+    timestamp of their hashes. The hashes that expired or were evicted since
+    the last write are reported back and written in full in one more round
+    trip, a timestamp alone would leave them unreadable for the API.
+
+    Once written, all tickers of the batch are published on `channel` (queued
+    behind the writes of the last chunk, so no extra round trip), which keeps
+    the API ticker caches in sync with redis. `tickers` are flagged as
+    inserted: the consumer stores them in postgres before the write, which
+    invalidates the cached aggregations of the API.
+
+    With the snapshot layout the whole batch is a single MULTI instead: one
+    HSET of all the symbols into the tickers hash, the binary snapshot of
+    every ticker this shard knows and the publish, applied atomically.
+    """
+
+    def __init__(
+        self,
+        pool: redis.ConnectionPool | None = None,
+        chunk_size: int = REDIS_PIPELINE_CHUNK_SIZE,
+        expiry: int = REDIS_EXPIRY_TIME,
+        channel: str | None = REDIS_TICKERS_CHANNEL,
+        layout: str = REDIS_TICKER_LAYOUT,
+        ticker_key: str = REDIS_TICKER_KEY,
+        shard_index: int = 0,
+    ):
+        if layout not in LAYOUTS:
+            raise ValueError(
+                f"Unknown redis ticker layout {layout}, use one of {LAYOUTS}"
+            )
+
+        self.pool = pool or create_redis_pool()
+        self.redis_client = redis.StrictRedis(connection_pool=self.pool)
+        self.chunk_size = chunk_size
+        self.expiry = expiry
+        self.channel = channel
+        self.layout = layout
+        self.ticker_key = ticker_key
+        self.snapshot_key = snapshot_key(shard_index, ticker_key)
+        # every ticker of the shard, the snapshot is rewritten as a whole
+        self.snapshot: dict[str, TickerRecord] | None = None
+
+    async def write(
+        self,
+        tickers: dict[str, TickerRecord],
+        heartbeats: dict[str, TickerRecord] | None = None,
+    ) -> FlushStats:
+        heartbeats = heartbeats or {}
+        stats = FlushStats(tickers=len(tickers), heartbeats=len(heartbeats))
+        start = time.perf_counter()
+
+        if self.layout == SNAPSHOT_LAYOUT:
+            await self.write_snapshot(
+                [*tickers.values(), *heartbeats.values()], tickers, stats
+            )
+
+        else:
+            await self.write_hashes(tickers, heartbeats, stats)
+
+        stats.duration = time.perf_counter() - start
+
+        metrics.inc("redis_flush_total")
+        metrics.inc("redis_flush_tickers", stats.tickers)
+        metrics.inc("redis_flush_heartbeats", stats.heartbeats)
+        metrics.inc("redis_flush_recreated", stats.recreated)
+        metrics.inc("redis_flush_round_trips", stats.round_trips)
+        metrics.set("redis_last_flush_round_trips", stats.round_trips)
+        metrics.observe("redis_flush_seconds", stats.duration)
+        record_redis_pool_metrics(self.pool)
+
+        return stats
+
+    async def write_hashes(
+        self,
+        tickers: dict[str, TickerRecord],
+        heartbeats: dict[str, TickerRecord],
+        stats: FlushStats,
+    ):
+        records = [*tickers.values(), *heartbeats.values()]
+
+        for offset in range(0, len(records), self.chunk_size):
+            chunk_end = offset + self.chunk_size
+            # the changed tickers come first, the heartbeats after them
+            beats_start = min(max(offset, len(tickers)), chunk_end)
+            full_writes = records[offset:beats_start]
+            beats = records[beats_start:chunk_end]
+
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                self.queue_full_writes(pipe, full_writes)
+
+                if beats:
+                    pipe.eval(
+                        HEARTBEAT_SCRIPT,
+                        len(beats),
+                        *(record.ticker_name for record in beats),
+                        self.expiry,
+                        *(record.timestamp for record in beats),
+                    )
+                    stats.saved_commands += 2 * len(beats) - 1
+
+                if self.channel and chunk_end >= len(records):
+                    pipe.publish(self.channel, encode_ticker_update(records, tickers))
+
+                stats.commands += len(pipe)
+                results = await pipe.execute()
+                stats.round_trips += 1
+
+            if beats and results[2 * len(full_writes)]:
+                await self.recreate(beats, results[2 * len(full_writes)], stats)
+
+    def queue_full_writes(self, pipe, records: list[TickerRecord]):
+        for record in records:
+            pipe.hset(record.ticker_name, mapping=record.as_dict())
+            pipe.expire(record.ticker_name, self.expiry)
+
+    async def recreate(
+        self, beats: list[TickerRecord], missing: list[bytes], stats: FlushStats
+    ):
+        missing_names = {name.decode() for name in missing}
+        records = [record for record in beats if record.ticker_name in missing_names]
+
+        async with self.redis_client.pipeline(transaction=False) as pipe:
+            self.queue_full_writes(pipe, records)
+            stats.commands += len(pipe)
+            stats.saved_commands -= len(pipe)
+            await pipe.execute()
+            stats.round_trips += 1
+
+        stats.recreated += len(records)
+
+    async def write_snapshot(
+        self,
+        records: list[TickerRecord],
+        inserted: dict[str, TickerRecord],
+        stats: FlushStats,
+    ):
+        if self.snapshot is None:
+            # carry over the tickers of the previous run, quiet symbols may not
+            # show up in the stream for a while
+            blob = await self.redis_client.get(self.snapshot_key)
+            self.snapshot = {
+                record.ticker_name: record
+                for record in (decode_snapshot(blob)[1] if blob else [])
+            }
+            stats.round_trips += 1
+
+        self.snapshot.update((record.ticker_name, record) for record in records)
+        version = int(time.time() * 1000)
+
+        async with self.redis_client.pipeline(transaction=True) as pipe:
+            if records:
+                pipe.hset(
+                    self.ticker_key,
+                    mapping={
+                        record.ticker_name: encode_price_field(record)
+                        for record in records
+                    },
+                )
+
+            pipe.expire(self.ticker_key, self.expiry)
+            pipe.set(
+                self.snapshot_key,
+                encode_snapshot(self.snapshot.values(), version),
+                ex=self.expiry,
+            )
+
+            if self.channel and records:
+                pipe.publish(self.channel, encode_ticker_update(records, inserted))
+
+            stats.commands += len(pipe)
+            await pipe.execute()
+            stats.round_trips += 1
+
+    async def close(self):
+        await self.redis_client.aclose()
+        await self.pool.disconnect()
@@ -0,0 +1,142 @@
+import asyncio
+import json
+import re
+import time
+
+import websockets
+
+from crypto_converter.common.common import configure_logger
+
+logger = configure_logger(__name__)
+
+EVENT_TIME_PATTERN = re.compile(r'"E":(\d+)')
+
+
+def load_frames(path: str) -> list[str]:
+    """Recorded frames are stored one raw websocket message per line."""
+    with open(path, encoding="utf-8") as frames_file:
+        return [line.rstrip("\n") for line in frames_file if line.strip()]
+
+
+def parse_speed(speed: str) -> float:
+    """'1', '10', ... multiply the recorded pace, 'max' sends without pauses."""
+    return 0.0 if speed == "max" else float(speed)
+
+
+def first_event_time(frame: str) -> int:
+    match = EVENT_TIME_PATTERN.search(frame)
+    return int(match.group(1)) if match else 0
+
+
+def rebase_event_times(frame: str, event_time: int | None = None) -> str:
+    """Shifts all event times of a frame so that `event_time` becomes now."""
+    if event_time is None:
+        event_time = first_event_time(frame)
+
+    offset = int(time.time() * 1000) - event_time
+
+    return EVENT_TIME_PATTERN.sub(
+        lambda match: f'"E":{int(match.group(1)) + offset}', frame
+    )
+
+
+class FrameReplayer:
+    """Local stand-in for the binance stream, replaying recorded frames.
+
+    Frames are paced by the event times recorded in them, divided by `speed`
+    (0 sends as fast as the client reads). With `rebase_time` the event times
+    are shifted to the moment a frame is sent, so the replayed tickers look
+    fresh to the API.
+    """
+
+    def __init__(
+        self,
+        frames: list[str],
+        speed: float = 1.0,
+        loop: bool = True,
+        rebase_time: bool = True,
+    ):
+        if not frames:
+            raise ValueError("Nothing to replay, no frames were given")
+
+        self.frames = frames
+        self.speed = speed
+        self.loop = loop
+        self.rebase_time = rebase_time
+        self.event_times = [first_event_time(frame) for frame in frames]
+
+    async def answer_subscriptions(self, ws):
+        async for message in ws:
+            try:
+                request = json.loads(message)
+
+            except json.decoder.JSONDecodeError:
+                continue
+
+            await ws.send(json.dumps({"result": None, "id": request.get("id")}))
+
+    async def send_frames(self, ws):
+        replays = 0
+
+        while replays == 0 or self.loop:
+            started_at = time.monotonic()
+            start_event_time = self.event_times[0]
+
+            for frame, event_time in zip(self.frames, self.event_times):
+                if self.speed:
+                    due = (event_time - start_event_time) / 1000 / self.speed
+                    delay = due - (time.monotonic() - started_at)
+
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+
+                if self.rebase_time:
+                    frame = rebase_event_times(frame, event_time)
+
+                await ws.send(frame)
+
+            replays += 1
+            logger.warning(
+                "Replayed %s frames in %.3f seconds (pass %s)",
+                len(self.frames),
+                time.monotonic() - started_at,
+                replays,
+            )
+
+    async def handler(self, ws):
+        logger.warning("Replay client connected from %s", ws.remote_address)
+        subscriptions = asyncio.create_task(self.answer_subscriptions(ws))
+
+        try:
+            await self.send_frames(ws)
+
+        except websockets.exceptions.ConnectionClosed:
+            logger.warning("Replay client disconnected")
+
+        finally:
+            subscriptions.cancel()
+
+    async def serve(self, host: str, port: int):
+        async with websockets.serve(self.handler, host, port, max_size=None):
+            logger.warning(
+                "Replaying %s frames on ws://%s:%s at speed %s",
+                len(self.frames),
+                host,
+                port,
+                self.speed or "max",
+            )
+            await asyncio.Future()
+
+
+def replay_server_main(
+    frames_path: str,
+    host: str,
+    port: int,
+    speed: str = "1",
+    loop: bool = True,
+    rebase_time: bool = True,
+):
+    replayer = FrameReplayer(
+        load_frames(frames_path), parse_speed(speed), loop, rebase_time
+    )
+    asyncio.run(replayer.serve(host, port))
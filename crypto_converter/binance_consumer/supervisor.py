@@ -0,0 +1,97 @@
+import multiprocessing
+import signal
+import time
+from typing import Callable
+
+from crypto_converter.binance_consumer.aio_binance_api import quote_consumer_main
+from crypto_converter.common.common import configure_logger
+from crypto_converter.common.settings import CONSUMER_SHARD_CHECK_INTERVAL
+
+logger = configure_logger(__name__)
+
+
+class ConsumerSupervisor:
+    """Runs one quotes consumer process per shard and restarts the dead ones.
+
+    Every shard reads the whole !ticker@arr stream but only builds, keeps,
+    flushes and stores the symbols hashing to it, so the decoding, the redis
+    and database writes and the per-ticker bookkeeping are spread over the
+    cores; scanning the raw frame is the only work each shard repeats.
+    """
+
+    def __init__(
+        self,
+        shards_count: int,
+        target: Callable[[int, int], None] = quote_consumer_main,
+        check_interval: float = CONSUMER_SHARD_CHECK_INTERVAL,
+        **target_kwargs,
+    ):
+        self.shards_count = shards_count
+        self.target = target
+        self.target_kwargs = target_kwargs
+        self.check_interval = check_interval
+        self.context = multiprocessing.get_context("spawn")
+        self.processes: dict[int, multiprocessing.Process] = {}
+        self.restarts: dict[int, int] = {}
+        self.stopping = False
+
+    def start_shard(self, shard_index: int):
+        process = self.context.Process(
+            target=self.target,
+            args=(shard_index, self.shards_count),
+            kwargs=self.target_kwargs,
+            name=f"quotes-consumer-{shard_index}",
+        )
+        process.start()
+        self.processes[shard_index] = process
+        logger.warning(
+            "Started quotes consumer shard %s/%s, pid=%s",
+            shard_index,
+            self.shards_count,
+            process.pid,
+        )
+
+    def check_shards(self):
+        for shard_index, process in list(self.processes.items()):
+            if process.is_alive() or self.stopping:
+                continue
+
+            self.restarts[shard_index] = self.restarts.get(shard_index, 0) + 1
+            logger.error(
+                "Quotes consumer shard %s exited with code %s, restarting it (%s)",
+                shard_index,
+                process.exitcode,
+                self.restarts[shard_index],
+            )
+            self.start_shard(shard_index)
+
+    def stop(self, *args):
+        self.stopping = True
+
+    def shutdown(self, timeout: float = 10):
+        for process in self.processes.values():
+            if process.is_alive():
+                process.terminate()
+
+        for shard_index, process in self.processes.items():
+            process.join(timeout)
+
+            if process.is_alive():
+                logger.error("Shard %s did not stop in time, killing it", shard_index)
+                process.kill()
+                process.join()
+
+    def run(self):
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+        for shard_index in range(self.shards_count):
+            self.start_shard(shard_index)
+
+        try:
+            while not self.stopping:
+                time.sleep(self.check_interval)
+                self.check_shards()
+
+        finally:
+            self.shutdown()
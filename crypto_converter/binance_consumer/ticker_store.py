@@ -0,0 +1,127 @@
+import time
+import zlib
+from typing import Callable
+
+from crypto_converter.common.models import TickerRecord
+from crypto_converter.common.settings import REDIS_EXPIRY_TIME
+
+
+def shard_of(ticker_name: str, shards_count: int) -> int:
+    """Stable across processes, unlike the salted builtin hash()."""
+    return zlib.crc32(ticker_name.encode()) % shards_count
+
+
+class TickerStore:
+    """Latest ticker per symbol, collected between two flushes.
+
+    Frames fill the active buffer; a flush takes ownership of it with a single
+    reference swap, so nothing is copied and nothing is shared with the frames
+    arriving while the flush is running. A sharded consumer only keeps the
+    symbols hashing to its own shard.
+    """
+
+    def __init__(self, shard_index: int = 0, shards_count: int = 1):
+        self.active: dict[str, TickerRecord] = {}
+        self.generation = 0
+        self.shard_index = shard_index
+        self.shards_count = shards_count
+        # checked for every ticker of every frame, the symbols hardly change
+        self.owned: dict[str, bool] = {}
+        self.owned_symbols: dict[str, bool] = {}
+
+    def __len__(self):
+        return len(self.active)
+
+    def owns(self, ticker_name: str) -> bool:
+        if self.shards_count == 1:
+            return True
+
+        owned = self.owned.get(ticker_name)
+
+        if owned is None:
+            owned = shard_of(ticker_name, self.shards_count) == self.shard_index
+            self.owned[ticker_name] = owned
+
+        return owned
+
+    def owns_symbol(self, symbol: str) -> bool:
+        """owns() for a symbol as binance sends it, without lowering it first."""
+        owned = self.owned_symbols.get(symbol)
+
+        if owned is None:
+            owned = self.owned_symbols[symbol] = self.owns(symbol.lower())
+
+        return owned
+
+    @property
+    def filter(self) -> Callable[[str], bool] | None:
+        """What the decoder filters the frames with, None when owning everything."""
+        return None if self.shards_count == 1 else self.owns_symbol
+
+    def update(self, record: TickerRecord):
+        if not self.owns(record.ticker_name):
+            return
+
+        current = self.active.get(record.ticker_name)
+
+        # an older event time never replaces a newer one, whatever the order
+        if current is None or current.timestamp <= record.timestamp:
+            self.active[record.ticker_name] = record
+
+    def swap(self) -> dict[str, TickerRecord]:
+        filled, self.active = self.active, {}
+        self.generation += 1
+        return filled
+
+
+class ChangeTracker:
+    """Last written price and version per symbol.
+
+    Splits a flushed batch into tickers whose price moved since the last write
+    and heartbeats, whose price did not and get no new row in postgres, only a
+    fresh timestamp in redis. A change is still forced every
+    `full_write_interval` seconds, so symbols that never move keep showing up
+    in the history and its aggregates.
+
+    Both come back with the version of their price: it is bumped on every
+    price change, never by a heartbeat or a forced write, so readers can tell
+    a new price from a repeated one. The versions count from the start of the
+    consumer.
+    """
+
+    def __init__(self, full_write_interval: float = REDIS_EXPIRY_TIME / 2):
+        self.full_write_interval = full_write_interval
+        self.prices: dict[str, str] = {}
+        self.versions: dict[str, int] = {}
+        self.written_at: dict[str, float] = {}
+
+    def split(
+        self, tickers: dict[str, TickerRecord]
+    ) -> tuple[dict[str, TickerRecord], dict[str, TickerRecord]]:
+        changed = {}
+        heartbeats = {}
+        stale_before = time.monotonic() - self.full_write_interval
+
+        for ticker_name, record in tickers.items():
+            version = self.versions.get(ticker_name, 0)
+
+            if self.prices.get(ticker_name) != record.price:
+                # bumped right away, a failed write must not reuse the version
+                version = self.versions[ticker_name] = version + 1
+                changed[ticker_name] = record._replace(version=version)
+
+            elif self.written_at[ticker_name] <= stale_before:
+                changed[ticker_name] = record._replace(version=version)
+
+            else:
+                heartbeats[ticker_name] = record._replace(version=version)
+
+        return changed, heartbeats
+
+    def commit(self, changed: dict[str, TickerRecord]):
+        """Remembers the prices once they were actually written."""
+        written_at = time.monotonic()
+
+        for ticker_name, record in changed.items():
+            self.prices[ticker_name] = record.price
+            self.written_at[ticker_name] = written_at
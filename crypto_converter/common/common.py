@@ -8,10 +8,13 @@ from redis.backoff import ExponentialBackoff
 from redis.exceptions import BusyLoadingError, ConnectionError
 from redis.exceptions import TimeoutError as redisTimeoutError
 
+from crypto_converter.common.metrics import metrics
 from crypto_converter.common.settings import (
     LOG_FORMAT,
     LOG_LEVEL,
+    REDIS_HEALTH_CHECK_INTERVAL,
     REDIS_HOST,
+    REDIS_POOL_SIZE,
     REDIS_PORT,
 )
 
@@ -43,22 +46,46 @@ async def repeat(interval, func, *args, **kwargs):
         await asyncio.sleep(interval)
 
 
-async def connect_to_redis():
-    try:
-        redis_client = await redis.StrictRedis(
-            host=REDIS_HOST,
-            port=REDIS_PORT,
-            retry=retry,
-            retry_on_error=[BusyLoadingError, ConnectionError, redisTimeoutError],
-        )
+def create_redis_pool(max_connections: int = REDIS_POOL_SIZE) -> redis.ConnectionPool:
+    return redis.ConnectionPool(
+        host=REDIS_HOST,
+        port=REDIS_PORT,
+        max_connections=max_connections,
+        health_check_interval=REDIS_HEALTH_CHECK_INTERVAL,
+        retry=retry,
+        retry_on_error=[BusyLoadingError, ConnectionError, redisTimeoutError],
+    )
+
+
+def record_redis_pool_metrics(pool: redis.ConnectionPool, prefix: str = "redis_pool"):
+    metrics.set(f"{prefix}_size", pool.max_connections)
+    # private to redis-py, only the size is reported should they go away
+    in_use_connections = getattr(pool, "_in_use_connections", None)
+    available_connections = getattr(pool, "_available_connections", None)
 
+    if in_use_connections is None or available_connections is None:
+        return
+
+    in_use = len(in_use_connections)
+    available = len(available_connections)
+    metrics.set(f"{prefix}_created", in_use + available)
+    metrics.set(f"{prefix}_in_use", in_use)
+    metrics.set(f"{prefix}_available", available)
+    metrics.set(f"{prefix}_usage_ratio", in_use / pool.max_connections)
+
+
+async def check_redis(redis_client: redis.StrictRedis) -> bool:
+    """Pings redis and reports it as the redis_available gauge."""
+    try:
         await redis_client.ping()
 
-    except sync_redis.exceptions.ConnectionError:
+    except (sync_redis.exceptions.ConnectionError, redisTimeoutError):
         logger.exception(
             "Cant connect to redis at this moment, "
-            "will be retrying on the next flush attempt"
+            "the pool will be retrying on the next request"
         )
-        raise
+        metrics.set("redis_available", 0)
+        return False
 
-    return redis_client
+    metrics.set("redis_available", 1)
+    return True
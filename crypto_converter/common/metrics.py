@@ -0,0 +1,69 @@
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+
+
+class Metrics:
+    """Tiny in-process registry of counters, gauges and timing samples."""
+
+    def __init__(self, max_samples: int = 1024):
+        self.counters: dict[str, float] = defaultdict(int)
+        self.gauges: dict[str, float] = {}
+        self.timings: dict[str, deque] = defaultdict(lambda: deque(maxlen=max_samples))
+
+    def inc(self, name: str, value: float = 1):
+        self.counters[name] += value
+
+    def set(self, name: str, value: float):
+        self.gauges[name] = value
+
+    def observe(self, name: str, seconds: float):
+        self.timings[name].append(seconds)
+
+    @contextmanager
+    def timer(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def snapshot(self) -> dict:
+        return {
+            "counters": dict(self.counters),
+            "gauges": dict(self.gauges),
+            "timings": {
+                name: summarize(samples) for name, samples in self.timings.items()
+            },
+        }
+
+    def reset(self):
+        self.counters.clear()
+        self.gauges.clear()
+        self.timings.clear()
+
+
+def percentile(sorted_samples: list[float], pct: float) -> float:
+    if not sorted_samples:
+        return 0.0
+
+    index = min(
+        len(sorted_samples) - 1, int(round(pct / 100 * (len(sorted_samples) - 1)))
+    )
+    return sorted_samples[index]
+
+
+def summarize(samples) -> dict:
+    ordered = sorted(samples)
+
+    return {
+        "count": len(ordered),
+        "avg": sum(ordered) / len(ordered) if ordered else 0.0,
+        "p50": percentile(ordered, 50),
+        "p95": percentile(ordered, 95),
+        "p99": percentile(ordered, 99),
+        "max": ordered[-1] if ordered else 0.0,
+    }
+
+
+metrics = Metrics()
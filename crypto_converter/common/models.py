@@ -1,8 +1,10 @@
 import datetime
+import json
 import os
 import time
-from decimal import ROUND_HALF_EVEN, Decimal, localcontext
-from typing import Annotated, Any, Optional
+from decimal import ROUND_HALF_EVEN, Decimal, InvalidOperation, localcontext
+from functools import lru_cache
+from typing import Annotated, Any, Container, Iterable, Literal, NamedTuple, Optional
 
 from pydantic import BaseModel, Field, field_validator, model_validator
 
@@ -12,6 +14,8 @@ from crypto_converter.common.exceptions import NoValidTickerAvailableForTicker
 quote_price_precision = int(os.getenv("QUOTE_PRICE_PRECISION", 6))
 target_precision = int(os.getenv("QUOTE_TARGET_PRECISION", 12))
 ticker_expiration = int(os.getenv("TICKER_EXPIRATION_SEC", 60))
+# distinct ticker prices whose quantized and formatted forms are kept
+quote_cache_size = int(os.getenv("QUOTE_CACHE_SIZE", 16384))
 logger = configure_logger(__name__)
 
 
@@ -28,6 +32,22 @@ def quantize(value: Decimal, precision: int = quote_price_precision) -> Decimal:
     return d
 
 
+class PriceQuote(NamedTuple):
+    quantized: Decimal
+    display: str
+
+
+@lru_cache(maxsize=quote_cache_size)
+def price_quote(price: str) -> PriceQuote:
+    """Quantized and display forms of a ticker price.
+
+    A ticker only changes price once per flush while it is converted many
+    times in between, so both are computed once per price string, i.e. per
+    ticker version, and shared by every request (Decimals are immutable).
+    """
+    return PriceQuote(quantize(price), price.rstrip("0"))
+
+
 class ExchangeBid(BaseModel):
     from_: str = Field(alias="from")
     to_: str = Field(alias="to")
@@ -45,7 +65,12 @@ class ExchangeBid(BaseModel):
     @field_validator("amount_to", "amount_from", mode="before")
     @classmethod
     def wrap_to_decimal(cls, value):
-        return Decimal(str(value))
+        # a ValueError is reported as a validation error, InvalidOperation is not
+        try:
+            return Decimal(str(value))
+
+        except InvalidOperation:
+            raise ValueError("amount should be a number")
 
     @model_validator(mode="before")
     @classmethod
@@ -61,6 +86,13 @@ class ExchangeBid(BaseModel):
             return data
 
 
+class ExchangeLeg(BaseModel):
+    ticker_name: str
+    ticker_price: str
+    inverted: bool
+    rate_timestamp: int
+
+
 class ExchangeResponse(BaseModel):
     from_: str = Field(alias="from")
     to_: str = Field(alias="to")
@@ -69,15 +101,36 @@ class ExchangeResponse(BaseModel):
     amount_from: str
     amount_to: str
     rate_timestamp: int
+    # only set for pairs converted over an inverse or cross rate
+    legs: list[ExchangeLeg] | None = None
 
     class Config:
         populate_by_name = True
 
 
+class ExchangeBatchError(BaseModel):
+    type: str
+    detail: Any
+
+
+class ExchangeBatchItem(BaseModel):
+    """Result of one bid of a batch, either the conversion or why it failed."""
+
+    result: ExchangeResponse | None = None
+    error: ExchangeBatchError | None = None
+
+
+class ExchangeStreamItem(ExchangeBatchItem):
+    """Quote of the bid at `index` of the streaming subscription."""
+
+    index: int
+
+
 class BinanceTicker(BaseModel):
     ticker_name: str
     price: str
     timestamp: int
+    version: int = 0
 
     def is_fresh(self):
         binance_timestamp = datetime.datetime.fromtimestamp(
@@ -103,8 +156,67 @@ class BinanceTicker(BaseModel):
         }
         return BinanceTicker(**data)
 
-    def get_quantized_price(self):
-        return quantize(self.price)
+    def get_quantized_price(self) -> Decimal:
+        return price_quote(self.price).quantized
+
+    def get_display_price(self) -> str:
+        return price_quote(self.price).display
+
+
+class TickerRecord(NamedTuple):
+    """Compact, unvalidated ticker as decoded from the binance stream."""
+
+    ticker_name: str
+    price: str
+    timestamp: int
+    # bumped by the consumer on every price change of the symbol
+    version: int = 0
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "ticker_name": self.ticker_name,
+            "price": self.price,
+            "timestamp": self.timestamp,
+            "version": self.version,
+        }
+
+
+def encode_ticker_update(
+    records: Iterable[TickerRecord], inserted: Container[str] = ()
+) -> str:
+    """Payload the consumer publishes after a flush.
+
+    {name: [price, timestamp, version, inserted]}, inserted is 1 for the
+    tickers that got a new row in postgres with this flush, 0 for heartbeats.
+    """
+    return json.dumps(
+        {
+            record.ticker_name: [
+                record.price,
+                record.timestamp,
+                record.version,
+                int(record.ticker_name in inserted),
+            ]
+            for record in records
+        },
+        separators=(",", ":"),
+    )
+
+
+def decode_ticker_update(
+    payload: str | bytes,
+) -> tuple[list[TickerRecord], list[TickerRecord]]:
+    """All the published tickers, and those of them inserted in postgres."""
+    records = []
+    inserted = []
+
+    for ticker_name, (price, timestamp, version, row) in json.loads(payload).items():
+        records.append(TickerRecord(ticker_name, price, timestamp, version))
+
+        if row:
+            inserted.append(records[-1])
+
+    return records, inserted
 
 
 class BinanceTickerAggregationInfoResponse(BaseModel):
@@ -118,6 +230,25 @@ class BinanceTickerAggregationInfoResponse(BaseModel):
         arbitrary_types_allowed = True
 
 
+# served by /aggregation/candles, all rolled up from the minute candles
+CandleInterval = Literal["1m", "5m", "1h"]
+CANDLE_INTERVALS = {
+    "1m": datetime.timedelta(minutes=1),
+    "5m": datetime.timedelta(minutes=5),
+    "1h": datetime.timedelta(hours=1),
+}
+
+
+class BinanceTickerCandle(BaseModel):
+    open_time: datetime.datetime
+    open: str
+    high: str
+    low: str
+    close: str
+    # ticks stored within the interval, the stream volumes are not ingested
+    ticks: int
+
+
 class DetailMessage(BaseModel):
     errors: Any  # json errors, primarily validation errors
     body: Any = None
@@ -0,0 +1,168 @@
+"""How the tickers are laid out in redis.
+
+hash:     one hash per symbol, {ticker_name, price, timestamp, version}, each
+          with a TTL.
+snapshot: all symbols as "price:timestamp:version" fields of the
+          REDIS_TICKER_KEY hash, for single symbol reads and one HGETALL of
+          everything, plus one binary snapshot string per consumer shard,
+          loaded with one GET.
+"""
+
+import struct
+from typing import Iterable
+
+import redis.asyncio as redis
+
+from crypto_converter.common.models import TickerRecord
+from crypto_converter.common.settings import (
+    CONSUMER_SHARDS,
+    REDIS_PIPELINE_CHUNK_SIZE,
+    REDIS_TICKER_KEY,
+)
+
+HASH_LAYOUT = "hash"
+SNAPSHOT_LAYOUT = "snapshot"
+LAYOUTS = (HASH_LAYOUT, SNAPSHOT_LAYOUT)
+
+SNAPSHOT_MAGIC = b"TKS"
+SNAPSHOT_FORMAT = 2
+# magic, format, snapshot version (ms timestamp of the flush), records count
+SNAPSHOT_HEADER = struct.Struct("!3sBQI")
+# name length, price length, timestamp, ticker version (format 2 on), followed by
+# the name and price bytes
+SNAPSHOT_RECORDS = {1: struct.Struct("!BBq"), 2: struct.Struct("!BBqQ")}
+SNAPSHOT_RECORD = SNAPSHOT_RECORDS[SNAPSHOT_FORMAT]
+
+
+def snapshot_key(shard_index: int = 0, ticker_key: str = REDIS_TICKER_KEY) -> str:
+    return f"{ticker_key}:snapshot:{shard_index}"
+
+
+def snapshot_keys(
+    shards_count: int = CONSUMER_SHARDS, ticker_key: str = REDIS_TICKER_KEY
+) -> list[str]:
+    return [
+        snapshot_key(shard_index, ticker_key) for shard_index in range(shards_count)
+    ]
+
+
+def encode_snapshot(records: Iterable[TickerRecord], version: int) -> bytes:
+    body = bytearray()
+    count = 0
+
+    for record in records:
+        name = record.ticker_name.encode()
+        price = record.price.encode()
+        body += SNAPSHOT_RECORD.pack(
+            len(name), len(price), record.timestamp, record.version
+        )
+        body += name
+        body += price
+        count += 1
+
+    return SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_FORMAT, version, count) + body
+
+
+def decode_snapshot(blob: bytes) -> tuple[int, list[TickerRecord]]:
+    magic, snapshot_format, version, count = SNAPSHOT_HEADER.unpack_from(blob)
+
+    # the snapshots of a consumer not upgraded yet are still read, without versions
+    if magic != SNAPSHOT_MAGIC or snapshot_format not in SNAPSHOT_RECORDS:
+        raise ValueError(
+            f"Unsupported ticker snapshot {magic!r} format {snapshot_format}"
+        )
+
+    record_struct = SNAPSHOT_RECORDS[snapshot_format]
+    offset = SNAPSHOT_HEADER.size
+    records = []
+
+    for _ in range(count):
+        name_length, price_length, *stamps = record_struct.unpack_from(blob, offset)
+        offset += record_struct.size
+        name_end = offset + name_length
+        price_end = name_end + price_length
+        records.append(
+            TickerRecord(
+                blob[offset:name_end].decode(),
+                blob[name_end:price_end].decode(),
+                *stamps,
+            )
+        )
+        offset = price_end
+
+    return version, records
+
+
+def encode_price_field(record: TickerRecord) -> str:
+    return f"{record.price}:{record.timestamp}:{record.version}"
+
+
+def decode_price_field(ticker_name: str, value: str | bytes) -> TickerRecord:
+    if isinstance(value, bytes):
+        value = value.decode()
+
+    # fields written before the versions only hold "price:timestamp"
+    price, timestamp, *version = value.split(":")
+    return TickerRecord(ticker_name, price, int(timestamp), *map(int, version))
+
+
+async def scan_ticker_hashes(
+    redis_client: redis.StrictRedis, chunk_size: int = REDIS_PIPELINE_CHUNK_SIZE
+) -> list[TickerRecord]:
+    """All tickers of the hash layout, with SCAN instead of a blocking KEYS *."""
+    records = []
+    keys = []
+
+    async def fetch(chunk: list[bytes]):
+        async with redis_client.pipeline(transaction=False) as pipe:
+            for key in chunk:
+                pipe.hgetall(key)
+
+            for item in await pipe.execute():
+                if {b"ticker_name", b"price", b"timestamp"} <= item.keys():
+                    records.append(
+                        TickerRecord(
+                            item[b"ticker_name"].decode(),
+                            item[b"price"].decode(),
+                            int(item[b"timestamp"]),
+                            int(item.get(b"version", 0)),
+                        )
+                    )
+
+    async for key in redis_client.scan_iter(count=chunk_size, _type="hash"):
+        # the symbols hash of the snapshot layout
+        if key == REDIS_TICKER_KEY.encode():
+            continue
+
+        keys.append(key)
+
+        if len(keys) == chunk_size:
+            await fetch(keys)
+            keys = []
+
+    if keys:
+        await fetch(keys)
+
+    return records
+
+
+async def load_snapshots(
+    redis_client: redis.StrictRedis, keys: list[str] | None = None
+) -> list[TickerRecord]:
+    """All tickers of the snapshot layout, one MGET of the shard snapshots."""
+    records = []
+
+    for blob in await redis_client.mget(keys or snapshot_keys()):
+        if blob:
+            records.extend(decode_snapshot(blob)[1])
+
+    return records
+
+
+async def load_tickers(
+    redis_client: redis.StrictRedis, layout: str
+) -> list[TickerRecord]:
+    if layout == SNAPSHOT_LAYOUT:
+        return await load_snapshots(redis_client)
+
+    return await scan_ticker_hashes(redis_client)
@@ -0,0 +1,276 @@
+"""Latest tickers in a memory mapped file, shared by the API worker processes.
+
+A single writer (the sidecar, see api/exchange/ticker_table_sidecar.py) keeps
+the table in sync with redis, the workers read it without any round trip.
+
+Layout: a 64 bytes header followed by `slots` slots of 64 bytes.
+
+header: magic, format, slots, used slots, generation, heartbeat (ms)
+slot:   sequence, timestamp, name length, price length, name, price
+
+Slots are found by open addressing on the crc32 of the symbol (stable across
+processes, unlike hash()) and never freed: a symbol keeps its slot for the
+life of the file. Writes are guarded by sequence locks, odd while a write is
+in progress: the slot sequence for single reads, the header generation for a
+whole flush. A reader copies what it needs and retries until it saw the same
+even sequence before and after, so it never returns half of a write.
+"""
+
+import mmap
+import os
+import struct
+import time
+import zlib
+from typing import Iterable
+
+from crypto_converter.common.common import configure_logger
+from crypto_converter.common.metrics import metrics
+from crypto_converter.common.models import TickerRecord
+
+logger = configure_logger(__name__)
+
+TABLE_MAGIC = b"TKT1"
+TABLE_FORMAT = 1
+TABLE_HEADER = struct.Struct("<4sIIIQq32x")
+NAME_SIZE = 22
+PRICE_SIZE = 24
+SLOT = struct.Struct(f"<QqBB{NAME_SIZE}s{PRICE_SIZE}s")
+SEQUENCE = struct.Struct("<Q")
+COUNT = struct.Struct("<I")
+# offsets of the header fields the writer updates in place, and of the name
+# length within a slot, zero for a free slot
+USED_OFFSET = 12
+GENERATION_OFFSET = 16
+HEARTBEAT_OFFSET = 24
+NAME_LENGTH_OFFSET = 16
+# a reader racing with the writer this many times in a row gives up
+READ_RETRIES = 100
+
+
+class TickerTable:
+    def __init__(self, path: str, buffer: mmap.mmap, writable: bool = False):
+        magic, table_format, slots, *_ = TABLE_HEADER.unpack_from(buffer)
+
+        if magic != TABLE_MAGIC or table_format != TABLE_FORMAT:
+            raise ValueError(
+                f"Unsupported ticker table {path}: {magic!r} format {table_format}"
+            )
+
+        self.path = path
+        self.buffer = buffer
+        self.slots = slots
+        self.writable = writable
+        # writer only: symbol -> (slot offset, timestamp)
+        self.index: dict[str, tuple[int, int]] = {}
+
+        if writable:
+            for offset, record in self.scan():
+                self.index[record.ticker_name] = offset, record.timestamp
+
+    @classmethod
+    def create(cls, path: str, slots: int) -> "TickerTable":
+        """Replaces the table at `path` with an empty one, opened for writing.
+
+        The file is built aside and renamed over, so a worker opening `path`
+        meanwhile sees either the old table or the new, never a partial one.
+        """
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+
+        with open(tmp_path, "wb") as table_file:
+            table_file.write(
+                TABLE_HEADER.pack(TABLE_MAGIC, TABLE_FORMAT, slots, 0, 0, 0)
+            )
+            table_file.truncate(TABLE_HEADER.size + slots * SLOT.size)
+
+        os.replace(tmp_path, path)
+        logger.warning("Created ticker table %s with %s slots", path, slots)
+        return cls.open(path, writable=True)
+
+    @classmethod
+    def open(cls, path: str, writable: bool = False) -> "TickerTable":
+        with open(path, "r+b" if writable else "rb") as table_file:
+            buffer = mmap.mmap(
+                table_file.fileno(),
+                0,
+                access=mmap.ACCESS_WRITE if writable else mmap.ACCESS_READ,
+            )
+
+        return cls(path, buffer, writable)
+
+    def __len__(self):
+        return COUNT.unpack_from(self.buffer, USED_OFFSET)[0]
+
+    def close(self):
+        self.buffer.close()
+
+    @property
+    def heartbeat(self) -> int:
+        return SEQUENCE.unpack_from(self.buffer, HEARTBEAT_OFFSET)[0]
+
+    @heartbeat.setter
+    def heartbeat(self, value: int):
+        SEQUENCE.pack_into(self.buffer, HEARTBEAT_OFFSET, value)
+
+    def is_live(self, max_age: float) -> bool:
+        """Whether the writer is in sync with redis and still beating."""
+        heartbeat = self.heartbeat
+        return bool(heartbeat) and time.time() * 1000 - heartbeat < max_age * 1000
+
+    def slot_offset(self, name: str | bytes) -> int:
+        if isinstance(name, str):
+            name = name.encode()
+
+        return TABLE_HEADER.size + zlib.crc32(name) % self.slots * SLOT.size
+
+    def read_slot(self, offset: int) -> tuple | None:
+        for _ in range(READ_RETRIES):
+            slot = SLOT.unpack_from(self.buffer, offset)
+            sequence = SEQUENCE.unpack_from(self.buffer, offset)[0]
+
+            if sequence == slot[0] and not sequence & 1:
+                return slot
+
+            metrics.inc("ticker_table_read_retries")
+
+        return None
+
+    def get(self, ticker_name: str) -> TickerRecord | None:
+        """The ticker of one symbol, None if unknown or the read kept racing."""
+        name = ticker_name.encode()
+        offset = self.slot_offset(name)
+        end = TABLE_HEADER.size + self.slots * SLOT.size
+
+        for _ in range(self.slots):
+            slot = self.read_slot(offset)
+
+            if slot is None or not slot[2]:
+                return None
+
+            _, timestamp, name_length, price_length, slot_name, price = slot
+
+            if slot_name[:name_length] == name:
+                return TickerRecord(
+                    ticker_name, price[:price_length].decode(), timestamp
+                )
+
+            offset += SLOT.size
+
+            if offset == end:
+                offset = TABLE_HEADER.size
+
+        return None
+
+    def get_many(self, ticker_names: Iterable[str]) -> dict[str, TickerRecord] | None:
+        """The tickers of the symbols found, all from the same flush.
+
+        None when every attempt overlapped with a flush of the writer.
+        """
+        ticker_names = list(ticker_names)
+
+        for _ in range(READ_RETRIES):
+            generation = SEQUENCE.unpack_from(self.buffer, GENERATION_OFFSET)[0]
+
+            if generation & 1:
+                metrics.inc("ticker_table_read_retries")
+                continue
+
+            records = {}
+
+            for ticker_name in ticker_names:
+                record = self.get(ticker_name)
+
+                if record is not None:
+                    records[ticker_name] = record
+
+            if SEQUENCE.unpack_from(self.buffer, GENERATION_OFFSET)[0] == generation:
+                return records
+
+            metrics.inc("ticker_table_read_retries")
+
+        return None
+
+    def scan(self) -> Iterable[tuple[int, TickerRecord]]:
+        for offset in range(
+            TABLE_HEADER.size, TABLE_HEADER.size + self.slots * SLOT.size, SLOT.size
+        ):
+            slot = self.read_slot(offset)
+
+            if slot is None or not slot[2]:
+                continue
+
+            _, timestamp, name_length, price_length, name, price = slot
+            yield offset, TickerRecord(
+                name[:name_length].decode(), price[:price_length].decode(), timestamp
+            )
+
+    def records(self) -> list[TickerRecord]:
+        return [record for _, record in self.scan()]
+
+    def claim_slot(self, name: bytes) -> int | None:
+        offset = self.slot_offset(name)
+        end = TABLE_HEADER.size + self.slots * SLOT.size
+
+        for _ in range(self.slots):
+            if not self.buffer[offset + NAME_LENGTH_OFFSET]:
+                return offset
+
+            offset += SLOT.size
+
+            if offset == end:
+                offset = TABLE_HEADER.size
+
+        return None
+
+    def write(self, records: Iterable[TickerRecord]) -> int:
+        """Stores a flush of tickers, older ones than those stored are skipped."""
+        generation = SEQUENCE.unpack_from(self.buffer, GENERATION_OFFSET)[0]
+        SEQUENCE.pack_into(self.buffer, GENERATION_OFFSET, generation + 1)
+        written = 0
+
+        try:
+            for record in records:
+                written += self.write_record(record)
+
+        finally:
+            SEQUENCE.pack_into(self.buffer, GENERATION_OFFSET, generation + 2)
+
+        metrics.inc("ticker_table_writes", written)
+        return written
+
+    def write_record(self, record: TickerRecord) -> bool:
+        name = record.ticker_name.encode()
+        price = record.price.encode()
+        offset, timestamp = self.index.get(record.ticker_name, (None, 0))
+
+        if record.timestamp < timestamp:
+            return False
+
+        if len(name) > NAME_SIZE or len(price) > PRICE_SIZE:
+            metrics.inc("ticker_table_oversized")
+            return False
+
+        if offset is None:
+            offset = self.claim_slot(name)
+
+            if offset is None:
+                metrics.inc("ticker_table_full")
+                logger.error("Ticker table is full, %s not stored", record.ticker_name)
+                return False
+
+            COUNT.pack_into(self.buffer, USED_OFFSET, len(self.index) + 1)
+
+        sequence = SEQUENCE.unpack_from(self.buffer, offset)[0]
+        SEQUENCE.pack_into(self.buffer, offset, sequence + 1)
+        SLOT.pack_into(
+            self.buffer,
+            offset,
+            sequence + 1,
+            record.timestamp,
+            len(name),
+            len(price),
+            name,
+            price,
+        )
+        SEQUENCE.pack_into(self.buffer, offset, sequence + 2)
+        self.index[record.ticker_name] = offset, record.timestamp
+        return True
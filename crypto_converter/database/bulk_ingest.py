@@ -0,0 +1,115 @@
+import json
+from datetime import datetime
+
+from asyncpg.exceptions import ForeignKeyViolationError
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+from crypto_converter.common.common import configure_logger
+from crypto_converter.common.models import TickerRecord
+from crypto_converter.common.settings import TICKER_DATA_JSON
+from crypto_converter.database.db import engine
+from crypto_converter.database.db_models import (
+    BinanceTickerDataModel,
+    BinanceTickersModel,
+)
+
+logger = configure_logger(__name__)
+
+TICKER_DATA_COLUMNS = ["ticker_id", "price", "timestamp", "created_at"]
+TICKER_DATA_JSON_COLUMNS = TICKER_DATA_COLUMNS + ["json_data"]
+
+
+class TickerBulkIngestor:
+    """Streams ticker batches into binance_tickers_data with binary COPY.
+
+    Keeps a process-wide ticker_name -> ticker_id cache, so the tickers list is
+    read once and afterwards only the symbols never seen before get inserted.
+    """
+
+    def __init__(
+        self, db_engine: AsyncEngine = engine, store_json: bool = TICKER_DATA_JSON
+    ):
+        self.engine = db_engine
+        self.store_json = store_json
+        self.ticker_ids: dict[str, int] = {}
+        self.loaded = False
+
+    async def ingest(self, tickers: dict[str, TickerRecord]) -> int:
+        try:
+            return await self._ingest(tickers)
+
+        except ForeignKeyViolationError:
+            # tickers were deleted behind our back, the cache is stale
+            logger.warning("Ticker id cache is stale, reloading it")
+            self.reset()
+            return await self._ingest(tickers)
+
+    def reset(self):
+        self.ticker_ids = {}
+        self.loaded = False
+
+    async def _ingest(self, tickers: dict[str, TickerRecord]) -> int:
+        rows = [record for record in tickers.values() if record.ticker_name]
+
+        if not rows:
+            return 0
+
+        async with self.engine.begin() as connection:
+            ticker_ids = await self._resolve_ticker_ids(
+                connection, {record.ticker_name for record in rows}
+            )
+            created_at = datetime.utcnow()
+            # the price string goes as is, asyncpg encodes it as a binary numeric
+            records = [
+                (
+                    ticker_ids[record.ticker_name],
+                    record.price,
+                    record.timestamp,
+                    created_at,
+                )
+                for record in rows
+            ]
+            columns = TICKER_DATA_COLUMNS
+
+            if self.store_json:
+                records = [
+                    (*row, json.dumps(record.as_dict()))
+                    for row, record in zip(records, rows)
+                ]
+                columns = TICKER_DATA_JSON_COLUMNS
+
+            raw_connection = await connection.get_raw_connection()
+            await raw_connection.driver_connection.copy_records_to_table(
+                BinanceTickerDataModel.__tablename__,
+                records=records,
+                columns=columns,
+            )
+
+        # only publishing the new ids once the transaction is committed
+        self.ticker_ids = ticker_ids
+        return len(records)
+
+    async def _resolve_ticker_ids(
+        self, connection: AsyncConnection, ticker_names: set[str]
+    ) -> dict[str, int]:
+        if not self.loaded:
+            result = await connection.execute(
+                select(BinanceTickersModel.ticker_name, BinanceTickersModel.id)
+            )
+            self.ticker_ids = dict(result.all())
+            self.loaded = True
+
+        unseen = ticker_names - self.ticker_ids.keys()
+
+        if not unseen:
+            return self.ticker_ids
+
+        result = await connection.execute(
+            insert(BinanceTickersModel)
+            .values([{"ticker_name": ticker_name} for ticker_name in unseen])
+            .returning(BinanceTickersModel.ticker_name, BinanceTickersModel.id)
+        )
+        logger.info("Registered %s new tickers", len(unseen))
+
+        return {**self.ticker_ids, **dict(result.all())}
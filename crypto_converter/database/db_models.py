@@ -1,6 +1,7 @@
 from datetime import datetime
+from decimal import Decimal
 from typing import List
-from sqlalchemy import BigInteger, String, JSON, ForeignKey, Float
+from sqlalchemy import BigInteger, String, JSON, ForeignKey, Float, Numeric
 from sqlalchemy.orm import Mapped, declarative_base, mapped_column, relationship
 import sqlalchemy as sa
 
@@ -9,7 +10,19 @@ Base = declarative_base()
 
 
 class BinanceTickerDataModel(Base):
+    """Every flushed tick, partitioned by day of created_at.
+
+    The partitions are created ahead and dropped past the retention by the
+    maintain-partitions command, see database/partitions.py.
+    """
+
     __tablename__ = "binance_tickers_data"
+    __table_args__ = (
+        sa.Index(
+            "ix_binance_tickers_data_ticker_id_created_at", "ticker_id", "created_at"
+        ),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
 
@@ -18,11 +31,14 @@ class BinanceTickerDataModel(Base):
     )
     ticker: Mapped["BinanceTickersModel"] = relationship()
 
-    price: Mapped[str] = mapped_column(String(50))
+    # numeric, aggregated as is instead of being cast from text on every row
+    price: Mapped[Decimal] = mapped_column(Numeric)
     timestamp: Mapped[BigInteger] = mapped_column(BigInteger)
-    created_at = sa.Column(sa.DateTime, default=datetime.utcnow, nullable=True)
+    # the partition key has to be part of the primary key
+    created_at = sa.Column(sa.DateTime, default=datetime.utcnow, primary_key=True)
 
-    json_data = mapped_column(JSON)
+    # only written with TICKER_DATA_JSON, it repeats the columns above
+    json_data = mapped_column(JSON, nullable=True)
 
 
 class BinanceTickerAggregatedData(Base):
@@ -41,6 +57,70 @@ class BinanceTickerAggregatedData(Base):
     created_at = sa.Column(sa.DateTime, default=datetime.utcnow, nullable=True)
 
 
+class BinanceTickerHourlyPrices(Base):
+    """Per ticker and hour price summaries of the rolling 24h window."""
+
+    __tablename__ = "binance_tickers_hourly_prices"
+
+    ticker_id: Mapped[int] = mapped_column(
+        ForeignKey("binance_tickers_list.id", ondelete="CASCADE"), primary_key=True
+    )
+    bucket = sa.Column(sa.DateTime, primary_key=True)
+
+    min_price: Mapped[float] = mapped_column(Float(50))
+    max_price: Mapped[float] = mapped_column(Float(50))
+    price_sum: Mapped[float] = mapped_column(Float(50))
+    price_count: Mapped[int] = mapped_column(BigInteger)
+
+
+class BinanceTickerRollingPrices(Base):
+    """The rolling 24h min/avg/max of a ticker, kept up to date per flush."""
+
+    __tablename__ = "binance_tickers_rolling_prices"
+
+    ticker_id: Mapped[int] = mapped_column(
+        ForeignKey("binance_tickers_list.id", ondelete="CASCADE"), primary_key=True
+    )
+    ticker: Mapped["BinanceTickersModel"] = relationship()
+
+    min_price: Mapped[float] = mapped_column(Float(50))
+    avg_price: Mapped[float] = mapped_column(
+        Float(50), sa.Computed("price_sum / price_count")
+    )
+    max_price: Mapped[float] = mapped_column(Float(50))
+    price_sum: Mapped[float] = mapped_column(Float(50))
+    price_count: Mapped[int] = mapped_column(BigInteger)
+    # the first hour in the window, older buckets are left out
+    window_start = sa.Column(sa.DateTime, nullable=False)
+
+    created_at = sa.Column(sa.DateTime, default=datetime.utcnow, nullable=True)
+
+
+class BinanceTickerMinuteCandleModel(Base):
+    """OHLC of a ticker per minute of event time, kept up to date per flush.
+
+    Partitioned by day of the minute like binance_tickers_data, longer
+    candles are rolled up from these.
+    """
+
+    __tablename__ = "binance_tickers_minute_candles"
+    __table_args__ = ({"postgresql_partition_by": "RANGE (bucket)"},)
+
+    ticker_id: Mapped[int] = mapped_column(
+        ForeignKey("binance_tickers_list.id", ondelete="CASCADE"), primary_key=True
+    )
+    bucket = sa.Column(sa.DateTime, primary_key=True)
+
+    open: Mapped[Decimal] = mapped_column(Numeric)
+    high: Mapped[Decimal] = mapped_column(Numeric)
+    low: Mapped[Decimal] = mapped_column(Numeric)
+    close: Mapped[Decimal] = mapped_column(Numeric)
+    # event times (ms) of the ticks the open and the close come from
+    open_time: Mapped[int] = mapped_column(BigInteger)
+    close_time: Mapped[int] = mapped_column(BigInteger)
+    ticks: Mapped[int] = mapped_column(BigInteger)
+
+
 class BinanceTickersModel(Base):
     __tablename__ = "binance_tickers_list"
 
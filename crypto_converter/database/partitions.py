@@ -0,0 +1,165 @@
+import asyncio
+import re
+from datetime import date, datetime, time, timedelta
+from typing import NamedTuple
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from crypto_converter.common.common import configure_logger
+from crypto_converter.common.settings import (
+    TICKER_DATA_PARTITIONS_AHEAD,
+    TICKER_DATA_RETENTION_DAYS,
+)
+from crypto_converter.database.db import engine
+from crypto_converter.database.db_models import (
+    BinanceTickerDataModel,
+    BinanceTickerMinuteCandleModel,
+)
+
+logger = configure_logger(__name__)
+
+# tables partitioned by day, sharing the retention
+PARTITIONED_TABLES = (
+    BinanceTickerDataModel.__tablename__,
+    BinanceTickerMinuteCandleModel.__tablename__,
+)
+# e.g. FOR VALUES FROM (MINVALUE) TO ('2026-10-19 00:00:00')
+RANGE_BOUND = re.compile(r"FROM \((.+)\) TO \((.+)\)")
+
+
+class Partition(NamedTuple):
+    name: str
+    # None for an unbounded side (MINVALUE/MAXVALUE)
+    lower: datetime | None
+    upper: datetime | None
+
+    def covers(self, moment: datetime) -> bool:
+        return (self.lower is None or self.lower <= moment) and (
+            self.upper is None or moment < self.upper
+        )
+
+
+def partition_name(table: str, day: date) -> str:
+    return f"{table}_p{day:%Y%m%d}"
+
+
+def parse_bound(value: str) -> datetime | None:
+    if value in ("MINVALUE", "MAXVALUE"):
+        return None
+
+    return datetime.fromisoformat(value.strip("'"))
+
+
+def parse_partition(name: str, bound: str) -> Partition | None:
+    """The range of a partition from its pg_get_expr(relpartbound), None for DEFAULT."""
+    match = RANGE_BOUND.search(bound)
+
+    if match is None:
+        return None
+
+    return Partition(name, parse_bound(match[1]), parse_bound(match[2]))
+
+
+def plan_partitions(
+    partitions: list[Partition], today: date, ahead_days: int, retention_days: int
+) -> tuple[list[date], list[str]]:
+    """Days to create a partition for, and the partitions to drop.
+
+    A partition is only dropped once all of its range is older than the
+    retention, the legacy partition holding the history from before the
+    partitioning included.
+    """
+    if retention_days < 1:
+        raise ValueError("At least a day of ticker data has to be retained")
+
+    # the candles of a flush may fall on the day after it, or the one before
+    if ahead_days < 1:
+        raise ValueError("At least the partitions of tomorrow have to be created")
+
+    to_create = []
+
+    for offset in range(ahead_days + 1):
+        day = today + timedelta(days=offset)
+
+        if not any(p.covers(datetime.combine(day, time())) for p in partitions):
+            to_create.append(day)
+
+    cutoff = datetime.combine(today - timedelta(days=retention_days), time())
+    to_drop = [p.name for p in partitions if p.upper is not None and p.upper <= cutoff]
+    return to_create, to_drop
+
+
+async def load_partitions(db_engine: AsyncEngine, table: str) -> list[Partition]:
+    async with db_engine.connect() as connection:
+        rows = await connection.execute(
+            text(
+                """
+                SELECT child.relname, pg_get_expr(child.relpartbound, child.oid)
+                FROM pg_inherits
+                JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+                JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+                WHERE parent.relname = :table
+                """
+            ).bindparams(table=table)
+        )
+
+    partitions = [parse_partition(name, bound) for name, bound in rows]
+    return [partition for partition in partitions if partition is not None]
+
+
+async def maintain_partitions(
+    db_engine: AsyncEngine = engine,
+    ahead_days: int = TICKER_DATA_PARTITIONS_AHEAD,
+    retention_days: int = TICKER_DATA_RETENTION_DAYS,
+    today: date | None = None,
+) -> tuple[list[str], list[str]]:
+    """Creates the daily partitions of the coming days and drops the expired ones.
+
+    The partitioned tables are written in UTC, so are the days. Dropping a
+    partition removes its rows, indexes included, without the DELETE and the
+    vacuum.
+    """
+    today = today or datetime.utcnow().date()
+    created = []
+    dropped = []
+
+    for table in PARTITIONED_TABLES:
+        partitions = await load_partitions(db_engine, table)
+        to_create, to_drop = plan_partitions(
+            partitions, today, ahead_days, retention_days
+        )
+
+        # a transaction each, the parent is only locked for one statement at a time
+        for day in to_create:
+            async with db_engine.begin() as connection:
+                await connection.execute(
+                    text(
+                        f'CREATE TABLE IF NOT EXISTS "{partition_name(table, day)}" '
+                        f'PARTITION OF "{table}" '
+                        f"FOR VALUES FROM ('{day}') TO ('{day + timedelta(days=1)}')"
+                    )
+                )
+
+        for name in to_drop:
+            async with db_engine.begin() as connection:
+                await connection.execute(text(f'DROP TABLE IF EXISTS "{name}"'))
+
+        created.extend(partition_name(table, day) for day in to_create)
+        dropped.extend(to_drop)
+
+    logger.warning(
+        "Partitions created: %s, dropped: %s", created or "none", dropped or "none"
+    )
+    return created, dropped
+
+
+def maintain_partitions_main(ahead_days: int, retention_days: int):
+    async def run():
+        try:
+            await maintain_partitions(engine, ahead_days, retention_days)
+
+        finally:
+            await engine.dispose()
+
+    asyncio.run(run())
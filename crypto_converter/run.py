@@ -1,7 +1,17 @@
 import click
 
 from crypto_converter.binance_consumer.aio_binance_api import quote_consumer_main
+from crypto_converter.binance_consumer.layout_migration import migrate_tickers_main
+from crypto_converter.binance_consumer.replay_server import replay_server_main
+from crypto_converter.binance_consumer.supervisor import ConsumerSupervisor
 from crypto_converter.api.app import start_exchange_api
+from crypto_converter.common.settings import (
+    BINANCE_STREAM_URL,
+    CONSUMER_SHARDS,
+    TICKER_DATA_PARTITIONS_AHEAD,
+    TICKER_DATA_RETENTION_DAYS,
+)
+from crypto_converter.database.partitions import maintain_partitions_main
 
 
 @click.group()
@@ -10,9 +20,90 @@ def cli():
 
 
 @cli.command()
-def quotes_consumer():
+@click.option(
+    "--shards",
+    default=CONSUMER_SHARDS,
+    show_default=True,
+    help="Consumer processes to split the symbols between",
+)
+@click.option(
+    "--stream-url",
+    default=BINANCE_STREAM_URL,
+    show_default=True,
+    help="Binance stream, or a local replay-server e.g. ws://localhost:9443",
+)
+def quotes_consumer(shards: int, stream_url: str):
     print("inside quotes_consumer")
-    quote_consumer_main()
+
+    if shards > 1:
+        ConsumerSupervisor(shards, stream_url=stream_url).run()
+    else:
+        quote_consumer_main(stream_url=stream_url)
+
+
+@cli.command()
+@click.option(
+    "--frames",
+    required=True,
+    type=click.Path(exists=True, dir_okay=False),
+    help="Recorded frames, one websocket message per line",
+)
+@click.option("--host", default="0.0.0.0", show_default=True)
+@click.option("--port", default=9443, show_default=True)
+@click.option(
+    "--speed",
+    default="1",
+    show_default=True,
+    help="Replay speed multiplier (1, 10, ...) or 'max' to send without pauses",
+)
+@click.option("--loop/--no-loop", default=True, show_default=True)
+@click.option(
+    "--rebase-time/--keep-time",
+    default=True,
+    show_default=True,
+    help="Shift the event times to the moment a frame is sent",
+)
+def replay_server(
+    frames: str, host: str, port: int, speed: str, loop: bool, rebase_time: bool
+):
+    replay_server_main(frames, host, port, speed, loop, rebase_time)
+
+
+@cli.command()
+@click.option(
+    "--to",
+    "target_layout",
+    required=True,
+    type=click.Choice(["hash", "snapshot"]),
+    help="Layout to copy the tickers into, from the other one",
+)
+@click.option(
+    "--delete-source/--keep-source",
+    default=False,
+    show_default=True,
+    help="Delete the tickers of the source layout once copied",
+)
+def migrate_tickers(target_layout: str, delete_source: bool):
+    """Moves the tickers between the redis layouts, see REDIS_TICKER_LAYOUT."""
+    migrate_tickers_main(target_layout, delete_source)
+
+
+@cli.command()
+@click.option(
+    "--ahead-days",
+    default=TICKER_DATA_PARTITIONS_AHEAD,
+    show_default=True,
+    help="Days to create the partitions of the tick and candle tables for in advance",
+)
+@click.option(
+    "--retention-days",
+    default=TICKER_DATA_RETENTION_DAYS,
+    show_default=True,
+    help="Days of ticker data to keep, older partitions are dropped",
+)
+def maintain_partitions(ahead_days: int, retention_days: int):
+    """Creates the upcoming daily partitions of ticks and candles, drops the expired ones."""
+    maintain_partitions_main(ahead_days, retention_days)
 
 
 @cli.command()
@@ -7,6 +7,15 @@ delete from binance_tickers_list btl
 select * from binance_tickers_data
 select count(*) from binance_tickers_data
 
+-- old ticks are not deleted, whole days are dropped past the retention by
+-- python crypto_converter/run.py maintain-partitions
+select child.relname, pg_get_expr(child.relpartbound, child.oid)
+from pg_inherits
+inner join pg_class parent on parent.oid = pg_inherits.inhparent
+inner join pg_class child on child.oid = pg_inherits.inhrelid
+where parent.relname = 'binance_tickers_data'
+order by child.relname
+
 delete from alembic_version
 
 select * from binance_tickers_aggregated_data btad
@@ -23,7 +32,7 @@ inner join binance_tickers_aggregated_data btad on btl.id=btad.ticker_id
 where btl.ticker_name='btcusdt'
 
 
-select btl.ticker_name , btad."timestamp" , btad.price, AVG(btad.price::FLOAT) over (ORDER BY btad."timestamp" ROWS BETWEEN 9 PRECEDING AND CURRENT ROW) from binance_tickers_list btl
+select btl.ticker_name , btad."timestamp" , btad.price, AVG(btad.price) over (ORDER BY btad."timestamp" ROWS BETWEEN 9 PRECEDING AND CURRENT ROW) from binance_tickers_list btl
 inner join binance_tickers_data btad on btl.id=btad.ticker_id
 where btl.ticker_name='btcusdt'
 order by btad."timestamp"
\ No newline at end of file
@@ -5,7 +5,7 @@ from alembic.operations import Operations
 from alembic.runtime.migration import MigrationContext
 from alembic.script import ScriptDirectory
 from asyncpg import Connection
-from sqlalchemy import event, Transaction
+from sqlalchemy import event, text, Transaction
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy_utils import create_database, database_exists, drop_database
 from crypto_converter.common.common import logger
@@ -13,6 +13,7 @@ from crypto_converter.common.settings import PG_URL
 from fastapi.testclient import TestClient
 from argparse import Namespace
 from crypto_converter.database.db_models import Base
+from crypto_converter.database.partitions import PARTITIONED_TABLES
 from crypto_converter.api.app import create_fastapi_app
 
 
@@ -113,6 +114,14 @@ async def db_engine(create_test_database):
 
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        # create_all only declares the partitioned parents, tests write to any day
+        for table in PARTITIONED_TABLES:
+            await conn.execute(
+                text(
+                    f"CREATE TABLE IF NOT EXISTS {table}_default "
+                    f"PARTITION OF {table} DEFAULT"
+                )
+            )
 
     return engine
 
@@ -1,9 +1,55 @@
+import asyncio
+import json
 import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+from types import SimpleNamespace
 import pytest
 from unittest.mock import AsyncMock, patch
 from deepdiff import DeepDiff
-from crypto_converter.common.models import BinanceTicker
+from redis.exceptions import ConnectionError as RedisConnectionError
+from crypto_converter.api.aggregation.aggregation_cache import AggregationCache
+from crypto_converter.api.aggregation.aggregation_service import (
+    AggregationService,
+    candle_json,
+    get_aggregation_service,
+)
+from crypto_converter.api.exchange.exchange_service import (
+    ExchangeService,
+    get_exchange_service,
+)
+from crypto_converter.api.exchange.response_memo import ResponseMemo
+from crypto_converter.api.exchange.quote_stream import (
+    QuoteHub,
+    QuoteSubscription,
+    get_quote_hub,
+)
+from crypto_converter.api.exchange.routing import (
+    RouteLeg,
+    RoutingTable,
+    split_symbol,
+)
+from crypto_converter.api.exchange.ticker_cache import TickerCache, ticker_cache
+from crypto_converter.common.models import (
+    BinanceTicker,
+    BinanceTickerAggregationInfoResponse,
+    ExchangeBid,
+    TickerRecord,
+    encode_ticker_update,
+    quantize,
+)
+from crypto_converter.common.settings import (
+    CANDLES_MAX_BUCKETS,
+    EXCHANGE_BATCH_MAX_SIZE,
+)
+from crypto_converter.common.ticker_table import (
+    GENERATION_OFFSET,
+    SEQUENCE,
+    TickerTable,
+)
 from crypto_converter.api.app import create_fastapi_app
+from crypto_converter.common.common import record_redis_pool_metrics
+from crypto_converter.common.metrics import metrics
 
 app = create_fastapi_app()
 
@@ -180,6 +226,21 @@ def test_conversion_from(client, input_json, expected_json, redis_mock):
                 ]
             },
         ),
+        (
+            {"from": "btc", "to": "usdt", "amount_from": "abc"},
+            {
+                "detail": [
+                    {
+                        "type": "value_error",
+                        "loc": ["body", "amount_from"],
+                        "msg": "Value error, amount should be a number",
+                        "input": "abc",
+                        "ctx": {"error": {}},
+                        "url": "https://errors.pydantic.dev/2.8/v/value_error",
+                    }
+                ]
+            },
+        ),
     ],
 )
 def test_conversion_from_negative(client, input_json, expected_json, redis_mock):
@@ -194,3 +255,746 @@ def test_conversion_from_negative(client, input_json, expected_json, redis_mock)
 
         assert response.status_code == 422, resp_json
         assert diff == {}
+
+
+def test_ticker_cache_is_bypassed_until_subscribed():
+    cache = TickerCache(max_size=2)
+    cache.put("btcusdt", ticker_obj, cache.version)
+
+    assert cache.get("btcusdt") is None
+    assert len(cache) == 0
+
+
+def test_ticker_cache_evicts_least_recently_used():
+    cache = TickerCache(max_size=2)
+    cache.live = True
+
+    for ticker in ("btcusdt", "ethusdt"):
+        cache.put(ticker, ticker_obj, cache.version)
+
+    cache.get("btcusdt")
+    cache.put("apebtc", ticker_obj, cache.version)
+
+    assert list(cache.entries) == ["btcusdt", "apebtc"]
+
+
+def test_ticker_cache_dispatches_published_tickers_to_listeners():
+    received = []
+    cache = TickerCache(enabled=False, listeners=[received.append])
+    records = [TickerRecord("btcusdt", "1.5", 42)]
+
+    cache.dispatch(encode_ticker_update(records))
+
+    assert received == [records]
+
+
+def test_ticker_cache_refreshes_entries_from_published_updates():
+    cache = TickerCache()
+    cache.live = True
+    cache.put("btcusdt", ticker_obj, cache.version)
+    version = cache.version
+
+    records = [TickerRecord("btcusdt", "1.5", 42), TickerRecord("ethusdt", "2.5", 42)]
+    assert cache.apply_update(records) == 1
+
+    cached = cache.get("btcusdt")
+    assert (cached.price, cached.timestamp) == ("1.5", 42)
+    assert cache.get("ethusdt") is None
+
+    # a read that started before the update must not overwrite the refreshed entry
+    cache.put("btcusdt", ticker_obj, version)
+    assert cache.get("btcusdt").price == "1.5"
+
+
+def test_metrics_report_the_shared_redis_pool(client):
+    response = client.get("/metrics/")
+
+    assert response.status_code == 200
+    gauges = response.json()["gauges"]
+    assert gauges["redis_pool_size"] == client.app.state.redis_pool.max_connections
+    assert "redis_pool_usage_ratio" in gauges
+
+
+def test_metrics_report_whether_redis_is_available(client, redis_mock):
+    assert client.get("/metrics/").json()["gauges"]["redis_available"] == 1
+
+    redis_mock.side_effect = RedisConnectionError("redis is down")
+    assert client.get("/metrics/").json()["gauges"]["redis_available"] == 0
+
+
+def test_redis_pool_metrics_do_not_need_the_pool_internals():
+    pool = SimpleNamespace(max_connections=7)
+    metrics.reset()
+
+    record_redis_pool_metrics(pool, prefix="test_pool")
+
+    assert metrics.snapshot()["gauges"] == {"test_pool_size": 7}
+
+
+class SnapshotRedisMock:
+    """Serves HGETALL from a dict through a MULTI pipeline.
+
+    HGET/HMGET serve the tickers hash of the snapshot layout.
+    """
+
+    def __init__(self, tickers: dict[str, BinanceTicker]):
+        self.tickers = tickers
+        self.transactions = []
+        self.hmgets = []
+
+    async def hgetall(self, key):
+        return SnapshotPipelineMock(self.tickers).encode(key)
+
+    async def hget(self, name, key):
+        if key not in self.tickers:
+            return None
+
+        return f"{self.tickers[key].price}:{self.tickers[key].timestamp}".encode()
+
+    async def hmget(self, name, keys):
+        self.hmgets.append((name, keys))
+        return [await self.hget(name, key) for key in keys]
+
+    def pipeline(self, transaction):
+        self.transactions.append(transaction)
+        return SnapshotPipelineMock(self.tickers)
+
+
+class SnapshotPipelineMock:
+    def __init__(self, tickers):
+        self.tickers = tickers
+        self.keys = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        pass
+
+    def hgetall(self, key):
+        self.keys.append(key)
+
+    def encode(self, key):
+        if key not in self.tickers:
+            return {}
+
+        return {
+            field.encode(): str(value).encode()
+            for field, value in self.tickers[key].model_dump().items()
+        }
+
+    async def execute(self):
+        return [self.encode(key) for key in self.keys]
+
+
+def exchange_service_override(
+    redis_client, routing_table: RoutingTable | None = None, ticker_table=None
+):
+    return lambda: ExchangeService(
+        redis_client,
+        ticker_cache,
+        routing_table or RoutingTable(),
+        ticker_table,
+        ResponseMemo(enabled=False),
+    )
+
+
+@pytest.fixture
+def snapshot_redis(client):
+    fresh_ticker = ticker_obj.model_copy(
+        update={"ticker_name": "btcusdt", "timestamp": int(time.time() * 1000)}
+    )
+    stale_ticker = ticker_obj.model_copy(
+        update={"ticker_name": "ethusdt", "timestamp": 1706769690000}
+    )
+    redis_client = SnapshotRedisMock({"btcusdt": fresh_ticker, "ethusdt": stale_ticker})
+    client.app.dependency_overrides[get_exchange_service] = exchange_service_override(
+        redis_client
+    )
+
+    yield redis_client
+
+    client.app.dependency_overrides.clear()
+
+
+def test_conversion_batch_returns_per_item_results(client, snapshot_redis):
+    response = client.post(
+        "/exchange/batch",
+        json=[
+            {"from": "btc", "to": "usdt", "amount_from": 1},
+            {"from": "btc", "to": "usdt", "amount_from": 0.1111111},
+            {"from": "eth", "to": "usdt", "amount_from": 1},
+            {"from": "ape", "to": "usdt", "amount_to": 1},
+            {"from": "btc", "to": "usdt", "amount_to": 1000.0},
+            {"from": "btc", "to": "usdt", "amount_from": "abc"},
+        ],
+    )
+
+    assert response.status_code == 200, response.json()
+    items = response.json()
+    assert snapshot_redis.transactions == [True]
+
+    assert "error" not in items[0]
+    assert items[0]["result"]["amount_to"] == "43192.111223usdt"
+    assert items[0]["result"]["from"] == "btc"
+    assert items[1]["error"]["type"] == "validation_error"
+    assert items[1]["error"]["detail"][0]["type"] == "decimal_max_places"
+    assert items[2]["error"]["type"] == "no_valid_ticker"
+    assert items[3]["error"] == {
+        "type": "no_valid_ticker",
+        "detail": "No valid ticker available for ticker apeusdt",
+    }
+    assert items[4]["result"]["amount_from"] == "0.023152376017btc"
+    assert items[5]["error"]["type"] == "validation_error"
+    assert items[5]["error"]["detail"][0]["loc"] == ["amount_from"]
+
+
+def test_conversion_reads_the_snapshot_layout(client, snapshot_redis, monkeypatch):
+    monkeypatch.setattr(ExchangeService, "layout", "snapshot")
+
+    single = client.post(
+        "/exchange/", json={"from": "btc", "to": "usdt", "amount_from": 1}
+    )
+    items = client.post(
+        "/exchange/batch",
+        json=[
+            {"from": "btc", "to": "usdt", "amount_from": 1},
+            {"from": "eth", "to": "usdt", "amount_from": 1},
+            {"from": "ape", "to": "usdt", "amount_to": 1},
+        ],
+    ).json()
+
+    assert single.status_code == 200, single.json()
+    assert single.json()["amount_to"] == "43192.111223usdt"
+    assert snapshot_redis.transactions == []
+    assert [name for name, _ in snapshot_redis.hmgets] == ["tickers"]
+    assert items[0]["result"]["amount_to"] == "43192.111223usdt"
+    assert items[1]["error"]["type"] == "no_valid_ticker"
+    assert items[2]["error"]["type"] == "no_valid_ticker"
+
+
+def test_conversion_batch_size_is_limited(client, snapshot_redis):
+    bid = {"from": "btc", "to": "usdt", "amount_from": 1}
+
+    assert client.post("/exchange/batch", json=[]).status_code == 422
+    assert (
+        client.post(
+            "/exchange/batch", json=[bid] * (EXCHANGE_BATCH_MAX_SIZE + 1)
+        ).status_code
+        == 422
+    )
+
+
+@pytest.mark.parametrize(
+    "ticker_name,assets",
+    [
+        ("btcusdt", ("btc", "usdt")),
+        ("ethbtc", ("eth", "btc")),
+        ("btcfdusd", ("btc", "fdusd")),
+        ("usdt", None),
+        ("foobar", None),
+    ],
+)
+def test_split_symbol(ticker_name, assets):
+    assert split_symbol(ticker_name) == assets
+
+
+def test_routing_table_resolves_direct_inverse_and_bridge_legs():
+    table = RoutingTable()
+    now = int(time.time() * 1000)
+    table.update(
+        [TickerRecord(name, "1", now) for name in ("btcusdt", "ethusdt", "ethbtc")]
+    )
+
+    assert table.route("btc", "usdt") == (RouteLeg("btcusdt"),)
+    assert table.route("usdt", "btc") == (RouteLeg("btcusdt", inverted=True),)
+    assert table.route("eth", "btc") == (RouteLeg("ethbtc"),)
+
+    table.update([TickerRecord("apeusdt", "1", now)])
+    assert table.route("ape", "eth") == (
+        RouteLeg("apeusdt"),
+        RouteLeg("ethusdt", inverted=True),
+    )
+    assert table.route("ape", "doge") is None
+
+
+def test_routing_table_drops_stale_symbols():
+    table = RoutingTable(expiration=60)
+    now = int(time.time() * 1000)
+    table.update([TickerRecord("btcusdt", "1", now - 61_000)])
+    table.update([TickerRecord("ethusdt", "1", now)])
+
+    assert table.route("btc", "usdt") is None
+    assert table.route("usdt", "btc") is None
+    assert len(table) == 1
+
+
+@pytest.fixture
+def routed_redis(client):
+    now = int(time.time() * 1000)
+    tickers = {
+        "btcusdt": BinanceTicker(
+            ticker_name="btcusdt", price="43014.84", timestamp=now
+        ),
+        "ethusdt": BinanceTicker(ticker_name="ethusdt", price="2300.5", timestamp=now),
+    }
+    table = RoutingTable()
+    table.update([TickerRecord(name, "1", now) for name in tickers])
+    client.app.dependency_overrides[get_exchange_service] = exchange_service_override(
+        SnapshotRedisMock(tickers), table
+    )
+
+    yield tickers
+
+    client.app.dependency_overrides.clear()
+
+
+def test_conversion_over_inverse_ticker(client, routed_redis):
+    response = client.post(
+        "/exchange", json={"from": "usdt", "to": "btc", "amount_from": 1000}
+    )
+    resp_json = response.json()
+
+    assert response.status_code == 200, resp_json
+    assert resp_json["ticker_name"] == "usdtbtc"
+    assert resp_json["ticker_price"] == "0.000023247791"
+    assert resp_json["amount_to"] == "0.023247790762btc"
+    assert [(leg["ticker_name"], leg["inverted"]) for leg in resp_json["legs"]] == [
+        ("btcusdt", True)
+    ]
+
+
+def test_conversion_over_bridge_asset(client, routed_redis):
+    response = client.post(
+        "/exchange", json={"from": "eth", "to": "btc", "amount_to": 1}
+    )
+    resp_json = response.json()
+
+    assert response.status_code == 200, resp_json
+    assert resp_json["amount_from"] == "18.6980395566eth"
+    assert [(leg["ticker_name"], leg["inverted"]) for leg in resp_json["legs"]] == [
+        ("ethusdt", False),
+        ("btcusdt", True),
+    ]
+
+    # a direct pair is answered exactly as before, without legs
+    response = client.post(
+        "/exchange/batch", json=[{"from": "btc", "to": "usdt", "amount_from": 1}]
+    )
+    assert response.json() == [
+        {
+            "result": {
+                "from": "btc",
+                "to": "usdt",
+                "ticker_name": "btcusdt",
+                "ticker_price": "43014.84",
+                "amount_from": "1",
+                "amount_to": "43014.84usdt",
+                "rate_timestamp": routed_redis["btcusdt"].timestamp,
+            }
+        }
+    ]
+
+
+def test_stream_quotes_on_price_changes(client, routed_redis):
+    hub = QuoteHub()
+    client.app.dependency_overrides[get_quote_hub] = lambda: hub
+    now = int(time.time() * 1000)
+
+    with client.websocket_connect("/exchange/stream") as ws:
+        ws.send_json(
+            [
+                {"from": "btc", "to": "usdt", "amount_from": 1},
+                {"from": "usdt", "to": "eth", "amount_to": 0.1111111},
+                {"from": "usdt", "to": "eth", "amount_to": 1},
+            ]
+        )
+
+        invalid = ws.receive_json()
+        assert [item["index"] for item in invalid] == [1]
+        assert invalid[0]["error"]["type"] == "validation_error"
+
+        first = ws.receive_json()
+        assert [item["index"] for item in first] == [0, 2]
+        assert first[0]["result"]["amount_to"] == "43014.84usdt"
+        assert first[1]["result"]["amount_from"] == "2300.5usdt"
+        assert len(hub) == 1
+
+        # heartbeats and untouched tickers do not produce quotes
+        ws.portal.call(
+            hub.update,
+            [
+                TickerRecord("btcusdt", "43014.84", now + 1),
+                TickerRecord("ethusdt", "2400.5", now + 1),
+            ],
+        )
+        update = ws.receive_json()
+        assert [item["index"] for item in update] == [2]
+        assert update[0]["result"]["amount_from"] == "2400.5usdt"
+
+    # the subscription is gone with the client
+    for _ in range(50):
+        if not hub.subscriptions:
+            break
+        time.sleep(0.01)
+
+    assert hub.subscriptions == {}
+
+
+def test_stream_quotes_keeps_updates_published_while_reading_the_snapshot(
+    client, routed_redis, monkeypatch
+):
+    hub = QuoteHub()
+    client.app.dependency_overrides[get_quote_hub] = lambda: hub
+    read_snapshot = ExchangeService.get_tickers_snapshot
+    now = int(time.time() * 1000)
+
+    async def get_tickers_snapshot(self, tickers):
+        snapshot = await read_snapshot(self, tickers)
+        # published after the snapshot was read, before it reached the hub
+        hub.update([TickerRecord("btcusdt", "50000", now + 1)])
+        return snapshot
+
+    monkeypatch.setattr(ExchangeService, "get_tickers_snapshot", get_tickers_snapshot)
+
+    with client.websocket_connect("/exchange/stream") as ws:
+        ws.send_json([{"from": "btc", "to": "usdt", "amount_from": 1}])
+        first = ws.receive_json()
+
+    assert first[0]["result"]["amount_to"] == "50000usdt"
+
+
+@pytest.mark.parametrize("frame", [{"text": "not json"}, {"bytes": b"[]"}])
+def test_stream_quotes_closes_on_a_non_json_frame(client, routed_redis, frame):
+    with client.websocket_connect("/exchange/stream") as ws:
+        ws.send({"type": "websocket.receive", **frame})
+        message = ws.receive()
+
+    assert message["type"] == "websocket.close"
+    assert message["code"] == 1008
+
+
+def test_quote_subscription_coalesces_updates_for_slow_clients():
+    sent = []
+
+    async def send(indexes):
+        sent.append(indexes)
+        await asyncio.sleep(0.05)
+
+    async def run():
+        subscription = QuoteSubscription({0: ["btcusdt"], 1: ["ethusdt"]}, send)
+        task = asyncio.create_task(subscription.run())
+        await asyncio.sleep(0.01)
+
+        # all of these arrive while the first message is being sent
+        for _ in range(100):
+            subscription.notify("btcusdt")
+            subscription.notify("ethusdt")
+
+        await asyncio.sleep(0.1)
+        task.cancel()
+
+    asyncio.run(run())
+
+    assert sent == [[0, 1], [0, 1]]
+
+
+def test_ticker_price_is_quantized_once_per_price():
+    first = BinanceTicker(ticker_name="btcusdt", price="43192.1112235000", timestamp=1)
+    second = first.model_copy(update={"timestamp": 2})
+
+    assert first.get_quantized_price() == quantize("43192.1112235000")
+    assert first.get_quantized_price() is second.get_quantized_price()
+    assert first.get_display_price() == "43192.1112235"
+
+
+@pytest.fixture
+def ticker_table(tmp_path):
+    writer = TickerTable.create(str(tmp_path / "tickers"), slots=4)
+    reader = TickerTable.open(writer.path)
+
+    yield writer, reader
+
+    reader.close()
+    writer.close()
+
+
+def test_ticker_table_readers_see_the_writer_flushes(ticker_table):
+    writer, reader = ticker_table
+    now = int(time.time() * 1000)
+
+    assert (
+        writer.write(
+            [
+                TickerRecord("btcusdt", "63000.01", now),
+                TickerRecord("ethusdt", "3000", now),
+            ]
+        )
+        == 2
+    )
+    # an older ticker, e.g. from a load racing with a flush, is skipped
+    assert writer.write([TickerRecord("btcusdt", "1", now - 1)]) == 0
+    assert not writer.write([TickerRecord("x" * 30, "1", now)])
+
+    assert reader.get("btcusdt") == TickerRecord("btcusdt", "63000.01", now)
+    assert reader.get("apeusdt") is None
+    assert reader.get_many(["ethusdt", "apeusdt"]) == {
+        "ethusdt": TickerRecord("ethusdt", "3000", now)
+    }
+    assert len(reader) == 2
+
+    writer.write([TickerRecord(f"sym{i}usdt", "1", now) for i in range(3)])
+
+    assert len(reader) == 4
+    assert reader.get("sym2usdt") is None, "the table is full"
+    assert TickerTable.open(writer.path, writable=True).index.keys() == {
+        "btcusdt",
+        "ethusdt",
+        "sym0usdt",
+        "sym1usdt",
+    }
+
+
+def test_ticker_table_readers_do_not_read_during_a_flush(ticker_table):
+    writer, reader = ticker_table
+    writer.write([TickerRecord("btcusdt", "1", 1)])
+
+    assert not reader.is_live(max_age=5)
+    writer.heartbeat = int(time.time() * 1000)
+    assert reader.is_live(max_age=5)
+
+    SEQUENCE.pack_into(writer.buffer, GENERATION_OFFSET, 1)
+
+    assert reader.get("btcusdt") == TickerRecord("btcusdt", "1", 1)
+    assert reader.get_many(["btcusdt"]) is None
+
+
+def test_conversion_reads_the_ticker_table(client, ticker_table):
+    writer, reader = ticker_table
+    writer.write([TickerRecord("btcusdt", ticker_obj.price, int(time.time() * 1000))])
+
+    class NoRedis:
+        def __getattr__(self, name):
+            raise AssertionError(f"redis {name} called")
+
+    client.app.dependency_overrides[get_exchange_service] = exchange_service_override(
+        NoRedis(), ticker_table=reader
+    )
+
+    try:
+        single = client.post(
+            "/exchange/", json={"from": "btc", "to": "usdt", "amount_from": 1}
+        )
+        items = client.post(
+            "/exchange/batch", json=[{"from": "btc", "to": "usdt", "amount_to": 1}]
+        ).json()
+
+    finally:
+        client.app.dependency_overrides.clear()
+
+    assert single.status_code == 200, single.json()
+    assert single.json()["amount_to"] == "43192.111223usdt"
+    assert items[0]["result"]["ticker_name"] == "btcusdt"
+
+
+def test_response_memo_serves_identical_bids_until_the_ticker_moves():
+    memo = ResponseMemo(max_size=2, enabled=True)
+    service = ExchangeService(
+        None, TickerCache(enabled=False), RoutingTable(), None, memo
+    )
+    tickers = {"btcusdt": ticker_obj.model_copy(update={"ticker_name": "btcusdt"})}
+
+    async def get_ticker(ticker):
+        return tickers[ticker]
+
+    service.get_ticker = get_ticker
+    bid = ExchangeBid.model_validate({"from": "btc", "to": "usdt", "amount_from": 1})
+    same_bid = ExchangeBid.model_validate(
+        {"from": "btc", "to": "usdt", "amount_from": "1.0"}
+    )
+    first = asyncio.run(service.exchange_json(bid))
+
+    assert asyncio.run(service.exchange_json(same_bid)) is first
+    assert (memo.hits, memo.misses) == (1, 1)
+
+    tickers["btcusdt"] = tickers["btcusdt"].model_copy(
+        update={"price": "2", "timestamp": ticker_obj.timestamp + 1}
+    )
+    moved = asyncio.run(service.exchange_json(bid))
+    asyncio.run(
+        service.exchange_json(
+            ExchangeBid.model_validate({"from": "btc", "to": "usdt", "amount_to": 1})
+        )
+    )
+
+    assert json.loads(moved)["amount_to"] == "2usdt"
+    assert (memo.hits, memo.misses, len(memo)) == (1, 3, 2)
+    assert memo.key(bid, [tickers["btcusdt"]]) in memo.entries
+
+
+aggregation_obj = BinanceTickerAggregationInfoResponse(
+    ticker_name="btcusdt",
+    min_price=1.0,
+    max_price=3.0,
+    avg_price=2.0,
+    timestamp="2024-01-01T00:00:00",
+)
+
+
+def test_aggregation_cache_drops_entries_when_a_row_is_inserted():
+    cache = AggregationCache(ttl=60, max_size=2)
+    ticker_cache = TickerCache(enabled=False, insert_listeners=[cache.invalidate])
+    record = TickerRecord("btcusdt", "1.5", 42, 1)
+    cache.put("data", "btcusdt", aggregation_obj, cache.version)
+    cache.put("view", "btcusdt", aggregation_obj, cache.version)
+
+    # a heartbeat republishes the same price and inserts nothing
+    ticker_cache.dispatch(encode_ticker_update([record._replace(timestamp=43)]))
+    assert cache.get("data", "btcusdt")[0] is aggregation_obj
+
+    # a forced write of the same price does insert a row
+    version = cache.version
+    ticker_cache.dispatch(
+        encode_ticker_update([record._replace(timestamp=44)], inserted={"btcusdt"})
+    )
+    assert cache.get("view", "btcusdt") is None
+
+    # a read that started before the invalidation must not be cached
+    cache.put("data", "btcusdt", aggregation_obj, version)
+    assert len(cache) == 0
+
+    for ticker in ("btcusdt", "ethusdt", "apebtc"):
+        cache.put("data", ticker, aggregation_obj, cache.version)
+
+    assert list(cache.entries) == [("data", "ethusdt"), ("data", "apebtc")]
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_aggregation_cache_expires_entries_after_the_ttl(monkeypatch):
+    cache = AggregationCache(ttl=5, max_size=2)
+    cache.put("data", "btcusdt", aggregation_obj, cache.version)
+    now = time.monotonic()
+
+    monkeypatch.setattr(time, "monotonic", lambda: now + 4.5)
+    assert cache.get("data", "btcusdt")[1] >= 4
+
+    monkeypatch.setattr(time, "monotonic", lambda: now + 5.5)
+    assert cache.get("data", "btcusdt") is None
+
+
+def test_aggregation_is_read_once_while_subscribed(client):
+    subscription = TickerCache(enabled=False)
+    service = AggregationService(AggregationCache(ttl=60), subscription)
+    reads = []
+
+    async def read(ticker_name):
+        reads.append(ticker_name)
+        return aggregation_obj
+
+    service.read_aggregated_data = read
+    client.app.dependency_overrides[get_aggregation_service] = lambda: service
+
+    try:
+        # without the subscription no invalidation would arrive, nothing is cached
+        client.get("/aggregation/", params={"ticker_name": "btcusdt"})
+        subscription.live = True
+        responses = [
+            client.get("/aggregation/", params={"ticker_name": "btcusdt"})
+            for _ in range(2)
+        ]
+    finally:
+        client.app.dependency_overrides.clear()
+
+    assert reads == ["btcusdt", "btcusdt"]
+    assert responses[1].json() == responses[0].json()
+    assert [r.headers["age"] for r in responses] == ["0", "0"]
+    assert service.cache.hits == 1
+
+
+def test_candle_json_keeps_prices_exact():
+    row = (
+        datetime(2026, 10, 18, 13, 5),
+        Decimal("43192.11"),
+        Decimal("43200.5"),
+        Decimal("1.2E-7"),
+        Decimal("43190"),
+        Decimal("12"),
+    )
+
+    assert json.loads(candle_json(row)) == {
+        "open_time": "2026-10-18T13:05:00",
+        "open": "43192.11",
+        "high": "43200.5",
+        "low": "0.00000012",
+        "close": "43190",
+        "ticks": 12,
+    }
+
+
+@pytest.fixture
+def candles_service(client):
+    service = AggregationService()
+    calls = []
+
+    async def stream_candles(ticker_name, step, start, end):
+        calls.append((ticker_name, step, start, end))
+        yield b"["
+        yield candle_json((start, *[Decimal("1.5")] * 4, 3))
+        yield b","
+        yield candle_json((start + step, *[Decimal("2")] * 4, 1))
+        yield b"]"
+
+    service.stream_candles = stream_candles
+    client.app.dependency_overrides[get_aggregation_service] = lambda: service
+    yield calls
+    client.app.dependency_overrides.clear()
+
+
+def test_candles_are_streamed_from_the_aligned_start(client, candles_service):
+    response = client.get(
+        "/aggregation/candles",
+        params={
+            "ticker_name": "btcusdt",
+            "interval": "5m",
+            "from": "2026-10-18T15:07:30+02:00",
+            "to": "2026-10-18T14:00:00Z",
+        },
+    )
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/json"
+    assert [candle["open_time"] for candle in response.json()] == [
+        "2026-10-18T13:05:00",
+        "2026-10-18T13:10:00",
+    ]
+    assert candles_service == [
+        (
+            "btcusdt",
+            timedelta(minutes=5),
+            datetime(2026, 10, 18, 13, 5),
+            datetime(2026, 10, 18, 14),
+        )
+    ]
+
+
+@pytest.mark.parametrize(
+    "params",
+    [
+        {"interval": "2m", "from": "2026-10-18T13:00", "to": "2026-10-18T14:00"},
+        {"interval": "1m", "from": "2026-10-18T14:00", "to": "2026-10-18T14:00"},
+        {
+            "interval": "1m",
+            "from": "2026-10-18T00:00",
+            "to": (
+                datetime(2026, 10, 18) + timedelta(minutes=CANDLES_MAX_BUCKETS + 1)
+            ).isoformat(),
+        },
+    ],
+)
+def test_candles_range_is_validated(client, candles_service, params):
+    response = client.get(
+        "/aggregation/candles", params={"ticker_name": "btcusdt", **params}
+    )
+
+    assert response.status_code == 422
+    assert candles_service == []
@@ -0,0 +1,526 @@
+import asyncio
+import json
+import time
+from datetime import date, datetime
+from decimal import Decimal
+
+import pytest
+import websockets
+from sqlalchemy import func, select
+
+from crypto_converter.binance_consumer.decoder import (
+    decode_ticker_frame,
+    decode_ticker_frame_json,
+)
+from crypto_converter.binance_consumer.pipeline import FramePipeline
+from crypto_converter.binance_consumer.replay_server import FrameReplayer, parse_speed
+from crypto_converter.binance_consumer.redis_sink import RedisTickerSink
+from crypto_converter.binance_consumer.ticker_store import ChangeTracker, TickerStore
+from crypto_converter.common.models import (
+    BinanceTicker,
+    TickerRecord,
+    decode_ticker_update,
+)
+from crypto_converter.common.ticker_layout import (
+    SNAPSHOT_HEADER,
+    SNAPSHOT_MAGIC,
+    SNAPSHOT_RECORDS,
+    decode_price_field,
+    decode_snapshot,
+    encode_price_field,
+    encode_snapshot,
+)
+from crypto_converter.database.bulk_ingest import TickerBulkIngestor
+from crypto_converter.database.db_models import (
+    BinanceTickerDataModel,
+    BinanceTickersModel,
+)
+from crypto_converter.database.partitions import (
+    Partition,
+    parse_partition,
+    plan_partitions,
+)
+
+
+TICKER_FRAME = (
+    '{"stream":"!ticker@arr","data":['
+    '{"e":"24hrTicker","E":1727000000001,"s":"BTCUSDT","p":"-1.5","P":"-0.01",'
+    '"w":"63000.1","x":"63001.00","c":"63000.01000000","Q":"0.1","b":"63000.00",'
+    '"B":"1.2","a":"63000.02","A":"0.3","o":"63001.5","h":"63500.0","l":"62500.0",'
+    '"v":"100.5","q":"6331500.0","O":0,"C":86400000,"F":0,"L":18150,"n":18151},'
+    '{"e":"24hrTicker","E":1727000000002,"s":"APEBTC","p":"0","P":"0",'
+    '"w":"0.00003","x":"0.00003201","c":"0.00003201","Q":"5","b":"0.000032",'
+    '"B":"10","a":"0.000033","A":"10","o":"0.00003201","h":"0.00003201",'
+    '"l":"0.00003201","v":"10","q":"0.0003","O":0,"C":86400000,"F":0,"L":1,"n":2}'
+    "]}"
+)
+EXPECTED_RECORDS = [
+    TickerRecord("btcusdt", "63000.01000000", 1727000000001),
+    TickerRecord("apebtc", "0.00003201", 1727000000002),
+]
+
+
+class PipelineMock:
+    executed = []
+    # the ticker hashes in "redis", which the heartbeat script refreshes
+    hashes = {}
+
+    def __init__(self):
+        self.commands = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        pass
+
+    def __len__(self):
+        return len(self.commands)
+
+    def hset(self, name, key=None, value=None, mapping=None):
+        self.commands.append(("hset", name, mapping or {key: value}))
+
+    def expire(self, name, seconds):
+        self.commands.append(("expire", name, seconds))
+
+    def publish(self, channel, message):
+        self.commands.append(("publish", channel, message))
+
+    def set(self, name, value, ex=None):
+        self.commands.append(("set", name, value, ex))
+
+    def eval(self, script, numkeys, *args):
+        self.commands.append(("eval", list(args[:numkeys]), list(args[numkeys:])))
+
+    async def execute(self):
+        PipelineMock.executed.append(self.commands)
+        results = []
+
+        for command, *args in self.commands:
+            if command == "hset":
+                PipelineMock.hashes.setdefault(args[0], {}).update(args[1])
+
+            if command == "eval":
+                keys, (_, *timestamps) = args
+                results.append([key.encode() for key in keys if key not in self.hashes])
+
+                for key, timestamp in zip(keys, timestamps):
+                    if key in self.hashes:
+                        self.hashes[key]["timestamp"] = timestamp
+
+            else:
+                results.append(1)
+
+        return results
+
+
+@pytest.fixture
+def redis_sink():
+    PipelineMock.executed = []
+    PipelineMock.hashes = {}
+    sink = RedisTickerSink(chunk_size=2, expiry=10, channel=None)
+    sink.redis_client.pipeline = lambda transaction: PipelineMock()
+    return sink
+
+
+@pytest.mark.asyncio
+async def test_redis_sink_writes_chunks_in_pipelines(redis_sink):
+    tickers = {f"tick{i}": TickerRecord(f"tick{i}", "1.0", i) for i in range(5)}
+
+    stats = await redis_sink.write(tickers)
+
+    assert stats.tickers == 5
+    assert stats.round_trips == 3
+    assert stats.commands == 10
+    assert [len(commands) for commands in PipelineMock.executed] == [4, 4, 2]
+    assert PipelineMock.executed[0][:2] == [
+        (
+            "hset",
+            "tick0",
+            {"ticker_name": "tick0", "price": "1.0", "timestamp": 0, "version": 0},
+        ),
+        ("expire", "tick0", 10),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_redis_sink_publishes_tickers_after_the_last_chunk(redis_sink):
+    redis_sink.channel = "tickers:updates"
+    tickers = {f"tick{i}": TickerRecord(f"tick{i}", "1.0", i) for i in range(2)}
+    heartbeats = {"tick2": TickerRecord("tick2", "2.0", 5)}
+    PipelineMock.hashes["tick2"] = heartbeats["tick2"].as_dict()
+
+    stats = await redis_sink.write(tickers, heartbeats)
+
+    assert stats.round_trips == 2
+    assert all(command[0] != "publish" for command in PipelineMock.executed[0])
+    channel, payload = PipelineMock.executed[-1][-1][1:]
+    assert channel == "tickers:updates"
+    # only the changed tickers were inserted in postgres
+    assert decode_ticker_update(payload) == (
+        [*tickers.values(), *heartbeats.values()],
+        list(tickers.values()),
+    )
+
+
+def test_ticker_snapshot_roundtrip():
+    records = [*EXPECTED_RECORDS, TickerRecord("1000satsusdt", "0.0000003", 7, 3)]
+    blob = encode_snapshot(records, version=42)
+
+    assert decode_snapshot(blob) == (42, records)
+    assert decode_price_field("1000satsusdt", encode_price_field(records[2])) == (
+        records[2]
+    )
+    # written by a consumer that did not version the tickers yet
+    assert decode_price_field("btcusdt", b"63000.01000000:1727000000001") == (
+        EXPECTED_RECORDS[0]
+    )
+    assert decode_snapshot(
+        SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, 1, 42, 1)
+        + SNAPSHOT_RECORDS[1].pack(6, 3, 7)
+        + b"apebtc0.1"
+    ) == (42, [TickerRecord("apebtc", "0.1", 7)])
+
+    with pytest.raises(ValueError):
+        decode_snapshot(b"XXX" + blob[3:])
+
+
+@pytest.mark.asyncio
+async def test_redis_sink_snapshot_layout_writes_one_transaction():
+    PipelineMock.executed = []
+    sink = RedisTickerSink(
+        chunk_size=1, expiry=10, channel="tickers:updates", layout="snapshot"
+    )
+    transactions = []
+
+    def pipeline(transaction):
+        transactions.append(transaction)
+        return PipelineMock()
+
+    async def get(key):
+        return encode_snapshot([TickerRecord("ethusdt", "3", 3)], version=1)
+
+    sink.redis_client.pipeline = pipeline
+    sink.redis_client.get = get
+
+    stats = await sink.write(
+        {"btcusdt": TickerRecord("btcusdt", "2", 2)},
+        heartbeats={"apebtc": TickerRecord("apebtc", "1", 1)},
+    )
+
+    assert transactions == [True]
+    assert stats.round_trips == 2
+    [commands] = PipelineMock.executed
+    assert [command[0] for command in commands] == ["hset", "expire", "set", "publish"]
+    assert commands[0] == (
+        "hset",
+        "tickers",
+        {"btcusdt": "2:2:0", "apebtc": "1:1:0"},
+    )
+    _, snapshot = decode_snapshot(commands[2][2])
+    assert {record.ticker_name for record in snapshot} == {
+        "ethusdt",
+        "btcusdt",
+        "apebtc",
+    }
+    assert commands[2][1] == "tickers:snapshot:0"
+
+
+@pytest.mark.asyncio
+async def test_bulk_ingestor_copies_rows_and_caches_ticker_ids(db_engine):
+    ingestor = TickerBulkIngestor(db_engine)
+    tickers = {name: TickerRecord(name, "1.5", 1) for name in ("btcusdt", "ethusdt")}
+
+    assert await ingestor.ingest(tickers) == 2
+    first_ids = dict(ingestor.ticker_ids)
+
+    tickers["apebtc"] = TickerRecord("apebtc", "0.1", 2)
+    assert await ingestor.ingest(tickers) == 3
+
+    async with db_engine.connect() as connection:
+        ticker_names = (
+            await connection.execute(select(BinanceTickersModel.ticker_name))
+        ).scalars()
+        data_rows = (
+            await connection.execute(select(func.count(BinanceTickerDataModel.id)))
+        ).scalar()
+        stored = (
+            await connection.execute(
+                select(
+                    BinanceTickerDataModel.price, BinanceTickerDataModel.json_data
+                ).limit(1)
+            )
+        ).one()
+
+    assert sorted(ticker_names) == ["apebtc", "btcusdt", "ethusdt"]
+    assert data_rows == 5
+    assert tuple(stored) in ((Decimal("1.5"), None), (Decimal("0.1"), None))
+    assert ingestor.ticker_ids.items() >= first_ids.items()
+
+
+@pytest.mark.parametrize("message", [TICKER_FRAME, TICKER_FRAME.encode()])
+def test_decode_ticker_frame(message):
+    assert decode_ticker_frame(message) == EXPECTED_RECORDS
+    assert decode_ticker_frame_json(message) == EXPECTED_RECORDS
+
+
+def test_decode_ticker_frame_falls_back_to_json_on_unknown_layout():
+    reordered = TICKER_FRAME.replace('"p":"-1.5","P":"-0.01",', "").replace(
+        '"c":"63000.01000000",', '"c":"63000.01000000","p":"-1.5","P":"-0.01",'
+    )
+
+    assert decode_ticker_frame(reordered) == EXPECTED_RECORDS
+
+
+@pytest.mark.parametrize("decode", [decode_ticker_frame, decode_ticker_frame_json])
+def test_sharded_decoders_only_build_their_own_tickers(decode):
+    stores = [TickerStore(shard_index, 2) for shard_index in range(2)]
+    decoded = [decode(TICKER_FRAME, store.filter) for store in stores]
+
+    assert sorted(decoded[0] + decoded[1]) == sorted(EXPECTED_RECORDS)
+    for store, records in zip(stores, decoded):
+        assert all(store.owns(record.ticker_name) for record in records)
+    assert TickerStore().filter is None
+
+
+def test_decode_ticker_frame_skips_non_ticker_frames():
+    assert decode_ticker_frame('{"result":null,"id":1}') is None
+
+
+async def process_nothing(frame):
+    pass
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "policy,expected_frames,coalesced,dropped",
+    [
+        ("coalesce", ["frame2", "frame3"], 1, 0),
+        ("drop", ["frame1", "frame2"], 0, 1),
+    ],
+)
+async def test_frame_pipeline_full_queue_policy(
+    policy, expected_frames, coalesced, dropped
+):
+    pipeline = FramePipeline(process_nothing, maxsize=2, policy=policy)
+
+    for frame in ("frame1", "frame2", "frame3"):
+        await pipeline.put(frame)
+
+    queued = [pipeline.queue.get_nowait()[1] for _ in range(pipeline.queue.qsize())]
+
+    assert queued == expected_frames
+    assert pipeline.coalesced == coalesced
+    assert pipeline.dropped == dropped
+
+
+@pytest.mark.asyncio
+async def test_frame_pipeline_processes_every_frame():
+    processed = []
+
+    async def process(frame):
+        processed.append(frame)
+
+    class WebsocketMock:
+        frames = ["frame1", "frame2"]
+
+        async def recv(self):
+            if not self.frames:
+                await asyncio.sleep(0)
+                raise ConnectionError("closed")
+
+            return self.frames.pop(0)
+
+    pipeline = FramePipeline(process, policy="block")
+
+    with pytest.raises(ConnectionError):
+        await pipeline.run(WebsocketMock())
+
+    assert processed == ["frame1", "frame2"]
+
+
+def test_ticker_store_swap_hands_over_buffer():
+    store = TickerStore()
+    store.update(TickerRecord("btcusdt", "2", 2))
+    store.update(TickerRecord("btcusdt", "1", 1))
+
+    flushed = store.swap()
+    store.update(TickerRecord("ethusdt", "3", 3))
+
+    assert flushed == {"btcusdt": TickerRecord("btcusdt", "2", 2)}
+    assert len(store) == 1
+    assert store.generation == 1
+
+
+@pytest.mark.asyncio
+async def test_redis_sink_heartbeats_only_refresh_existing_hashes(redis_sink):
+    PipelineMock.hashes["btcusdt"] = TickerRecord("btcusdt", "2", 1, 4).as_dict()
+    heartbeats = {
+        f"{name}usdt": TickerRecord(f"{name}usdt", "2", 7, 4)
+        for name in ("btc", "eth", "ape")
+    }
+    PipelineMock.hashes["ethusdt"] = {**heartbeats["ethusdt"].as_dict(), "timestamp": 1}
+
+    stats = await redis_sink.write(
+        {"apebtc": TickerRecord("apebtc", "1", 7)}, heartbeats
+    )
+
+    assert PipelineMock.executed[:2] == [
+        [
+            (
+                "hset",
+                "apebtc",
+                {"ticker_name": "apebtc", "price": "1", "timestamp": 7, "version": 0},
+            ),
+            ("expire", "apebtc", 10),
+            ("eval", ["btcusdt"], [10, 7]),
+        ],
+        [("eval", ["ethusdt", "apeusdt"], [10, 7, 7])],
+    ]
+    assert PipelineMock.hashes["btcusdt"] == heartbeats["btcusdt"].as_dict()
+    # apeusdt had no hash left and was written in full
+    assert PipelineMock.executed[2][0][:2] == ("hset", "apeusdt")
+    assert (stats.commands, stats.saved_commands, stats.round_trips) == (6, 2, 3)
+    assert stats.recreated == 1
+    assert stats.write_reduction == 0.25
+
+
+@pytest.mark.asyncio
+async def test_redis_sink_heartbeats_recreate_a_missing_hash(redis_sink):
+    # the hash of ethusdt expired, or redis was flushed, since its last write
+    heartbeats = {"ethusdt": TickerRecord("ethusdt", "3", int(time.time()), 2)}
+
+    stats = await redis_sink.write({}, heartbeats)
+
+    assert stats.heartbeats == stats.recreated == 1
+    assert PipelineMock.executed[1][1] == ("expire", "ethusdt", 10)
+    ticker = BinanceTicker.from_redis(
+        {
+            key.encode(): str(value).encode()
+            for key, value in PipelineMock.hashes["ethusdt"].items()
+        }
+    )
+    assert (ticker.ticker_name, ticker.price, ticker.version) == ("ethusdt", "3", 2)
+
+
+def test_change_tracker_splits_moved_prices_from_heartbeats():
+    tracker = ChangeTracker()
+    first = {"btcusdt": TickerRecord("btcusdt", "1", 1)}
+
+    changed, heartbeats = tracker.split(first)
+    tracker.commit(changed)
+    assert (changed, heartbeats) == (
+        {"btcusdt": TickerRecord("btcusdt", "1", 1, 1)},
+        {},
+    )
+
+    second = {
+        "btcusdt": TickerRecord("btcusdt", "1", 2),
+        "ethusdt": TickerRecord("ethusdt", "5", 2),
+    }
+    changed, heartbeats = tracker.split(second)
+    tracker.commit(changed)
+
+    # a repeated price keeps its version, a new one bumps it
+    assert changed == {"ethusdt": TickerRecord("ethusdt", "5", 2, 1)}
+    assert heartbeats == {"btcusdt": TickerRecord("btcusdt", "1", 2, 1)}
+
+    changed, heartbeats = tracker.split({"btcusdt": TickerRecord("btcusdt", "2", 3)})
+    assert changed == {"btcusdt": TickerRecord("btcusdt", "2", 3, 2)}
+
+    # the write failed and was not committed, the retry gets a version of its own
+    changed, heartbeats = tracker.split({"btcusdt": TickerRecord("btcusdt", "2", 4)})
+    assert changed == {"btcusdt": TickerRecord("btcusdt", "2", 4, 3)}
+
+
+def test_change_tracker_forces_full_write_after_interval():
+    tracker = ChangeTracker(full_write_interval=0)
+    record = {"btcusdt": TickerRecord("btcusdt", "1", 1)}
+    tracker.commit(tracker.split(record)[0])
+
+    # forced, the price and its version are the same
+    assert tracker.split(record) == (
+        {"btcusdt": TickerRecord("btcusdt", "1", 1, 1)},
+        {},
+    )
+
+
+def test_sharded_ticker_stores_own_disjoint_symbols():
+    stores = [TickerStore(shard_index, 3) for shard_index in range(3)]
+    symbols = [f"sym{i}usdt" for i in range(100)]
+
+    for store in stores:
+        for symbol in symbols:
+            store.update(TickerRecord(symbol, "1", 1))
+
+    owned = [set(store.swap()) for store in stores]
+
+    assert set().union(*owned) == set(symbols)
+    assert sum(len(shard_symbols) for shard_symbols in owned) == len(symbols)
+
+
+@pytest.mark.asyncio
+async def test_replay_server_sends_recorded_frames_with_fresh_event_times():
+    replayer = FrameReplayer(
+        [TICKER_FRAME, TICKER_FRAME], speed=parse_speed("max"), loop=False
+    )
+
+    async with websockets.serve(replayer.handler, "127.0.0.1", 0) as server:
+        port = server.sockets[0].getsockname()[1]
+
+        async with websockets.connect(f"ws://127.0.0.1:{port}") as ws:
+            await ws.send(json.dumps({"method": "SUBSCRIBE", "id": 1}))
+            messages = [message async for message in ws]
+
+    frames = [decode_ticker_frame(message) for message in messages]
+    replayed = [records for records in frames if records is not None]
+
+    assert len(replayed) == 2
+    for records in replayed:
+        assert [record.ticker_name for record in records] == ["btcusdt", "apebtc"]
+        assert records[0].timestamp > EXPECTED_RECORDS[0].timestamp
+        assert records[1].timestamp - records[0].timestamp == 1
+
+
+def test_parse_partition_bounds():
+    legacy = parse_partition(
+        "binance_tickers_data_legacy",
+        "FOR VALUES FROM (MINVALUE) TO ('2026-10-19 00:00:00')",
+    )
+
+    assert legacy == Partition(
+        "binance_tickers_data_legacy", None, datetime(2026, 10, 19)
+    )
+    assert parse_partition("binance_tickers_data_default", "DEFAULT") is None
+
+
+def test_plan_partitions_creates_ahead_and_drops_past_the_retention():
+    partitions = [
+        Partition("binance_tickers_data_legacy", None, datetime(2026, 10, 1)),
+        Partition(
+            "binance_tickers_data_p20261001",
+            datetime(2026, 10, 1),
+            datetime(2026, 10, 2),
+        ),
+        Partition(
+            "binance_tickers_data_p20261002",
+            datetime(2026, 10, 2),
+            datetime(2026, 10, 3),
+        ),
+        Partition(
+            "binance_tickers_data_p20261004",
+            datetime(2026, 10, 4),
+            datetime(2026, 10, 5),
+        ),
+    ]
+
+    to_create, to_drop = plan_partitions(partitions, date(2026, 10, 3), 2, 1)
+
+    assert to_create == [date(2026, 10, 3), date(2026, 10, 5)]
+    assert to_drop == ["binance_tickers_data_legacy", "binance_tickers_data_p20261001"]
+
+    with pytest.raises(ValueError):
+        plan_partitions(partitions, date(2026, 10, 3), 2, 0)
+
+    with pytest.raises(ValueError):
+        plan_partitions(partitions, date(2026, 10, 3), 0, 1)
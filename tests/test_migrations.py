@@ -7,6 +7,9 @@ from sqlalchemy.ext.asyncio import create_async_engine
 from crypto_converter.database.db_models import (
     BinanceTickerDataModel,
     BinanceTickerAggregatedData,
+    BinanceTickerHourlyPrices,
+    BinanceTickerMinuteCandleModel,
+    BinanceTickerRollingPrices,
     BinanceTickersModel,
 )
 from tests.conftest import alembic_config, run_migrations
@@ -49,6 +52,9 @@ async def test_migration_tables_created(create_test_database, event_loop):
         expected_tables = [
             BinanceTickerDataModel.__tablename__,
             BinanceTickerAggregatedData.__tablename__,
+            BinanceTickerHourlyPrices.__tablename__,
+            BinanceTickerMinuteCandleModel.__tablename__,
+            BinanceTickerRollingPrices.__tablename__,
             BinanceTickersModel.__tablename__,
         ]
 